@@ -5,12 +5,14 @@ import cv2
 
 from ui_CameraConnectDialog import Ui_CameraConnectDialog
 from Config import *
+from Structures import DecoderSettings, DropPolicy
 
 class VideoSetting():
-    def __init__(self,video_date,video_time,skip_duration):
+    def __init__(self,video_date,video_time,skip_duration,turbo_mode=False):
         self.video_date = video_date
         self.video_time = video_time
         self.skip_duration = skip_duration
+        self.turbo_mode = turbo_mode
 
 class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
     def __init__(self, parent=None, isStreamSyncEnabled=False):
@@ -62,6 +64,16 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
                               'CAP_XINE': cv2.CAP_XINE
                               }
         self.apiPreferenceComboBox.addItems(self.apiPreference.keys())
+        # Setup rtsp transport combo box (index = transport mode)
+        self.transportModeComboBox.addItems(['Auto', 'UDP (unicast)', 'UDP (multicast)', 'TCP'])
+        # Setup decoder threading combo box
+        self.decodeThreadTypeComboBox.addItems(['NONE', 'SLICE', 'FRAME', 'AUTO'])
+        # Setup drop policy combo box (AUTO: block for video files, drop oldest for live streams)
+        self.dropPolicyComboBox.addItems(['AUTO', 'BLOCK', 'DROP_OLDEST', 'DROP_NEWEST', 'KEEP_LATEST', 'EVERY_NTH'])
+        # decodeThreadCountEdit (decoder thread count) input validation
+        self.decodeThreadCountEdit.setValidator(QRegExpValidator(QRegExp("^[0-9]{1,2}$")))  # Integers 0 to 99
+        # processingWorkersEdit (processing worker threads) input validation
+        self.processingWorkersEdit.setValidator(QRegExpValidator(QRegExp("^[0-9]{1,2}$")))  # Integers 0 to 99
         # Setup capture prio combo boxes
         threadPriorities = ["Idle", "Lowest", "Low", "Normal", "High", "Highest", "Time Critical", "Inherit"]
         self.capturePrioComboBox.addItems(threadPriorities)
@@ -162,18 +174,35 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
         else:
             return int(self.imageBufferSizeEdit.text())
 
-    def getDropFrameCheckBoxState(self):
-        return self.dropFrameCheckBox.isChecked()
+    def getDropPolicy(self):
+        return getattr(DropPolicy, self.dropPolicyComboBox.currentText())
 
     def getApiPreference(self):
         return self.apiPreference.setdefault(self.apiPreferenceComboBox.currentText(), cv2.CAP_ANY)
 
+    def getDecoderSettings(self):
+        decoderSettings = DecoderSettings()
+        decoderSettings.threadType = self.decodeThreadTypeComboBox.currentText()
+        # Let FFmpeg pick the thread count if field is blank
+        if self.decodeThreadCountEdit.text().strip() == '':
+            decoderSettings.threadCount = DEFAULT_DECODE_THREAD_COUNT
+        else:
+            decoderSettings.threadCount = int(self.decodeThreadCountEdit.text())
+        decoderSettings.transportMode = self.transportModeComboBox.currentIndex()
+        return decoderSettings
+
     def getCaptureThreadPrio(self):
         return self.capturePrioComboBox.currentIndex()
 
     def getProcessingThreadPrio(self):
         return self.processingPrioComboBox.currentIndex()
 
+    def getProcessingWorkers(self):
+        # Use the default if field is blank, 0 -> frames are processed one at a time
+        if self.processingWorkersEdit.text().strip() == '':
+            return PROCESSING_WORKERS
+        return max(1, int(self.processingWorkersEdit.text()))
+
     def getTabLabel(self):
         return self.tabLabelEdit.text()
 
@@ -181,7 +210,8 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
         return self.enableFrameProcessingCheckBox.isChecked()
     
     def getVideoSetting(self):
-        return VideoSetting(self.videoDate.text(),self.videoTime.text(),self.skipDuration.text())
+        return VideoSetting(self.videoDate.text(),self.videoTime.text(),self.skipDuration.text(),
+                            self.turboModeCheckBox.isChecked())
 
     def setUrlMode(self, mode):
         if mode == 'device url':
@@ -193,6 +223,7 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
             self.portEdit.setEnabled(False)
             self.channelsEdit.setEnabled(False)
             self.importFilePushButton.setEnabled(False)
+            self.transportModeComboBox.setEnabled(False)
             self.deviceUrlRadioButton.setChecked(True)
         elif mode == 'filename':
             self.deviceUrlEdit.setEnabled(False)
@@ -203,6 +234,7 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
             self.portEdit.setEnabled(False)
             self.channelsEdit.setEnabled(False)
             self.importFilePushButton.setEnabled(True)
+            self.transportModeComboBox.setEnabled(False)
             self.filenameRadioButton.setChecked(True)
         elif mode == 'rtsp':
             self.deviceUrlEdit.setEnabled(False)
@@ -213,6 +245,7 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
             self.portEdit.setEnabled(True)
             self.channelsEdit.setEnabled(True)
             self.importFilePushButton.setEnabled(False)
+            self.transportModeComboBox.setEnabled(True)
             self.rtspRadioButton.setChecked(True)
 
     def openFile(self):
@@ -228,16 +261,20 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
         self.ipEdit.setText(DEFAULT_RTSP_IP)
         self.portEdit.setText(DEFAULT_RTSP_PORT)
         self.channelsEdit.setText(DEFAULT_RTSP_CAHHELS)
+        self.transportModeComboBox.setCurrentIndex(DEFAULT_TRANSPORT_MODE)
         self.setUrlMode(DEFAULT_URL_MODE)
         # Resolution
         self.resWEdit.clear()
         self.resHEdit.clear()
         # Image buffer size
         self.imageBufferSizeEdit.setText(str(DEFAULT_IMAGE_BUFFER_SIZE))
-        # Drop frames
-        self.dropFrameCheckBox.setChecked(DEFAULT_DROP_FRAMES)
+        # Drop policy
+        self.dropPolicyComboBox.setCurrentText(DEFAULT_DROP_POLICY)
         # apiPreference
         self.apiPreferenceComboBox.setCurrentText(DEFAULT_APIPREFERENCE)
+        # Decoder threading
+        self.decodeThreadTypeComboBox.setCurrentText(DEFAULT_DECODE_THREAD_TYPE)
+        self.decodeThreadCountEdit.setText(str(DEFAULT_DECODE_THREAD_COUNT))
         # Capture thread
         if DEFAULT_CAP_THREAD_PRIO == QThread.IdlePriority:
             self.capturePrioComboBox.setCurrentIndex(0)
@@ -272,6 +309,8 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
             self.processingPrioComboBox.setCurrentIndex(6)
         elif DEFAULT_PROC_THREAD_PRIO == QThread.InheritPriority:
             self.processingPrioComboBox.setCurrentIndex(7)
+        # Processing workers
+        self.processingWorkersEdit.setText(str(PROCESSING_WORKERS))
         # Tab label
         self.tabLabelEdit.setText("")
         # Enable Frame Processing checkbox
@@ -279,3 +318,4 @@ class CameraConnectDialog(QDialog, Ui_CameraConnectDialog):
         #self.videoDate.setText('01/01/2000')
         #self.videoTime.setText('12:00 AM')
         self.skipDuration.setText('00:00:00')
+        self.turboModeCheckBox.setChecked(DEFAULT_TURBO_MODE)
@@ -8,6 +8,7 @@ from CaptureThread import CaptureThread
 from ImageProcessingSettingsDialog import ImageProcessingSettingsDialog
 from ProcessingThread import ProcessingThread
 from Structures import *
+from Config import PROCESSING_WORKERS
 from PolygonDrawing import PolygonDrawing
 import pandas as pd
 import time
@@ -74,7 +75,8 @@ class CameraView(QWidget, Ui_CameraView):
             print("Not Okay")
 
     def change_speed(self):
-        self.processingThread.speed = int(self.video_speed.currentText())
+        # Frames are skipped in the capture thread, before decoding/conversion
+        self.captureThread.setSpeed(int(self.video_speed.currentText()))
 
     def add_vehicle_to_vehicle_list(self):
         self.vehicle_select.addItems(["2 Wheeler", "Auto Rick", "Car-PVT", "Car-Taxi", "Car-Share", "Bus-Govt.", "Bus-2 Axle Private","Bus-3 Axle Private", "Bus-Institution", "Bus-Mini Bus", "Bus-2 Axle", "Bus-MAV", "Govt. Cars/ Jeep/ Vans","Army Vehicles/ Ambulance", "Govt trucks", "Cycle", "Animal Drawn", "Truck-2 Axle", "Truck-3 Axle","Truck-4 Axle", "Truck-5 Axle", "Truck-Axle>=6", "Truck-HC,EME", "LCV-4 Tyre", "LCV-6 Tyre", "LCV-Tata Ace","LCV-Mini LCV", "LCV-Goods Auto", "Const.-2 Axle Truck", "Const.-3 Axle Truck", "Const.-MAV up to 6 Axle","Tractor & Trailer", "Chakra"])
@@ -100,7 +102,12 @@ class CameraView(QWidget, Ui_CameraView):
         self.close()
 
     def addVehicle(self):
-        dt_string = self.sharedImageBuffer.video_date_time.strftime('%Y-%m-%d_%H:%M:%S')
+        # Timestamp of the frame currently shown by this camera (none before the first frame was processed)
+        frameTimestamp = self.processingThread.frameTimestamp
+        if frameTimestamp is None:
+            qDebug("[%s] WARNING: No frame shown yet, vehicle not added." % self.deviceUrl)
+            return
+        dt_string = frameTimestamp.strftime('%Y-%m-%d_%H:%M:%S')
         item = QtWidgets.QListWidgetItem()
         font = QtGui.QFont()
         font.setBold(False)
@@ -119,20 +126,47 @@ class CameraView(QWidget, Ui_CameraView):
         item.setText(f"{dt_string}_{self.direction}_{self.vehicle_select.currentText()}")
         self.vehicle_list.insertItem(0,item)
 
+    def addCountedVehicle(self, counter, tm, direction, class_name):
+        # Vehicle counted by the tracker of the processing thread
+        dt_string = tm.strftime('%Y-%m-%d_%H:%M:%S')
+        item = QtWidgets.QListWidgetItem()
+        font = QtGui.QFont()
+        font.setBold(False)
+        font.setItalic(False)
+        font.setUnderline(False)
+        font.setWeight(50)
+        font.setStrikeOut(False)
+        font.setKerning(False)
+        item.setFont(font)
+        brush = QtGui.QBrush(QtGui.QColor(0, 0, 0))
+        brush.setStyle(QtCore.Qt.NoBrush)
+        item.setBackground(brush)
+        brush = QtGui.QBrush(QtGui.QColor(255, 0, 0))
+        brush.setStyle(QtCore.Qt.NoBrush)
+        item.setForeground(brush)
+        item.setText(f"{dt_string}_{direction}_{class_name}")
+        self.vehicle_list.insertItem(0,item)
+
     def btnstate(self,b):
         self.direction = b.text()
 
     def delete(self):
         if self.isCameraConnected:
+            # Stopping removes the stream from synchronization
+            isSyncEnabled = self.sharedImageBuffer.isSyncEnabledForDeviceUrl(self.deviceUrl)
             # Stop processing thread
             if self.processingThread.isRunning():
                 self.stopProcessingThread()
+            # Capture thread is shared with the other views of the same camera: the last one stops it
+            if self.sharedImageBuffer.nConsumers(self.deviceUrl) > 1:
+                self.sharedImageBuffer.removeConsumer(self.deviceUrl, self.cameraId)
+                return
             # Stop capture thread
             if self.captureThread.isRunning():
                 self.stopCaptureThread()
 
             # Automatically start frame processing (for other streams)
-            if self.sharedImageBuffer.isSyncEnabledForDeviceUrl(self.deviceUrl):
+            if isSyncEnabled:
                 self.sharedImageBuffer.setSyncEnabled(True)
 
             # Disconnect camera
@@ -142,27 +176,57 @@ class CameraView(QWidget, Ui_CameraView):
                 qDebug("[%s] WARNING: Camera already disconnected." % self.deviceUrl)
 
     def afterCaptureThreadFinshed(self):
-        # Delete Buffer
-        self.sharedImageBuffer.removeByDeviceUrl(self.deviceUrl)
+        # Delete Buffer (once the processing thread drained it)
+        if not self.processingThread.isRunning():
+            self.removeImageBuffer()
 
     def afterProcessingThreadFinshed(self):
         qDebug("[%s] WARNING: SQL already disconnected." % self.deviceUrl)
-
-    def connectToCamera(self, dropFrameIfBufferFull, apiPreference, capThreadPrio,
-                        procThreadPrio, enableFrameProcessing, width, height, setting):
+        # Delete Buffer (once the capture thread stopped adding to it)
+        if not self.captureThread.isRunning():
+            self.removeImageBuffer()
+
+    def removeImageBuffer(self):
+        if self.sharedImageBuffer.containsImageBufferForDeviceUrl(self.deviceUrl):
+            self.sharedImageBuffer.removeConsumer(self.deviceUrl, self.cameraId)
+            # Last consumer of a stopped capture removes the image buffer
+            if self.sharedImageBuffer.nConsumers(self.deviceUrl) == 0 and not self.captureThread.isRunning():
+                self.sharedImageBuffer.removeByDeviceUrl(self.deviceUrl)
+
+    def connectToCamera(self, dropPolicy, apiPreference, capThreadPrio,
+                        procThreadPrio, enableFrameProcessing, width, height, setting, decoderSettings,
+                        imageBufferSize=None, captureThread=None, nProcessingWorkers=PROCESSING_WORKERS):
         # Set frame label text
         if self.sharedImageBuffer.isSyncEnabledForDeviceUrl(self.deviceUrl):
             self.frameLabel.setText("Camera connected. Waiting...")
         else:
             self.frameLabel.setText("Connecting to camera...")
 
+        # Frames the processing thread holds outside its buffer count against the memory budget
+        framesInFlight = ProcessingThread.maxFramesInFlight(nProcessingWorkers)
+        # Camera already open in another view: consume the frames of its capture thread (no second decoder)
+        if captureThread is not None:
+            self.captureThread = captureThread
+            # Speed applies to the capture thread, i.e. to every view of the camera: set in the view that opened it
+            self.video_speed.setEnabled(False)
+            self.video_speed.setToolTip("Speed is set in the view that opened this camera")
+            connected = captureThread.isRunning()
+            if connected:
+                self.sharedImageBuffer.addConsumer(self.deviceUrl, self.cameraId, imageBufferSize,
+                                                   None if dropPolicy == DropPolicy.AUTO else dropPolicy,
+                                                   framesInFlight)
         # Create capture thread
-        self.captureThread = CaptureThread(self.sharedImageBuffer, self.deviceUrl, dropFrameIfBufferFull,
-                                           apiPreference, width, height, setting)
-        # Attempt to connect to camera
-        if self.captureThread.connectToCamera():
+        else:
+            self.captureThread = CaptureThread(self.sharedImageBuffer, self.deviceUrl, dropPolicy,
+                                               apiPreference, width, height, setting, decoderSettings)
+            # Attempt to connect to camera (first consumer follows the drop policy of the capture thread)
+            connected = self.captureThread.connectToCamera()
+            if connected:
+                self.sharedImageBuffer.addConsumer(self.deviceUrl, self.cameraId, framesInFlight=framesInFlight)
+        if connected:
             # Create processing thread
-            self.processingThread = ProcessingThread(self.sharedImageBuffer, self.deviceUrl, self.cameraId ,self)
+            self.processingThread = ProcessingThread(self.sharedImageBuffer, self.deviceUrl, self.cameraId, self,
+                                                     nProcessingWorkers)
             self.roi = [
                 (0,self.processingThread.currentROI.height()*50/100),
                 (self.processingThread.currentROI.width(),self.processingThread.currentROI.height()*50/100),
@@ -175,13 +239,14 @@ class CameraView(QWidget, Ui_CameraView):
             # Setup signal/slot connections
             self.processingThread.newFrame.connect(self.updateFrame)
             self.processingThread.updateStatisticsInGUI.connect(self.updateProcessingThreadStats)
+            self.processingThread.vehicleCounted.connect(self.addCountedVehicle)
             self.captureThread.updateStatisticsInGUI.connect(self.updateCaptureThreadStats)
             self.imageProcessingSettingsDialog.newImageProcessingSettings.connect(
                 self.processingThread.updateImageProcessingSettings)
             self.newImageProcessingFlags.connect(self.processingThread.updateImageProcessingFlags)
             self.setROI.connect(self.processingThread.setROI)
 
-            # Remove imageBuffer from shared buffer by deviceUrl after captureThread stop/finished
+            # Remove imageBuffer from shared buffer by deviceUrl after captureThread and processingThread stop/finished
             self.captureThread.finished.connect(self.afterCaptureThreadFinshed)
             self.processingThread.finished.connect(self.afterProcessingThreadFinshed)
 
@@ -196,14 +261,15 @@ class CameraView(QWidget, Ui_CameraView):
             self.imageProcessingSettingsDialog.updateStoredSettingsFromDialog()
 
             # Start capturing frames from camera
-            self.captureThread.start(capThreadPrio)
+            if not self.captureThread.isRunning():
+                self.captureThread.start(capThreadPrio)
             # Start processing captured frames (if enabled)
             if enableFrameProcessing:
                 self.processingThread.start(procThreadPrio)
 
             # Setup imageBufferBar with minimum and maximum values
             self.imageBufferBar.setMinimum(0)
-            self.imageBufferBar.setMaximum(self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).maxSize())
+            self.imageBufferBar.setMaximum(self.sharedImageBuffer.getConsumer(self.deviceUrl, self.cameraId).maxSize())
 
             # Enable "Clear Image Buffer" push button
             self.clearImageBufferButton.setEnabled(True)
@@ -225,41 +291,65 @@ class CameraView(QWidget, Ui_CameraView):
     def stopCaptureThread(self):
         qDebug("[%s] About to stop capture thread..." % self.deviceUrl)
         self.captureThread.stop()
-        self.sharedImageBuffer.wakeAll()  # This allows the thread to be stopped if it is in a wait-state
-        # Take one frame off a FULL queue to allow the capture thread to finish
-        if self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).isFull():
-            self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).get()
+        # Release the thread if it is waiting for other streams or for a free slot in the image buffer
+        self.sharedImageBuffer.close(self.deviceUrl)
         self.captureThread.wait()
         qDebug("[%s] Capture thread successfully stopped." % self.deviceUrl)
 
     def stopProcessingThread(self):
         qDebug("[%s] About to stop processing thread..." % self.deviceUrl)
         self.processingThread.stop()
-        self.sharedImageBuffer.wakeAll()  # This allows the thread to be stopped if it is in a wait-state
+        # Release the thread if it is waiting for a frame (other views of the camera go on)
+        self.sharedImageBuffer.closeConsumer(self.deviceUrl, self.cameraId)
         self.processingThread.wait()
         qDebug("[%s] Processing thread successfully stopped." % self.deviceUrl)
 
     def startThread(self):
-        self.processingThread.pause = False
-        self.captureThread.pause = False
+        self.processingThread.resume()
+        self.captureThread.resume()
         self.startButton.setEnabled(False)
         self.pauseButton.setEnabled(True)
 
     def pauseThread(self):
-        self.processingThread.pause = True
-        self.captureThread.pause = True
+        self.processingThread.pause()
+        # Capture thread shared with other views keeps running for them
+        if self.sharedImageBuffer.nConsumers(self.deviceUrl) <= 1:
+            self.captureThread.pause()
         self.startButton.setEnabled(True)
         self.pauseButton.setEnabled(False)
 
     def updateCaptureThreadStats(self, statData):
-        imageBuffer = self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl)
+        # Buffer of this view (other views of the same camera have their own fill level and drops)
+        imageBuffer = self.sharedImageBuffer.getConsumer(self.deviceUrl, self.cameraId)
+        droppedFrames = imageBuffer.droppedFrames()
         # Show [number of images in buffer / image buffer size] in imageBufferLabel
         self.imageBufferLabel.setText("[%d/%d]" % (imageBuffer.size(), imageBuffer.maxSize()))
-        # Show percentage of image buffer full in imageBufferBar
+        # Show percentage of image buffer full in imageBufferBar (capacity follows the memory budget)
+        self.imageBufferBar.setMaximum(imageBuffer.maxSize())
         self.imageBufferBar.setValue(imageBuffer.size())
+        # Show frame memory in imageBufferLabel tooltip
+        self.imageBufferLabel.setToolTip("Memory: %.1f MB%s (all streams: %.1f of %.1f MB)" % (
+            self.sharedImageBuffer.bytesInUse(self.deviceUrl) / 1048576,
+            " - over budget" if self.sharedImageBuffer.isOverBudget(self.deviceUrl) else "",
+            self.sharedImageBuffer.totalBytesInUse() / 1048576,
+            self.sharedImageBuffer.getMemoryBudget() / 1048576))
+        # Show frame pool statistics in imageBufferBar tooltip
+        self.imageBufferBar.setToolTip("Frame pool: %d hits / %d misses" % (statData.framePoolHits,
+                                                                             statData.framePoolMisses))
+        # Show dropped frames (total and per reason) in droppedFramesLabel
+        self.droppedFramesLabel.setText("%d (oldest: %d, newest: %d, superseded: %d, decimated: %d, unsynced: %d)" % (
+            sum(droppedFrames.values()) + statData.nSyncDropped, droppedFrames['oldest'], droppedFrames['newest'],
+            droppedFrames['superseded'], droppedFrames['decimated'], statData.nSyncDropped))
+        # Show frames repeated by stream synchronization in droppedFramesLabel tooltip
+        self.droppedFramesLabel.setToolTip("Duplicated (stream synchronization): %d" % statData.nSyncDuplicated)
 
         # Show processing rate in captureRateLabel
         self.captureRateLabel.setText("{:>6,.2f} fps".format(statData.averageFPS))
+        # Show read-ahead queue depth (and live stream latency and reconnects) in captureRateLabel tooltip
+        toolTip = "Packet queue: %d packets / %d KB" % (statData.packetQueueSize, statData.packetQueueBytes // 1024)
+        if self.captureThread.liveStream:
+            toolTip += "\nLatency: %d ms, reconnects: %d" % (statData.latency, statData.nReconnects)
+        self.captureRateLabel.setToolTip(toolTip)
         # Show number of frames captured in nFramesCapturedLabel
         self.nFramesCapturedLabel.setText("[%d]" % statData.nFramesProcessed)
 
@@ -273,15 +363,23 @@ class CameraView(QWidget, Ui_CameraView):
                                                  self.processingThread.getCurrentROI().height()))
         # Show number of frames processed in nFramesProcessedLabel
         self.nFramesProcessedLabel.setText("[%d]" % statData.nFramesProcessed)
+        # Show capture to display latency, bytes copied, drop policy and time of every processing stage (per frame)
+        # in processingRateLabel tooltip
+        toolTip = "Latency: %d ms\nCopied: %.1f KB/frame\nDrop policy: %s" % (
+            statData.latency, statData.bytesCopied / 1024, DropPolicy.NAMES[statData.dropPolicy])
+        for stageName, stageTime in statData.stageTimes.items():
+            toolTip += "\n%s: %.2f ms" % (stageName, stageTime)
+        self.processingRateLabel.setToolTip(toolTip)
 
     def updateFrame(self, frame):
-        # Display frame
+        # Display frame (next frames are scaled to the label size by the processing thread)
+        self.processingThread.setDisplaySize(self.frameLabel.width(), self.frameLabel.height())
         pixmap = QPixmap.fromImage(frame).scaled(self.frameLabel.width(), self.frameLabel.height(), Qt.KeepAspectRatio)
         pixmap = self.draw_something(pixmap)
         self.frameLabel.setPixmap(pixmap)
 
     def clearImageBuffer(self):
-        if self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).clear():
+        if self.sharedImageBuffer.getConsumer(self.deviceUrl, self.cameraId).clear():
             qDebug("[%s] Image buffer successfully cleared." % self.deviceUrl)
         else:
             qDebug("[%s] WARNING: Could not clear image buffer." % self.deviceUrl)
@@ -1,100 +1,131 @@
-from PyQt5.QtCore import QThread, QTime, QMutexLocker, QMutex, pyqtSignal, qDebug
+from PyQt5.QtCore import QMutexLocker, pyqtSignal, qDebug
 from PyQt5.QtWidgets import QMessageBox
 import cv2
-from queue import Queue
 import os
+import numpy as np
+import time
 
 from Structures import *
 from Config import *
+from PipelineThread import PipelineThread
+from StatsPublisher import StatsPublisher, FPSAverage
+from DemuxThread import DemuxThread
 from datetime import datetime,timedelta
 import av
 
 
-class CaptureThread(QThread):
+class CaptureThread(PipelineThread):
     updateStatisticsInGUI = pyqtSignal(ThreadStatisticsData)
     end = pyqtSignal()
 
-    def __init__(self, sharedImageBuffer, deviceUrl, dropFrameIfBufferFull, apiPreference, width, height, setting, parent=None):
+    def __init__(self, sharedImageBuffer, deviceUrl, dropPolicy, apiPreference, width, height, setting,
+                 decoderSettings, parent=None):
         super(CaptureThread, self).__init__(parent)
-        self.t = QTime()
-        self.doStopMutex = QMutex()
-        self.fps = Queue()
+        self.fps = FPSAverage(CAPTURE_FPS_STAT_ALPHA)
         # Save passed parameters
         self.sharedImageBuffer = sharedImageBuffer
-        self.dropFrameIfBufferFull = dropFrameIfBufferFull
+        self.dropPolicy = dropPolicy
         self.deviceUrl = deviceUrl
         self._deviceUrl = int(deviceUrl) if deviceUrl.isdigit() else deviceUrl
         self.localVideo = True if os.path.exists(self._deviceUrl) else False
+        # Network streams (rtsp://, http://, ...) get low-latency demuxer options and reconnection
+        self.liveStream = not self.localVideo and '://' in deviceUrl
         self.apiPreference = apiPreference
         self.width = width
         self.height = height
+        self.decoderSettings = decoderSettings
+        self.outputWidth = None
+        self.outputHeight = None
         # Initialize variables(s)
         self.captureTime = 0
-        self.doStop = False
-        self.sampleNumber = 0
-        self.fpsSum = 0.0
         self.statsData = ThreadStatisticsData()
+        self.statsPublisher = StatsPublisher(self.updateStatisticsInGUI)
         self.defaultTime = 0
         t = datetime.strptime(setting.skip_duration, '%H:%M:%S')
         self.skip_duration = timedelta(hours=t.hour, minutes=t.minute, seconds=t.second)
         self.video_date_time = datetime.strptime("{} {}".format(setting.video_date, setting.video_time), '%d/%m/%Y %H:%M:%S')
         self.starting_time = self.video_date_time 
+        # Turbo mode only applies to video files (live sources cannot be read faster than real time)
+        self.turboMode = setting.turbo_mode and self.localVideo
+        # Apply backpressure instead of dropping frames: every frame of the file gets processed
+        if self.turboMode:
+            self.dropPolicy = DropPolicy.BLOCK
+        # Default: every frame of a video file is processed, live streams must not fall behind
+        elif self.dropPolicy == DropPolicy.AUTO:
+            self.dropPolicy = DropPolicy.BLOCK if self.localVideo else DropPolicy.DROP_OLDEST
+        # Consumers without their own drop policy follow the capture thread
+        self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).setDropPolicy(self.dropPolicy)
         self.remain_video = None
-        self.pause = False
+        self.frameIndex = 0
+        self.speed = 1
+        self.skipFrame = 'DEFAULT'
+        self.video = None
+        self.videoStream = None
+        self.demuxThread = None
+        self.latencyBase = None
 
-    def update(self,frame):
-        current_frame = frame.index
-        process_time_second = round(current_frame / self.videofps)
-        self.video_date_time = self.starting_time + timedelta(seconds=process_time_second)
-        if round(current_frame%self.videofps) == 0:
+    def update(self,frameIndex,ptsTime):
+        # Recording date/time of the frame from its presentation time
+        self.video_date_time = self.starting_time + timedelta(seconds=ptsTime)
+        if round(frameIndex%self.videofps) == 0:
             self.remain_video = self.video_date_time - self.starting_time
 
-        self.sharedImageBuffer.video_date_time = self.video_date_time
-        self.sharedImageBuffer.remain_video = self.remain_video
-
     def run(self):
-        pause = False
+        imageBuffer = self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl)
         while True:
-            if self.pause:
-                continue
-            ################################
-            # Stop thread if doStop = TRUE #
-            ################################
-            self.doStopMutex.lock()
-            if self.doStop:
-                self.doStop = False
-                self.doStopMutex.unlock()
+            # Block while PAUSED, stop if STOPPING
+            if not self.waitWhilePaused():
                 break
-            self.doStopMutex.unlock()
-            ################################
-            ################################
-
-            # Synchronize with other streams (if enabled for this stream)
-            self.sharedImageBuffer.sync(self.deviceUrl)
 
             # Capture frame ( if available)
             try:
-                frame = next(self.frames)
+                frameIndex, ptsTime, frame = next(self.frames)
             except StopIteration:
-                self.doStop = True
+                # Decoder was woken up by stop(): not the end of the stream
+                if self.isStopping():
+                    continue
+                self.stop()
+                # Processing thread drains the remaining frames, then stops
+                imageBuffer.close()
                 self.end.emit()
                 continue
 
             # Retrieve frame
-            self.update(frame)
-            frame = frame.to_ndarray(format='bgr24')
-            # Add frame to buffer
-            self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).add(frame, self.dropFrameIfBufferFull)
+            self.update(frameIndex, ptsTime)
+            # Align with other streams by recording time (if enabled for this stream): frame is dropped (0),
+            # added once or repeated
+            nCopies = self.sharedImageBuffer.sync(self.deviceUrl, self.video_date_time.timestamp())
+            if nCopies > 0:
+                # Scale and convert to BGR in a single swscale pass
+                bgrFrame = self.planeView(
+                    frame.reformat(width=self.outputWidth, height=self.outputHeight, format='bgr24'))
+                for _ in range(nCopies):
+                    # Write the converted frame straight into a recycled frame, no intermediate array (to_ndarray)
+                    # is allocated
+                    data = imageBuffer.acquire(bgrFrame.shape, bgrFrame.dtype)
+                    np.copyto(data, bgrFrame)
+                    # Add frame (with its metadata) to buffer
+                    imageBuffer.add(FrameData(data, self.video_date_time, frameIndex, time.time(), self.deviceUrl),
+                                    self.dropPolicy)
 
             self.statsData.nFramesProcessed += 1
-            # Inform GUI of updated statistics
-            self.updateStatisticsInGUI.emit(self.statsData)
-
-            # Limit fps
-            delta = self.defaultTime - self.t.elapsed()
-            # delta = self.defaultTime - self.captureTime
-            if delta > 0:
-                self.msleep(delta)
+            self.statsData.framePoolHits = imageBuffer.framePool.hits()
+            self.statsData.framePoolMisses = imageBuffer.framePool.misses()
+            self.statsData.droppedFrames = imageBuffer.droppedFrames()
+            self.statsData.nSyncDropped, self.statsData.nSyncDuplicated = \
+                self.sharedImageBuffer.syncStatistics(self.deviceUrl)
+            if self.demuxThread is not None:
+                self.statsData.packetQueueSize = self.demuxThread.packetQueue.size()
+                self.statsData.packetQueueBytes = self.demuxThread.packetQueue.bytes()
+            # Inform GUI of updated statistics (coalesced to DEFAULT_STATS_PUBLISH_RATE)
+            self.statsPublisher.publish(self.statsData)
+
+            # Limit fps (video files in turbo mode are only limited by the consumer)
+            if not self.turboMode:
+                delta = self.defaultTime - self.t.elapsed()
+                # delta = self.defaultTime - self.captureTime
+                if delta > 0:
+                    self.msleep(delta)
             # Save capture time
             self.captureTime = self.t.elapsed()
 
@@ -104,29 +135,58 @@ class CaptureThread(QThread):
             # Start timer (used to calculate capture rate)
             self.t.start()
 
+        # Final statistics of the stream
+        self.statsPublisher.publish(self.statsData, force=True)
         qDebug("Stopping capture thread...")
 
     def stop(self):
-        with QMutexLocker(self.doStopMutex):
-            self.doStop = True
+        super(CaptureThread, self).stop()
+        # Wake up the decoder if it waits for packets (e.g. dead live stream): frame_iter() ends without waiting
+        # for the next packet or the read timeout
+        demuxThread = self.demuxThread
+        if demuxThread is not None:
+            demuxThread.stop()
 
-    def connectToCamera(self):
+    def openStream(self):
         # Open camera
         # self.ctx = av.Codec('h264_cuvid', 'r').create()
         # hwaccel = {'device_type_name': 'cuda'}
         # self.video = av.open(self._deviceUrl,hwaccel=hwaccel)
-        self.video = av.open(self._deviceUrl)
-        streams = [s for s in self.video.streams if s.type == 'video']
-        streams = [streams[0]]
-        self.frames = self.frame_iter(self.video,streams)
-        self.total_frames = streams[0].frames
-        self.videofps = streams[0].average_rate
+        if self.liveStream:
+            options = dict(LIVE_STREAM_OPTIONS)
+            transport = RTSP_TRANSPORT_MODES[self.decoderSettings.transportMode]
+            if transport and self.deviceUrl.startswith('rtsp://'):
+                options['rtsp_transport'] = transport
+            self.video = av.open(self._deviceUrl, options=options,
+                                 timeout=(LIVE_STREAM_OPEN_TIMEOUT, LIVE_STREAM_READ_TIMEOUT))
+        else:
+            self.video = av.open(self._deviceUrl)
+        self.videoStream = self.video.streams.video[0]
+        # Enable multi-threaded decoding (must be set before the first packet is decoded)
+        self.videoStream.codec_context.thread_type = self.decoderSettings.threadType
+        self.videoStream.codec_context.thread_count = self.decoderSettings.threadCount
+        self.skipFrame = 'DEFAULT'
+        self.timeBase = self.videoStream.time_base
+
+    def connectToCamera(self):
+        try:
+            self.openStream()
+        except (av.error.FFmpegError, OSError) as e:
+            qDebug("[%s] ERROR: %s" % (self.deviceUrl, e))
+            return False
+        self.total_frames = self.videoStream.frames
+        self.videofps = self.videoStream.average_rate
+        self.startPts = self.videoStream.start_time or 0
         # self.ctx.extradata = streams[0].codec_context.extradata
-        # if self.skip_duration:
-        #     self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.videofps * self.skip_duration.total_seconds())
-        #     self.video_date_time = self.video_date_time + self.skip_duration
+        seekPts = None
+        if self.skip_duration:
+            seekPts = self.seekToSkipDuration(self.videoStream)
+        self.frames = self.frame_iter(seekPts)
 
         # Set resolution
+        self.setOutputResolution(self.videoStream.codec_context.width, self.videoStream.codec_context.height)
+        # Frames are BGR (3 bytes per pixel): resolution decides the share of the memory budget
+        self.sharedImageBuffer.setFrameBytes(self.deviceUrl, self.outputWidth * self.outputHeight * 3)
 
         try:
             self.defaultTime = int(1000 / self.videofps)
@@ -135,48 +195,158 @@ class CaptureThread(QThread):
         # Return result
         return True
 
+    def seekToSkipDuration(self, stream):
+        # Target position in stream time base units
+        seekPts = int(self.skip_duration.total_seconds() / stream.time_base) + self.startPts
+        # Jump to the nearest keyframe before the target (frames up to the target are decoded and discarded)
+        self.video.seek(seekPts, backward=True, any_frame=False, stream=stream)
+        # Timestamps continue from the skipped position (used if frames carry no pts)
+        self.frameIndex = int(round(self.skip_duration.total_seconds() * self.videofps))
+        self.video_date_time = self.starting_time + self.skip_duration
+        self.remain_video = self.video_date_time - self.starting_time
+        return seekPts
+
+    def reconnect(self):
+        backoff = LIVE_STREAM_RECONNECT_MIN_BACKOFF
+        while True:
+            # Back off on the state wait condition, so stop() interrupts the wait
+            with QMutexLocker(self.stateMutex):
+                if self.state == PipelineState.STOPPING:
+                    return False
+                self.stateChanged.wait(self.stateMutex, int(backoff * 1000))
+                if self.state == PipelineState.STOPPING:
+                    return False
+            qDebug("[%s] Reconnecting..." % self.deviceUrl)
+            try:
+                if self.video is not None:
+                    self.video.close()
+                self.openStream()
+                self.statsData.nReconnects += 1
+                return True
+            except (av.error.FFmpegError, OSError) as e:
+                qDebug("[%s] WARNING: Reconnect failed: %s" % (self.deviceUrl, e))
+                self.video = None
+                backoff = min(backoff * 2, LIVE_STREAM_RECONNECT_MAX_BACKOFF)
+
+    def startDemuxThread(self):
+        # Read packets ahead of the decoder in a separate thread
+        self.demuxThread = DemuxThread(self.video, self.videoStream, READ_AHEAD_PACKETS, READ_AHEAD_BYTES)
+        self.demuxThread.start()
+
+    def stopDemuxThread(self):
+        if self.demuxThread is not None:
+            self.demuxThread.stop()
+            self.demuxThread.wait()
+            self.demuxThread = None
+
     def disconnectCamera(self):
+        self.stopDemuxThread()
         # Camera is connected
-        if self.cap.isOpened():
+        if self.video is not None:
             # Disconnect camera
-            self.cap.release()
+            self.video.close()
+            self.video = None
             return True
         # Camera is NOT connected
         else:
             return False
 
     def isCameraConnected(self):
-        return self.cap.isOpened()
+        return self.video is not None
+
+    def setOutputResolution(self, sourceWidth, sourceHeight):
+        # Use source resolution if no resolution was requested (-1)
+        if self.width > 0 and self.height > 0:
+            self.outputWidth, self.outputHeight = self.width, self.height
+        # Keep aspect ratio if only one dimension was requested (rounded to even for chroma subsampling)
+        elif self.width > 0:
+            self.outputWidth = self.width
+            self.outputHeight = int(round(sourceHeight * self.width / sourceWidth / 2)) * 2
+        elif self.height > 0:
+            self.outputWidth = int(round(sourceWidth * self.height / sourceHeight / 2)) * 2
+            self.outputHeight = self.height
+        else:
+            self.outputWidth, self.outputHeight = sourceWidth, sourceHeight
 
     def getInputSourceWidth(self):
-        return self.video.streams.video[0].width
+        # Frames are scaled by the decoder, so this is the resolution of the frames in the buffer
+        return self.outputWidth
 
     def getInputSourceHeight(self):
-        return self.video.streams.video[0].height
+        return self.outputHeight
+
+    def planeView(self, bgrFrame):
+        # (height, width, 3) view of the pixels of a bgr24 av.VideoFrame (rows may be padded to line_size)
+        plane = bgrFrame.planes[0]
+        rows = np.frombuffer(plane, np.uint8).reshape(-1, plane.line_size)[:bgrFrame.height]
+        return rows[:, :bgrFrame.width * 3].reshape(bgrFrame.height, bgrFrame.width, 3)
 
     def updateFPS(self, timeElapsed):
-        # Add instantaneous FPS value to queue
-        if timeElapsed > 0:
-            self.fps.put(1000 / timeElapsed)
-            # Increment sample Number
-            self.sampleNumber += 1
-
-        # Maximum size of queue is DEFAULT_CAPTURE_FPS_STAT_QUEUE_LENGTH
-        if self.fps.qsize() > CAPTURE_FPS_STAT_QUEUE_LENGTH:
-            self.fps.get()
-        # Update FPS value every DEFAULT_CAPTURE_FPS_STAT_QUEUE_LENGTH samples
-        if self.fps.qsize() == CAPTURE_FPS_STAT_QUEUE_LENGTH and self.sampleNumber == CAPTURE_FPS_STAT_QUEUE_LENGTH:
-            # Empty queue and store sum
-            while not self.fps.empty():
-                self.fpsSum += self.fps.get()
-            # Calculate average FPS
-            self.statsData.averageFPS = self.fpsSum / CAPTURE_FPS_STAT_QUEUE_LENGTH
-            # Reset sum
-            self.fpsSum = 0.0
-            # Reset sample Number
-            self.sampleNumber = 0
-
-    def frame_iter(self,video,streams):
-        for packet in video.demux(streams):
-            for frame in packet.decode():
-                yield frame
\ No newline at end of file
+        # Running average of the instantaneous FPS
+        self.statsData.averageFPS = self.fps.update(timeElapsed)
+
+    def setSpeed(self, speed):
+        self.speed = speed
+
+    def updateLatency(self, frame):
+        # Delay of the frame relative to the first frame since (re)connecting: wall clock vs. stream clock
+        now = time.monotonic()
+        ptsTime = float(frame.pts * self.timeBase)
+        if self.latencyBase is None:
+            self.latencyBase = (now, ptsTime)
+        self.statsData.latency = int(((now - self.latencyBase[0]) - (ptsTime - self.latencyBase[1])) * 1000)
+
+    def frame_iter(self,seekPts=None):
+        # Index of the frame counted from the start of the video (frame.index restarts after a seek)
+        frameIndex = self.frameIndex
+        nextFrameIndex = frameIndex
+        indexOffset = 0
+        while True:
+            self.startDemuxThread()
+            try:
+                while True:
+                    packet = self.demuxThread.packetQueue.get()
+                    # End of stream, read error or demux thread stopped
+                    if packet is None:
+                        break
+                    # Let the decoder discard non-reference frames when playing fast (applied in this thread)
+                    skipFrame = 'NONREF' if self.speed >= SKIP_NONREF_FRAMES_MIN_SPEED else 'DEFAULT'
+                    if skipFrame != self.skipFrame:
+                        self.videoStream.codec_context.skip_frame = skipFrame
+                        self.skipFrame = skipFrame
+                    for frame in packet.decode():
+                        # Decode forward from the keyframe, only hand out frames from the seek target on
+                        if seekPts is not None and frame.pts is not None and frame.pts < seekPts:
+                            continue
+                        if frame.pts is not None:
+                            # First frame after a reconnect: continue counting from the last frame
+                            if self.startPts is None:
+                                self.startPts = frame.pts
+                                indexOffset = frameIndex
+                            # Seconds from the start of the video (sessions after a reconnect follow on)
+                            ptsTime = float(indexOffset / self.videofps + (frame.pts - self.startPts) * self.timeBase)
+                            frameIndex = int(round(ptsTime * self.videofps))
+                            if self.liveStream:
+                                self.updateLatency(frame)
+                        else:
+                            ptsTime = float(frameIndex / self.videofps)
+                        # Speed-up: hand out every speed-th frame, the rest are never converted or buffered
+                        if frameIndex >= nextFrameIndex:
+                            nextFrameIndex = frameIndex + self.speed
+                            yield frameIndex, ptsTime, frame
+                        frameIndex += 1
+            except (av.error.FFmpegError, OSError) as e:
+                # Decode error
+                qDebug("[%s] WARNING: %s" % (self.deviceUrl, e))
+            if self.demuxThread.error is not None:
+                # Read error
+                qDebug("[%s] WARNING: %s" % (self.deviceUrl, self.demuxThread.error))
+            self.stopDemuxThread()
+            # End of stream (or dropped connection) of a live stream: reconnect with backoff
+            if not self.liveStream or not self.reconnect():
+                return
+            # Timestamps of the new session restart, rebase them on its first frame
+            self.startPts = None
+            self.latencyBase = None
+            seekPts = None
+            nextFrameIndex = frameIndex
@@ -16,18 +16,82 @@ DEFAULT_RTSP_PORT = ''
 DEFAULT_RTSP_CAHHELS = ''
 
 # Rtsp transport mode
-DEFAULT_TRANSPORT_MODE = 0  # 0 -> none, 1 -> unicast, 2 -> multicast
+DEFAULT_TRANSPORT_MODE = 0  # 0 -> none, 1 -> unicast, 2 -> multicast, 3 -> tcp
+# FFmpeg rtsp_transport option per transport mode (None -> let FFmpeg decide)
+RTSP_TRANSPORT_MODES = [None, 'udp', 'udp_multicast', 'tcp']
 
-# FPS statistics queue lengths
-PROCESSING_FPS_STAT_QUEUE_LENGTH = 32
-CAPTURE_FPS_STAT_QUEUE_LENGTH = 32
+# Demux read-ahead (packets queued between the demux thread and the decoder)
+READ_AHEAD_PACKETS = 256
+READ_AHEAD_BYTES = 32 * 1024 * 1024
+
+# Live stream ingest (network urls)
+# Low-latency demuxer options: no input buffering, small probe, no reordering
+LIVE_STREAM_OPTIONS = {'fflags': 'nobuffer',
+                       'flags': 'low_delay',
+                       'probesize': '32768',
+                       'analyzeduration': '0',
+                       'reorder_queue_size': '0',
+                       'max_delay': '500000'}
+# Timeouts in seconds for opening the stream and for reading from it
+LIVE_STREAM_OPEN_TIMEOUT = 10
+LIVE_STREAM_READ_TIMEOUT = 5
+# Reconnection backoff in seconds (doubles after every failed attempt)
+LIVE_STREAM_RECONNECT_MIN_BACKOFF = 1
+LIVE_STREAM_RECONNECT_MAX_BACKOFF = 30
+
+# FPS statistics smoothing (EWMA weight of the newest sample, 2 / (32 + 1) ~ averaging the last 32 frames)
+PROCESSING_FPS_STAT_ALPHA = 2 / (32 + 1)
+CAPTURE_FPS_STAT_ALPHA = 2 / (32 + 1)
+PROCESSING_STAGE_TIME_STAT_ALPHA = 2 / (32 + 1)
+# Processing stages run on cv2.UMat (OpenCL transparent API, GPU or CPU runtimes such as PoCL) if OpenCL is available,
+# e.g. ('smooth', 'dilate', 'erode', 'canny'). Only enable stages that win in tools/benchmark_stages.py.
+PROCESSING_UMAT_STAGES = ()
+# Statistics are pushed to the GUI at most this many times per second (0 -> every frame)
+DEFAULT_STATS_PUBLISH_RATE = 4
 
 # Image buffer size
 DEFAULT_IMAGE_BUFFER_SIZE = 10
-# Drop frame if image/frame buffer is full
-DEFAULT_DROP_FRAMES = False
+# Frame memory (bytes) of all image buffers together, divided across streams by resolution and priority
+DEFAULT_FRAME_MEMORY_BUDGET = 1024 * 1024 * 1024
+# Share of a stream in the frame memory budget (relative to the other streams)
+DEFAULT_STREAM_MEMORY_PRIORITY = 1
+# Frames held outside the image buffer at any time (1 being captured, 2 being processed: input + ROI copy)
+FRAME_POOL_IN_FLIGHT_FRAMES = 3
+# What to do with frames if image/frame buffer is full
+DEFAULT_DROP_POLICY = 'AUTO'  # Options: ['AUTO', 'BLOCK', 'DROP_OLDEST', 'DROP_NEWEST', 'KEEP_LATEST', 'EVERY_NTH']
+# EVERY_NTH policy: while the buffer is full only every Nth frame is kept
+DEFAULT_DROP_EVERY_NTH = 3
+# Turbo mode: do not pace video files at their native fps (blocks instead of dropping frames)
+DEFAULT_TURBO_MODE = False
 # ApiPreference for OpenCv.VideoCapture
 DEFAULT_APIPREFERENCE = 'CAP_ANY'
+# Decoder threading (PyAV/FFmpeg). tools/benchmark_decode.py on data/video/test.mp4 (H.264 1080p, 302 frames,
+# 1 core): NONE/1 145-189 fps, FRAME/0 152-153 fps, AUTO/0 176-202 fps. No setting is slower than single-threaded
+# decoding beyond run-to-run noise (~20%) on one core; AUTO/0 lets FFmpeg add frame/slice threads where cores exist.
+DEFAULT_DECODE_THREAD_TYPE = 'AUTO'  # Options: ['NONE', 'SLICE', 'FRAME', 'AUTO']
+DEFAULT_DECODE_THREAD_COUNT = 0  # 0 -> let FFmpeg pick based on the number of cores
+# Playback speed-up: decoder discards non-reference frames from this speed on
+SKIP_NONREF_FRAMES_MIN_SPEED = 4
+# Parallel segment processing of video files (SegmentProcessing.py)
+DEFAULT_SEGMENT_OVERLAP = 10  # Seconds decoded before each segment to warm up the tracker
+DEFAULT_SEGMENT_DEDUP_TOLERANCE = 2  # Seconds within which boundary events are treated as duplicates
+# Stream synchronization: largest timestamp difference (s) between aligned frames of two streams
+STREAM_SYNC_SKEW_TOLERANCE = 0.05
+# Stream synchronization: longest wait (ms) for a lagging stream before the others go on without it
+STREAM_SYNC_MAX_WAIT = 2000
+# Stream synchronization: most repeats of a frame of a slower stream
+STREAM_SYNC_MAX_DUPLICATES = 4
+# Processing: frames taken from the image buffer at once when processing falls behind (detector/ReID batch)
+PROCESSING_MAX_BATCH_SIZE = 4
+# Processing: time to wait for more frames to fill a batch in ms (0 -> only take frames already queued)
+PROCESSING_BATCH_TIMEOUT = 0
+# Longest wait (ms) of a pipeline thread for a frame before it checks for pause/stop again
+PIPELINE_WAIT_TIMEOUT = 100
+# Processing: default worker threads per camera running the stateless stages (filters) on several frames at once
+# (1 -> frames are processed one at a time by the processing thread). Stateful stages (tracker) stay serialized.
+PROCESSING_WORKERS = 1
+# Processing: frames in flight in the worker pool, emitted in capture order (bounds the added latency)
+PROCESSING_REORDER_WINDOW = 8
 # Thread priorities
 DEFAULT_CAP_THREAD_PRIO = QThread.NormalPriority
 DEFAULT_PROC_THREAD_PRIO = QThread.HighestPriority
@@ -0,0 +1,81 @@
+from PyQt5.QtCore import QThread, QMutexLocker, QMutex, QWaitCondition, qDebug
+from collections import deque
+import av
+
+
+class PacketQueue(object):
+    def __init__(self, maxPackets, maxBytes):
+        # Save read-ahead limits
+        self.maxPackets = maxPackets
+        self.maxBytes = maxBytes
+        # Create mutex and wait conditions
+        self.queueProtect = QMutex()
+        self.notEmpty = QWaitCondition()
+        self.notFull = QWaitCondition()
+        # Queued packets and their total size
+        self.packets = deque()
+        self.nBytes = 0
+        self.closed = False
+
+    def put(self, packet):
+        size = packet.size if packet is not None else 0
+        with QMutexLocker(self.queueProtect):
+            # Wait for room (a single packet larger than maxBytes is still accepted into an empty queue)
+            while not self.closed and self.packets and (len(self.packets) >= self.maxPackets
+                                                        or self.nBytes + size > self.maxBytes):
+                self.notFull.wait(self.queueProtect)
+            if self.closed:
+                return False
+            self.packets.append(packet)
+            self.nBytes += size
+            self.notEmpty.wakeOne()
+            return True
+
+    def get(self):
+        with QMutexLocker(self.queueProtect):
+            while not self.closed and not self.packets:
+                self.notEmpty.wait(self.queueProtect)
+            if not self.packets:
+                return None
+            packet = self.packets.popleft()
+            self.nBytes -= packet.size if packet is not None else 0
+            self.notFull.wakeOne()
+            return packet
+
+    def close(self):
+        # Wake up all waiting threads, put() fails from now on
+        with QMutexLocker(self.queueProtect):
+            self.closed = True
+            self.notEmpty.wakeAll()
+            self.notFull.wakeAll()
+
+    def size(self):
+        return len(self.packets)
+
+    def bytes(self):
+        return self.nBytes
+
+
+class DemuxThread(QThread):
+    def __init__(self, container, stream, maxPackets, maxBytes, parent=None):
+        super(DemuxThread, self).__init__(parent)
+        self.container = container
+        self.stream = stream
+        self.packetQueue = PacketQueue(maxPackets, maxBytes)
+        # Exception that ended demuxing (None: end of stream)
+        self.error = None
+
+    def run(self):
+        try:
+            for packet in self.container.demux(self.stream):
+                # Flush packets (no data) are queued as well, they drain the decoder at the end of the stream
+                if not self.packetQueue.put(packet):
+                    break
+        except (av.error.FFmpegError, OSError) as e:
+            self.error = e
+        # End of stream marker
+        self.packetQueue.put(None)
+        qDebug("Stopping demux thread...")
+
+    def stop(self):
+        self.packetQueue.close()
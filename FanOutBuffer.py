@@ -0,0 +1,158 @@
+from PyQt5.QtCore import QMutexLocker, QMutex
+import numpy as np
+
+from FramePool import FramePool
+from RingBuffer import RingBuffer
+from Structures import DropPolicy, FrameData
+from Config import FRAME_POOL_IN_FLIGHT_FRAMES, DEFAULT_DROP_EVERY_NTH
+
+
+class FanOutBuffer(object):
+    # Image buffer of one capture with several consumers (e.g. two views of the same camera). Every consumer
+    # reads from its own RingBuffer (cursor) with its own drop policy; frames are not copied per consumer but
+    # shared (read-only) through the frame pool and recycled once every consumer released them. BLOCK consumers
+    # apply backpressure to the producer (and so pace every consumer of the capture), the other consumers drop
+    # frames by their own policy.
+    def __init__(self, size, everyNth=DEFAULT_DROP_EVERY_NTH):
+        # Default size of the consumer buffers
+        self.bufferSize = size
+        self.everyNth = everyNth
+        # Frames that may be queued by all consumers together (lowered by the memory budget of SharedImageBuffer),
+        # every consumer gets an equal part
+        self.capacity = size
+        # Consumer id -> (RingBuffer, drop policy or None to use the policy of the producer)
+        self.consumers = dict()
+        self.consumersProtect = QMutex()
+        self.closed = False
+        # Drop policy of the producer, used by the consumers without their own policy
+        self.dropPolicy = DropPolicy.BLOCK
+        # Pool shared by all consumer buffers
+        self.framePool = FramePool(self.bufferSize + FRAME_POOL_IN_FLIGHT_FRAMES)
+
+    def addConsumer(self, consumerId, size=None, dropPolicy=None):
+        # Returns the RingBuffer the consumer reads from
+        consumerBuffer = RingBuffer(size or self.bufferSize, self.everyNth, self.framePool)
+        if self.closed:
+            consumerBuffer.close()
+        with QMutexLocker(self.consumersProtect):
+            self.consumers[consumerId] = (consumerBuffer, dropPolicy)
+            self.divideCapacity()
+        return consumerBuffer
+
+    def removeConsumer(self, consumerId):
+        with QMutexLocker(self.consumersProtect):
+            consumerBuffer, _ = self.consumers.pop(consumerId)
+            self.divideCapacity()
+        # Release the producer if it is waiting for this consumer, queued frames are released
+        consumerBuffer.close()
+        consumerBuffer.clear()
+
+    def getConsumer(self, consumerId):
+        return self.consumers[consumerId][0]
+
+    def setDropPolicy(self, dropPolicy):
+        self.dropPolicy = dropPolicy
+
+    def dropPolicyOf(self, consumerId):
+        # Policy the frames of the consumer are added with
+        consumerDropPolicy = self.consumers[consumerId][1]
+        return self.dropPolicy if consumerDropPolicy is None else consumerDropPolicy
+
+    def nConsumers(self):
+        return len(self.consumers)
+
+    def divideCapacity(self):
+        # Called with consumersProtect locked. Consumers that fall behind at different rates hold different
+        # frames: together they queue at most capacity distinct frames.
+        consumerCapacity = max(1, self.capacity // max(1, len(self.consumers)))
+        for consumerBuffer, _ in self.consumers.values():
+            consumerBuffer.setCapacity(consumerCapacity)
+        self.resizeFramePool()
+
+    def resizeFramePool(self):
+        # Called with consumersProtect locked. Frames queued by all consumers + frames in flight
+        self.framePool.setMaxSize(sum(consumerBuffer.maxSize() for consumerBuffer, _ in self.consumers.values()) +
+                                  FRAME_POOL_IN_FLIGHT_FRAMES * (len(self.consumers) + 1))
+
+    def acquire(self, shape, dtype=np.uint8):
+        # Recycled frame to write a new frame into (to be added to this buffer)
+        return self.framePool.acquire(shape, dtype)
+
+    def copy(self, data):
+        # Copy data into a recycled frame (to be added to this buffer)
+        return self.framePool.copy(data)
+
+    def add(self, data, dropPolicy=None, timeout=-1):
+        # dropPolicy: policy of the consumers without their own policy (None: setDropPolicy). Returns False if no
+        # consumer queued the frame.
+        if not isinstance(data, FrameData):
+            raise TypeError("FanOutBuffer items must be FrameData, not %s" % type(data).__name__)
+        if dropPolicy is None:
+            dropPolicy = self.dropPolicy
+        with QMutexLocker(self.consumersProtect):
+            consumers = [(consumerBuffer, dropPolicy if consumerDropPolicy is None else consumerDropPolicy)
+                         for consumerBuffer, consumerDropPolicy in self.consumers.values()]
+        if self.closed or not consumers:
+            self.framePool.release(data.data)
+            return False
+        # Every consumer releases the frame once (queued and taken, dropped or closed). The frame of a single
+        # consumer stays writable: it may draw on it in place.
+        if len(consumers) > 1:
+            self.framePool.share(data.data, len(consumers))
+            # Consumers that drop get the frame before the producer waits for the BLOCK consumers
+            consumers.sort(key=lambda consumer: consumer[1] == DropPolicy.BLOCK)
+        queued = False
+        for consumerBuffer, consumerDropPolicy in consumers:
+            queued = consumerBuffer.add(data, consumerDropPolicy, timeout) or queued
+        return queued
+
+    def droppedFrames(self):
+        # Number of dropped frames per reason, summed over all consumers
+        nDropped = dict.fromkeys(DropPolicy.REASONS, 0)
+        for consumerBuffer in self.consumerBuffers():
+            for reason, n in consumerBuffer.droppedFrames().items():
+                nDropped[reason] += n
+        return nDropped
+
+    def consumerBuffers(self):
+        with QMutexLocker(self.consumersProtect):
+            return [consumerBuffer for consumerBuffer, _ in self.consumers.values()]
+
+    def clear(self):
+        cleared = False
+        for consumerBuffer in self.consumerBuffers():
+            cleared = consumerBuffer.clear() or cleared
+        return cleared
+
+    def setCapacity(self, capacity):
+        self.capacity = capacity
+        with QMutexLocker(self.consumersProtect):
+            self.divideCapacity()
+
+    def bytesInUse(self):
+        # Memory of queued frames (counted once however many consumers hold them) and of free frames
+        frames = {id(frame): frame.nbytes for consumerBuffer in self.consumerBuffers()
+                  for frame in consumerBuffer.queuedFrames()}
+        return sum(frames.values()) + self.framePool.nbytes()
+
+    def close(self):
+        # End of stream: consumers get the remaining frames, then None
+        self.closed = True
+        for consumerBuffer in self.consumerBuffers():
+            consumerBuffer.close()
+
+    def isClosed(self):
+        return self.closed
+
+    def size(self):
+        # Fill level of the fullest consumer buffer
+        return max([consumerBuffer.size() for consumerBuffer in self.consumerBuffers()] or [0])
+
+    def maxSize(self):
+        return max([consumerBuffer.maxSize() for consumerBuffer in self.consumerBuffers()] or [self.capacity])
+
+    def isFull(self):
+        return any(consumerBuffer.isFull() for consumerBuffer in self.consumerBuffers())
+
+    def isEmpty(self):
+        return self.size() == 0
@@ -0,0 +1,91 @@
+from PyQt5.QtCore import QMutexLocker, QMutex
+import numpy as np
+
+
+class FramePool(object):
+    def __init__(self, size):
+        # Save pool size (maximum number of free frames kept per frame shape)
+        self.poolSize = size
+        # Create mutex
+        self.poolProtect = QMutex()
+        # Free frames by (shape, dtype)
+        self.freeFrames = dict()
+        # Shared (read-only) frames: id -> [frame, number of holders that did not release it yet]. The pool keeps
+        # the frame alive, so its id cannot be reused by a new array while the count is held.
+        self.references = dict()
+        # Statistics
+        self.nHits = 0
+        self.nMisses = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype))
+        with QMutexLocker(self.poolProtect):
+            frames = self.freeFrames.get(key)
+            # Reuse a released frame
+            if frames:
+                self.nHits += 1
+                return frames.pop()
+            self.nMisses += 1
+        # Pool is empty (or stream resolution changed): allocate a new frame. Frames are allocated on demand instead
+        # of up front (the shape is only known from the first frame): every frame is either queued, in flight or
+        # free, so after the first (buffer capacity + frames in flight) misses the pool serves every frame.
+        return np.empty(shape, dtype)
+
+    def share(self, frame, nReferences):
+        # Frame is handed to nReferences holders (e.g. consumers of one capture): it is read-only until
+        # every holder released it, then it is recycled
+        frame.flags.writeable = False
+        with QMutexLocker(self.poolProtect):
+            self.references[id(frame)] = [frame, nReferences]
+
+    def release(self, frame):
+        if frame is None or frame.base is not None:
+            return
+        with QMutexLocker(self.poolProtect):
+            reference = self.references.get(id(frame))
+            if reference is not None:
+                # Other holders still use the shared frame
+                if reference[1] > 1:
+                    reference[1] -= 1
+                    return
+                del self.references[id(frame)]
+                frame.flags.writeable = True
+        # Only whole, writable frames can be recycled (not views of other frames)
+        if not frame.flags.writeable:
+            return
+        key = (frame.shape, frame.dtype)
+        with QMutexLocker(self.poolProtect):
+            frames = self.freeFrames.setdefault(key, [])
+            if len(frames) < self.poolSize:
+                frames.append(frame)
+
+    def copy(self, data):
+        # Copy data into a pooled frame (replacement for data.copy())
+        frame = self.acquire(data.shape, data.dtype)
+        np.copyto(frame, data)
+        return frame
+
+    def setMaxSize(self, size):
+        # Shrink/grow the pool (free frames above the new size are freed)
+        with QMutexLocker(self.poolProtect):
+            self.poolSize = size
+            for frames in self.freeFrames.values():
+                del frames[size:]
+
+    def nbytes(self):
+        # Memory held by free frames
+        with QMutexLocker(self.poolProtect):
+            return sum(frame.nbytes for frames in self.freeFrames.values() for frame in frames)
+
+    def clear(self):
+        with QMutexLocker(self.poolProtect):
+            self.freeFrames.clear()
+
+    def maxSize(self):
+        return self.poolSize
+
+    def hits(self):
+        return self.nHits
+
+    def misses(self):
+        return self.nMisses
@@ -0,0 +1,72 @@
+import cv2
+
+
+class FramePyramid(object):
+    # Resolutions of one frame, computed on first use and shared by all consumers of the frame (detector,
+    # ReID patches, display, custom stages). A resolution is resampled from the smallest one already computed
+    # that is at least as large, not from the full frame.
+    def __init__(self, frame):
+        self.frame = frame
+        # (width, height) -> resampled frame
+        self.resolutions = dict()
+
+    def size(self):
+        return self.frame.shape[1], self.frame.shape[0]
+
+    def resize(self, width, height, interpolation=cv2.INTER_LINEAR):
+        # Frame resampled to width x height (any aspect ratio), computed at most once
+        resized = self.resolutions.get((width, height))
+        if resized is None:
+            source, _ = self.source(width / self.frame.shape[1], height / self.frame.shape[0])
+            resized = cv2.resize(source, (width, height), interpolation=interpolation)
+            self.resolutions[(width, height)] = resized
+        return resized
+
+    def level(self, n):
+        # Level n of the Gaussian pyramid (1/2**n of the frame size), levels are built from each other
+        image = self.frame
+        width, height = self.size()
+        for _ in range(n):
+            width, height = (width + 1) // 2, (height + 1) // 2
+            downsampled = self.resolutions.get((width, height))
+            if downsampled is None:
+                downsampled = cv2.pyrDown(image)
+                self.resolutions[(width, height)] = downsampled
+            image = downsampled
+        return image
+
+    def levelFor(self, minScale):
+        # Smallest pyramid level with a scale of at least minScale. Returns (image, scale), e.g. to crop patches
+        # of a known resolution; the level is built once and shared.
+        n = 0
+        while 0.5 ** (n + 1) >= minScale:
+            n += 1
+        image = self.level(n)
+        return image, image.shape[0] / self.frame.shape[0]
+
+    def fitted(self, width, height):
+        # Frame scaled to fit into width x height keeping the aspect ratio (never enlarged), e.g. for display
+        frameWidth, frameHeight = self.size()
+        scale = min(width / frameWidth, height / frameHeight, 1.0)
+        if scale == 1.0:
+            return self.frame
+        return self.resize(max(1, int(frameWidth * scale)), max(1, int(frameHeight * scale)), cv2.INTER_AREA)
+
+    def source(self, minScaleX, minScaleY=None):
+        # Smallest computed resolution with the aspect ratio of the frame and a scale of at least minScaleX
+        # (minScaleY) in each direction. Returns (image, scale), the full frame has scale 1.
+        minScaleY = minScaleX if minScaleY is None else minScaleY
+        frameWidth, frameHeight = self.size()
+        best, bestScale = self.frame, 1.0
+        for (width, height), image in self.resolutions.items():
+            scaleX, scaleY = width / frameWidth, height / frameHeight
+            # Same aspect ratio (within rounding of one pixel)
+            if abs(scaleX * frameHeight - height) > 1:
+                continue
+            if scaleX >= minScaleX and scaleY >= minScaleY and scaleX < bestScale:
+                best, bestScale = image, scaleX
+        return best, bestScale
+
+    def invalidate(self):
+        # Frame was modified in place (e.g. drawn on): resolutions computed so far are outdated
+        self.resolutions.clear()
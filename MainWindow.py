@@ -5,7 +5,6 @@ from ui_MainWindow import Ui_MainWindow
 from SharedImageBuffer import SharedImageBuffer
 from CameraConnectDialog import CameraConnectDialog
 from CameraView import CameraView
-from Buffer import *
 from Config import *
 
 
@@ -14,8 +13,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         super(MainWindow, self).__init__(parent)
         # Setup UI
         self.setupUi(self)
-        # Create dict instead of QMap
-        self.deviceUrlDict = dict()
+        # Create dict instead of QMap (keyed by camera id: a device may be open in several tabs)
+        self.tabIndexDict = dict()
         self.cameraViewDict = dict()
         # Set start tab as blank
         newTab = QLabel(self.tabWidget)
@@ -43,7 +42,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     def connectToCamera(self):
         # We cannot connect to a camera if devices are already connected and stream synchronization is in progress
         if (self.actionSynchronizeStreams.isChecked()
-                and len(self.deviceUrlDict) > 0
+                and len(self.tabIndexDict) > 0
                 and self.sharedImageBuffer.getSyncEnabled()):
             # Prompt user
             QMessageBox.warning(self, "pyqt5-cv2-multithreaded",
@@ -54,85 +53,86 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # Attempt to connect to camera
         else:
             # Get next tab index
-            nextTabIndex = 0 if len(self.deviceUrlDict) == 0 else self.tabWidget.count()
+            nextTabIndex = 0 if len(self.tabIndexDict) == 0 else self.tabWidget.count()
             # Show dialog
             cameraConnectDialog = CameraConnectDialog(self, self.actionSynchronizeStreams.isChecked())
             if cameraConnectDialog.exec() == QDialog.Accepted:
                 # Save user-defined device deviceUrl
                 deviceUrl = cameraConnectDialog.getDeviceUrl()
-                # Check if this camera is already connected
-                if deviceUrl not in self.deviceUrlDict:
+                # Check if this camera is already connected: another tab then shares its capture thread
+                openCameraView = self.getCameraViewByDeviceUrl(deviceUrl)
+                if openCameraView is None:
                     # Create ImageBuffer with user-defined size
-                    imageBuffer = Buffer(cameraConnectDialog.getImageBufferSize())
+                    imageBuffer = self.sharedImageBuffer.createImageBuffer(cameraConnectDialog.getImageBufferSize())
                     # Add created ImageBuffer to SharedImageBuffer object
                     self.sharedImageBuffer.add(deviceUrl, imageBuffer, self.actionSynchronizeStreams.isChecked())
-                    # Create CameraView
-                    cameraView = CameraView(self.tabWidget, deviceUrl, self.sharedImageBuffer, self.cameraNum)
-
-                    # Check if stream synchronization is enabled
-                    if self.actionSynchronizeStreams.isChecked():
-                        # Prompt user
-                        ret = QMessageBox.question(self, "pyqt5-cv2-multithreaded",
-                                                   "Stream synchronization is enabled.\n\n"
-                                                   "Do you want to start processing?\n\n"
-                                                   "Choose 'No' if you would like to open "
-                                                   "additional streams.",
-                                                   QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
-                        # Start processing
-                        if ret == QMessageBox.Yes:
-                            self.sharedImageBuffer.setSyncEnabled(True)
-                        # Defer processing
-                        else:
-                            self.sharedImageBuffer.setSyncEnabled(False)
-
-                    # Attempt to connect to camera
-                    if cameraView.connectToCamera(
-                            cameraConnectDialog.getDropFrameCheckBoxState(),
-                            cameraConnectDialog.getApiPreference(),
-                            cameraConnectDialog.getCaptureThreadPrio(),
-                            cameraConnectDialog.getProcessingThreadPrio(),
-                            cameraConnectDialog.getEnableFrameProcessingCheckBoxState(),
-                            cameraConnectDialog.getResolutionWidth(),
-                            cameraConnectDialog.getResolutionHeight(),
-                            cameraConnectDialog.getVideoSetting()):
-
-                        self.cameraNum += 1
-                        # Save tab label
-                        tabLabel = cameraConnectDialog.getTabLabel()
-                        # Allow tabs to be closed
-                        self.tabWidget.setTabsClosable(True)
-                        # If start tab, remove
-                        if nextTabIndex == 0:
-                            self.tabWidget.removeTab(0)
-                        # Add tab
-                        self.tabWidget.addTab(cameraView, '%s [%s]' % (tabLabel, deviceUrl))
-                        self.tabWidget.setCurrentWidget(cameraView)
-                        # Set tooltips
-                        self.setTabCloseToolTips(self.tabWidget, "Disconnect Camera")
-                        # Prevent user from enabling/disabling stream synchronization
-                        # after a camera has been connected
-                        self.actionSynchronizeStreams.setEnabled(False)
-                        # Add to map
-                        self.cameraViewDict[deviceUrl] = cameraView
-                        self.deviceUrlDict[deviceUrl] = nextTabIndex
-                    # Could not connect to camera
+                # Create CameraView
+                cameraView = CameraView(self.tabWidget, deviceUrl, self.sharedImageBuffer, self.cameraNum)
+
+                # Check if stream synchronization is enabled (new stream)
+                if self.actionSynchronizeStreams.isChecked() and openCameraView is None:
+                    # Prompt user
+                    ret = QMessageBox.question(self, "pyqt5-cv2-multithreaded",
+                                               "Stream synchronization is enabled.\n\n"
+                                               "Do you want to start processing?\n\n"
+                                               "Choose 'No' if you would like to open "
+                                               "additional streams.",
+                                               QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+                    # Start processing
+                    if ret == QMessageBox.Yes:
+                        self.sharedImageBuffer.setSyncEnabled(True)
+                    # Defer processing
                     else:
-                        # Display error message
-                        QMessageBox.warning(self,
-                                            "ERROR:",
-                                            "Could not connect to camera. "
-                                            "Please check device deviceUrl.")
-                        # Explicitly delete widget
-                        cameraView.delete()
-                        # Remove from shared buffer
-                        self.sharedImageBuffer.removeByDeviceUrl(deviceUrl)
-                        # Explicitly delete ImageBuffer object
-                        del imageBuffer
-                # Display error message
+                        self.sharedImageBuffer.setSyncEnabled(False)
+
+                # Attempt to connect to camera
+                if cameraView.connectToCamera(
+                        cameraConnectDialog.getDropPolicy(),
+                        cameraConnectDialog.getApiPreference(),
+                        cameraConnectDialog.getCaptureThreadPrio(),
+                        cameraConnectDialog.getProcessingThreadPrio(),
+                        cameraConnectDialog.getEnableFrameProcessingCheckBoxState(),
+                        cameraConnectDialog.getResolutionWidth(),
+                        cameraConnectDialog.getResolutionHeight(),
+                        cameraConnectDialog.getVideoSetting(),
+                        cameraConnectDialog.getDecoderSettings(),
+                        cameraConnectDialog.getImageBufferSize(),
+                        None if openCameraView is None else openCameraView.captureThread,
+                        cameraConnectDialog.getProcessingWorkers()):
+
+                    self.cameraNum += 1
+                    # Save tab label
+                    tabLabel = cameraConnectDialog.getTabLabel()
+                    # Allow tabs to be closed
+                    self.tabWidget.setTabsClosable(True)
+                    # If start tab, remove
+                    if nextTabIndex == 0:
+                        self.tabWidget.removeTab(0)
+                    # Add tab
+                    self.tabWidget.addTab(cameraView, '%s [%s]' % (tabLabel, deviceUrl))
+                    self.tabWidget.setCurrentWidget(cameraView)
+                    # Set tooltips
+                    self.setTabCloseToolTips(self.tabWidget, "Disconnect Camera")
+                    # Prevent user from enabling/disabling stream synchronization
+                    # after a camera has been connected
+                    self.actionSynchronizeStreams.setEnabled(False)
+                    # Add to map
+                    self.cameraViewDict[cameraView.cameraId] = cameraView
+                    self.tabIndexDict[cameraView.cameraId] = nextTabIndex
+                # Could not connect to camera
                 else:
+                    # Display error message
                     QMessageBox.warning(self,
                                         "ERROR:",
-                                        "Could not connect to camera. Already connected.")
+                                        "Could not connect to camera. "
+                                        "Please check device deviceUrl.")
+                    # Explicitly delete widget
+                    cameraView.delete()
+                    # Remove from shared buffer (unless it feeds another tab)
+                    if openCameraView is None:
+                        self.sharedImageBuffer.removeByDeviceUrl(deviceUrl)
+                        # Explicitly delete ImageBuffer object
+                        del imageBuffer
 
     def disconnectCamera(self, index):
         # Local variable(s)
@@ -164,19 +164,19 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             # Close tab
             self.tabWidget.removeTab(index)
 
-            # get deviceUrl (key of dict)
-            deviceUrl = self.getFromDictByTabIndex(self.deviceUrlDict, index)
+            # get camera id (key of dict)
+            cameraId = self.getFromDictByTabIndex(self.tabIndexDict, index)
 
             # Delete widget (CameraView) contained in tab
-            self.cameraViewDict[deviceUrl].delete()
+            self.cameraViewDict[cameraId].delete()
 
             # Remove from dict
-            self.cameraViewDict.pop(deviceUrl)
-            self.deviceUrlDict.pop(deviceUrl)
+            self.cameraViewDict.pop(cameraId)
+            self.tabIndexDict.pop(cameraId)
 
             # Update map (if tab closed is not last)
             if index != (nTabs - 1):
-                self.updateDictValues(self.deviceUrlDict, index)
+                self.updateDictValues(self.tabIndexDict, index)
 
             # If start tab, set tab as blank
             if nTabs == 1:
@@ -193,6 +193,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
                                 "Contact: vineshmajethiya@gmail.com\n"
                                 "Version: %s\n\n" % APP_VERSION)
 
+    def getCameraViewByDeviceUrl(self, deviceUrl):
+        # Connected CameraView showing the device (first opened), None if the device is not open
+        for cameraView in self.cameraViewDict.values():
+            if cameraView.deviceUrl == deviceUrl:
+                return cameraView
+        return None
+
     def getFromDictByTabIndex(self, dic, tabIndex):
         for k, v in dic.items():
             if v == tabIndex:
@@ -2,7 +2,6 @@ import time
 import os
 import tensorflow as tf
 from datetime import timedelta,datetime
-from PyQt5 import QtCore, QtGui, QtWidgets
 from shapely.geometry import Point, Polygon
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
@@ -22,6 +21,7 @@ from deep_sort import preprocessing, nn_matching
 from deep_sort.detection import Detection
 from deep_sort.tracker import Tracker
 from tools import generate_detections as gdet
+from FramePyramid import FramePyramid
 
 class FLAGS:
     framework = 'tf'
@@ -143,29 +143,8 @@ def snapshot(frame,direction,counter,bbox,tm,tempimgdir):
     path = os.path.join(tempimgdir, f"{dt_string}_{counter}_{direction}.png")
     status = cv2.imwrite(path, frame)
 
-def vehicle_entry(counter,tm,direction,class_name):
-    dt_string = tm.strftime('%Y-%m-%d_%H:%M:%S')
-    item = QtWidgets.QListWidgetItem()
-    font = QtGui.QFont()
-    font.setBold(False)
-    font.setItalic(False)
-    font.setUnderline(False)
-    font.setWeight(50)
-    font.setStrikeOut(False)
-    font.setKerning(False)
-    item.setFont(font)
-    brush = QtGui.QBrush(QtGui.QColor(0, 0, 0))
-    brush.setStyle(QtCore.Qt.NoBrush)
-    item.setBackground(brush)
-    brush = QtGui.QBrush(QtGui.QColor(255, 0, 0))
-    brush.setStyle(QtCore.Qt.NoBrush)
-    item.setForeground(brush)
-    item.setText(f"{dt_string}_{direction}_{class_name}")
-    self.camera_view.vehicle_list.insertItem(0,item)
-    return f"{dt_string}_{direction}_{class_name}"
-
 class DeepSortApp:
-    def __init__(self,camera_view):
+    def __init__(self, vehicleCounted=None, recordEvents=False):
         # Definition of the parameters
         self.max_cosine_distance = 0.4
         self.nn_budget = None
@@ -175,13 +154,15 @@ class DeepSortApp:
         self.tracker_list = CustomTrackerList()
         # initialize deep sort
         self.model_filename = 'model_data/mars-small128.pb'
-        self.encoder = gdet.create_box_encoder(self.model_filename, batch_size=1)
+        self.encoder = gdet.create_batch_box_encoder(self.model_filename)
         # calculate cosine distance metric
         self.metric = nn_matching.NearestNeighborDistanceMetric("cosine", self.max_cosine_distance, self.nn_budget)
         # initialize tracker
         self.tracker = Tracker(self.metric)
         self.input_size = 416
-        self.camera_view = camera_view
+        # Called with (counter, time, direction, class name) for every counted vehicle, on the thread that runs
+        # the tracker (None: no GUI, e.g. in a segment worker process)
+        self.vehicleCounted = vehicleCounted
 
         # load tflite model if flag is set
         if FLAGS.framework == 'tflite':
@@ -196,11 +177,16 @@ class DeepSortApp:
 
 
         self.tempimgdir = "tempimgdir"
-        if not os.path.exists(self.tempimgdir):
-            os.mkdir(self.tempimgdir)
+        # Segment worker processes create their DeepSortApp at the same time
+        os.makedirs(self.tempimgdir, exist_ok=True)
 
         self.counter = 1
         self.stopped = False
+        # Bytes copied by copy-on-write of read-only (shared) frames before drawing
+        self.bytesCopied = 0
+        # Counted vehicles as (time, direction, class name, track id), only recorded if requested (segment workers
+        # merge them), None otherwise
+        self.events = [] if recordEvents else None
 
         self.class_names = utils.read_class_names(cfg.YOLO.CLASSES)
 
@@ -208,27 +194,45 @@ class DeepSortApp:
         self.roi = Polygon(roi)
 
     def process(self, frame, process_time):
-        self.frame = frame
-        vehicle_detail = []
+        return self.processBatch([FramePyramid(frame)], [process_time])[0]
 
-        self.height, self.width = self.frame.shape[:2]
-        image_data = cv2.resize(self.frame, (self.input_size, self.input_size))
-        image_data = image_data / 255.
-        image_data = image_data[np.newaxis, ...].astype(np.float32)
+    def processBatch(self, pyramids, process_times):
+        # Detection and ReID encoding run once for the whole batch, tracking frame by frame (in order).
+        # Resolutions of the frames (FramePyramid) are shared with the other consumers.
         start_time = time.time()
+        detections = self.detect(pyramids)
+        features = self.encoder(pyramids, [bboxes for bboxes, _, _ in detections])
+        results = [self.track(pyramid, bboxes, scores, names, frame_features, process_time)
+                   for pyramid, (bboxes, scores, names), frame_features, process_time
+                   in zip(pyramids, detections, features, process_times)]
+
+        # calculate frames per second of running detections
+        self.fps = len(pyramids) / (time.time() - start_time)
+        return results
 
-        # run detections on tflite if flag is set
+    def detect(self, pyramids):
+        # Returns (bboxes, scores, class names) of the allowed classes for every frame
+        image_data = np.stack([pyramid.resize(self.input_size, self.input_size) for pyramid in pyramids])
+        image_data = (image_data / 255.).astype(np.float32)
+
+        # run detections on tflite if flag is set (model has a fixed batch size of 1)
         if FLAGS.framework == 'tflite':
-            self.interpreter.set_tensor(self.input_details[0]['index'], image_data)
-            self.interpreter.invoke()
-            pred = [self.interpreter.get_tensor(self.output_details[i]['index']) for i in range(len(self.output_details))]
-            # run detections using yolov3 if flag is set
-            if FLAGS.model == 'yolov3' and FLAGS.tiny == True:
-                boxes, pred_conf = filter_boxes(pred[1], pred[0], score_threshold=0.25,
-                                                input_shape=tf.constant([self.input_size, self.input_size]))
-            else:
-                boxes, pred_conf = filter_boxes(pred[0], pred[1], score_threshold=0.25,
-                                                input_shape=tf.constant([self.inv_idput_size, self.input_size]))
+            boxes, pred_conf = [], []
+            for n in range(len(pyramids)):
+                self.interpreter.set_tensor(self.input_details[0]['index'], image_data[n:n + 1])
+                self.interpreter.invoke()
+                pred = [self.interpreter.get_tensor(self.output_details[i]['index']) for i in range(len(self.output_details))]
+                # run detections using yolov3 if flag is set
+                if FLAGS.model == 'yolov3' and FLAGS.tiny == True:
+                    frame_boxes, frame_pred_conf = filter_boxes(pred[1], pred[0], score_threshold=0.25,
+                                                                input_shape=tf.constant([self.input_size, self.input_size]))
+                else:
+                    frame_boxes, frame_pred_conf = filter_boxes(pred[0], pred[1], score_threshold=0.25,
+                                                                input_shape=tf.constant([self.input_size, self.input_size]))
+                boxes.append(frame_boxes)
+                pred_conf.append(frame_pred_conf)
+            boxes = tf.concat(boxes, axis=0)
+            pred_conf = tf.concat(pred_conf, axis=0)
         else:
             batch_data = tf.constant(image_data)
             pred_bbox = self.infer(batch_data)
@@ -246,22 +250,10 @@ class DeepSortApp:
             iou_threshold=FLAGS.iou,
             score_threshold=FLAGS.score
         )
-
-        # convert data to numpy arrays and slice out unused elements
-        num_objects = valid_detections.numpy()[0]
-        bboxes = boxes.numpy()[0]
-        bboxes = bboxes[0:int(num_objects)]
-        scores = scores.numpy()[0]
-        scores = scores[0:int(num_objects)]
-        classes = classes.numpy()[0]
-        classes = classes[0:int(num_objects)]
-
-        # format bounding boxes from normalized ymin, xmin, ymax, xmax ---> xmin, ymin, width, height
-        original_h, original_w, _ = self.frame.shape
-        bboxes = utils.format_boxes(bboxes, original_h, original_w)
-
-        # store all predictions in one parameter for simplicity when calling functions
-        pred_bbox = [bboxes, scores, classes, num_objects]
+        valid_detections = valid_detections.numpy()
+        boxes = boxes.numpy()
+        scores = scores.numpy()
+        classes = classes.numpy()
 
         # by default allow all classes in .names file
         allowed_classes = list(self.class_names.values())
@@ -269,24 +261,42 @@ class DeepSortApp:
         # custom allowed classes (uncomment line below to customize tracker for only people)
         allowed_classes = ['bicycle','car','motorbike','bus','truck']
 
-        # loop through objects and use class index to get class name, allow only classes in allowed_classes list
-        names = []
-        deleted_indx = []
-        for i in range(num_objects):
-            class_indx = int(classes[i])
-            class_name = self.class_names[class_indx]
-            if class_name not in allowed_classes:
-                deleted_indx.append(i)
-            else:
-                names.append(class_name)
-        names = np.array(names)
-
-        # delete detections that are not in allowed_classes
-        bboxes = np.delete(bboxes, deleted_indx, axis=0)
-        scores = np.delete(scores, deleted_indx, axis=0)
+        detections = []
+        for n, pyramid in enumerate(pyramids):
+            # convert data to numpy arrays and slice out unused elements
+            num_objects = int(valid_detections[n])
+            bboxes = boxes[n][0:num_objects]
+            frame_scores = scores[n][0:num_objects]
+            frame_classes = classes[n][0:num_objects]
+
+            # format bounding boxes from normalized ymin, xmin, ymax, xmax ---> xmin, ymin, width, height
+            original_h, original_w, _ = pyramid.frame.shape
+            bboxes = utils.format_boxes(bboxes, original_h, original_w)
+
+            # loop through objects and use class index to get class name, allow only classes in allowed_classes list
+            names = []
+            deleted_indx = []
+            for i in range(num_objects):
+                class_indx = int(frame_classes[i])
+                class_name = self.class_names[class_indx]
+                if class_name not in allowed_classes:
+                    deleted_indx.append(i)
+                else:
+                    names.append(class_name)
+            names = np.array(names)
+
+            # delete detections that are not in allowed_classes
+            bboxes = np.delete(bboxes, deleted_indx, axis=0)
+            frame_scores = np.delete(frame_scores, deleted_indx, axis=0)
+            detections.append((bboxes, frame_scores, names))
+        return detections
+
+    def track(self, pyramid, bboxes, scores, names, features, process_time):
+        # frame may be a view of a frame shared with other consumers, drawing requires a copy then
+        self.frame = pyramid.frame
+        self.height, self.width = self.frame.shape[:2]
 
-        # encode yolo detections and feed to tracker
-        features = self.encoder(self.frame, bboxes)
+        # feed yolo detections to tracker
         detections = [Detection(bbox, score, class_name, feature) for bbox, score, class_name, feature in zip(bboxes, scores, names, features)]
 
         # run non-maxima supression
@@ -319,7 +329,10 @@ class DeepSortApp:
                         if not custom_tracker.captured:
                             direction = custom_tracker.getDirection()
                             snapshot(self.frame,direction,self.counter,bbox,process_time,self.tempimgdir)
-                            vehicle_entry(self.counter,process_time,direction,class_name,self.camera_view)
+                            if self.events is not None:
+                                self.events.append((process_time,direction,class_name,track.track_id))
+                            if self.vehicleCounted is not None:
+                                self.vehicleCounted(self.counter,process_time,direction,class_name)
                             self.counter+=1
                             custom_tracker.capture()
                             print(p1)
@@ -340,6 +353,13 @@ class DeepSortApp:
             tracker = self.tracker_list.getTracker(track.track_id)
 
             if tracker:
+                # Copy on first write
+                if not self.frame.flags.writeable:
+                    self.frame = self.frame.copy()
+                    self.bytesCopied += self.frame.nbytes
+                # Drawing in place outdates the resolutions of the frame
+                elif self.frame is pyramid.frame:
+                    pyramid.invalidate()
                 color = (0,0,255) if tracker.captured else (0,255,0)
                 cv2.rectangle(self.frame, (int(bbox[0]), int(bbox[1])), (int(bbox[2]), int(bbox[3])), color, 2)
                 cv2.rectangle(self.frame, (int(bbox[0]), int(bbox[1]-30)), (int(bbox[0])+(len(class_name)+len(str(track.track_id)))*17, int(bbox[1])), color, -1)
@@ -347,9 +367,6 @@ class DeepSortApp:
                 cv2.putText(self.frame, class_name + "-" + str(track.track_id),(int(bbox[0]), int(bbox[1]-10)),0, 0.60, (255,255,255),2)
 
 
-        # calculate frames per second of running detections
-        self.fps = 1.0 / (time.time() - start_time)
-
         # result = np.asarray(frame)
         # result = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
 
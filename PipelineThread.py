@@ -0,0 +1,52 @@
+from PyQt5.QtCore import QThread, QTime, QMutexLocker, QMutex, QWaitCondition
+
+from Structures import PipelineState
+
+
+class PipelineThread(QThread):
+    # Pause/resume/stop of the capture and processing threads. run() calls waitWhilePaused() once per frame.
+    def __init__(self, parent=None):
+        super(PipelineThread, self).__init__(parent)
+        self.stateMutex = QMutex()
+        self.stateChanged = QWaitCondition()
+        self.state = PipelineState.RUNNING
+        # Time of the current iteration (capture/processing rate)
+        self.t = QTime()
+
+    def waitWhilePaused(self):
+        # Block while PAUSED. Returns False if STOPPING (the state is reset, the thread can be started again).
+        with QMutexLocker(self.stateMutex):
+            if self.state == PipelineState.PAUSED:
+                # Sleep until resume() or stop() is called
+                while self.state == PipelineState.PAUSED:
+                    self.stateChanged.wait(self.stateMutex)
+                # Do not count the paused time as capture/processing time
+                self.t.start()
+            if self.state == PipelineState.STOPPING:
+                self.state = PipelineState.RUNNING
+                return False
+            return True
+
+    def isStopping(self):
+        with QMutexLocker(self.stateMutex):
+            return self.state == PipelineState.STOPPING
+
+    def stop(self):
+        with QMutexLocker(self.stateMutex):
+            self.state = PipelineState.STOPPING
+            self.stateChanged.wakeAll()
+
+    def pause(self):
+        with QMutexLocker(self.stateMutex):
+            if self.state == PipelineState.RUNNING:
+                self.state = PipelineState.PAUSED
+
+    def resume(self):
+        with QMutexLocker(self.stateMutex):
+            if self.state == PipelineState.PAUSED:
+                self.state = PipelineState.RUNNING
+                self.stateChanged.wakeAll()
+
+    def isPaused(self):
+        with QMutexLocker(self.stateMutex):
+            return self.state == PipelineState.PAUSED
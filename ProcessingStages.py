@@ -0,0 +1,214 @@
+from PyQt5.QtCore import QMutexLocker, QMutex
+import time
+import cv2
+
+from Structures import FrameFormat
+from FramePyramid import FramePyramid
+from Config import PROCESSING_STAGE_TIME_STAT_ALPHA, PROCESSING_UMAT_STAGES
+
+kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+
+
+class ProcessingStage(object):
+    def __init__(self, name, make, inputFormat=FrameFormat.ANY, outputFormat=FrameFormat.ANY, isEnabled=None,
+                 batch=False, umat=False, stateful=False):
+        # Unique name (shown in the statistics)
+        self.name = name
+        # make(settings) returns the function run on every frame: function(frame) -> frame, or for batch stages
+        # function(pyramids, timestamps) -> frames, which gets the FramePyramid of every frame (resolutions
+        # shared with the other consumers). Settings are read once, when the plan is compiled.
+        self.make = make
+        self.inputFormat = inputFormat
+        self.outputFormat = outputFormat
+        # isEnabled(flags) -> bool (None: always enabled)
+        self.isEnabled = isEnabled or (lambda flags: True)
+        self.batch = batch
+        # Function also accepts and returns cv2.UMat (OpenCV transparent API only)
+        self.umat = umat
+        # Function keeps state from frame to frame (e.g. the tracker): frames must pass it one after another
+        self.stateful = stateful
+
+
+class StageGraph(object):
+    # Ordered stages of the processing pipeline. The enabled stages are compiled into a plan when flags or
+    # settings change; running the plan times every stage.
+    def __init__(self, timeAlpha=PROCESSING_STAGE_TIME_STAT_ALPHA, umatStages=PROCESSING_UMAT_STAGES):
+        self.stages = []
+        # Format conversions inserted by compile() between stages: (from, to) -> stage
+        self.conversions = {
+            (FrameFormat.GRAY, FrameFormat.BGR): ProcessingStage(
+                'gray2bgr', lambda settings: lambda frame: cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR),
+                FrameFormat.GRAY, FrameFormat.BGR, umat=True),
+            (FrameFormat.BGR, FrameFormat.GRAY): ProcessingStage(
+                'bgr2gray', lambda settings: lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
+                FrameFormat.BGR, FrameFormat.GRAY, umat=True),
+        }
+        # Stages run on cv2.UMat (OpenCL T-API) if OpenCL is available. Consecutive UMat stages keep the frame
+        # on the device, it is uploaded before the first and downloaded after the last one.
+        self.umatStages = set(umatStages)
+        self.upload = ProcessingStage('upload', lambda settings: cv2.UMat)
+        self.download = ProcessingStage('download', lambda settings: lambda frame: frame.get())
+        # Compiled plan: list of (stage, function)
+        self.plan = []
+        # Stages of the plan before this index are stateless and may run on several frames at once
+        self.serialStart = 0
+        self.planMutex = QMutex()
+        # Running average of the time per frame of every stage in ms
+        self.timeAlpha = timeAlpha
+        self.averageTimes = dict()
+
+    def register(self, stage, before=None, after=None):
+        # Insert stage before/after the stage with the given name (default: at the end). Call compile() to use it.
+        if any(registered.name == stage.name for registered in self.stages):
+            raise ValueError("Stage %s is already registered" % stage.name)
+        names = [registered.name for registered in self.stages]
+        if before is not None:
+            self.stages.insert(names.index(before), stage)
+        elif after is not None:
+            self.stages.insert(names.index(after) + 1, stage)
+        else:
+            self.stages.append(stage)
+
+    def unregister(self, name):
+        self.stages = [stage for stage in self.stages if stage.name != name]
+
+    def setUMatStages(self, names):
+        # Names of the stages to run on cv2.UMat (takes effect with the next compile())
+        self.umatStages = set(names)
+
+    def compile(self, flags, settings, inputFormat=FrameFormat.BGR):
+        # Build the plan of the enabled stages, converting frames where a stage needs another format
+        plan = []
+        frameFormat = inputFormat
+        useOpenCL = bool(self.umatStages) and cv2.ocl.haveOpenCL()
+        if useOpenCL:
+            cv2.ocl.setUseOpenCL(True)
+        onDevice = False
+        for stage in self.stages:
+            if not stage.isEnabled(flags):
+                continue
+            steps = [stage]
+            if stage.inputFormat not in (FrameFormat.ANY, frameFormat):
+                conversion = self.conversions.get((frameFormat, stage.inputFormat))
+                if conversion is None:
+                    raise ValueError("Stage %s needs %s frames, previous stages produce %s frames" % (
+                        stage.name, stage.inputFormat, frameFormat))
+                steps.insert(0, conversion)
+            # Move the frame to/from the device only between a NumPy and a UMat stage (a conversion runs
+            # where its stage runs)
+            runOnDevice = useOpenCL and stage.umat and stage.name in self.umatStages
+            if runOnDevice != onDevice:
+                transfer = self.upload if runOnDevice else self.download
+                plan.append((transfer, transfer.make(settings)))
+                onDevice = runOnDevice
+            plan.extend((step, step.make(settings)) for step in steps)
+            if stage.outputFormat != FrameFormat.ANY:
+                frameFormat = stage.outputFormat
+            elif stage.inputFormat != FrameFormat.ANY:
+                frameFormat = stage.inputFormat
+        # Display and detection need NumPy frames
+        if onDevice:
+            plan.append((self.download, self.download.make(settings)))
+        # Batch and stateful stages (and all after them) see the frames of a batch together and in order
+        serialStart = next((n for n, (stage, _) in enumerate(plan) if stage.batch or stage.stateful), len(plan))
+        with QMutexLocker(self.planMutex):
+            self.plan = plan
+            self.serialStart = serialStart
+            # Stages that are no longer in the plan disappear from the statistics
+            self.averageTimes = {stage.name: self.averageTimes.get(stage.name, 0.0) for stage, _ in plan}
+
+    def run(self, frames, timestamps):
+        # Pass a batch of frames through the plan, returns the FramePyramid of every resulting frame (in the order
+        # of frames). UMat stages may run asynchronously, the time they did not wait for shows up in the download
+        # stage.
+        plan, _ = self.currentPlan()
+        return self.runStages(plan, [FramePyramid(frame) for frame in frames], timestamps)
+
+    def currentPlan(self):
+        # (plan, serialStart): plan[:serialStart] is stateless and may run on several frames at once (one frame per
+        # thread), plan[serialStart:] gets the frames together and in order. A frame passes both parts of the same
+        # plan, even if compile() replaced it in between.
+        with QMutexLocker(self.planMutex):
+            return self.plan, self.serialStart
+
+    def runStages(self, plan, pyramids, timestamps):
+        # Pass FramePyramids through (a part of) a plan
+        for stage, function in plan:
+            startTime = time.perf_counter()
+            if stage.batch:
+                frames = function(pyramids, timestamps)
+            else:
+                frames = [function(pyramid.frame) for pyramid in pyramids]
+            # A stage that returns its input frame keeps the resolutions computed so far
+            pyramids = [pyramid if frame is pyramid.frame else FramePyramid(frame)
+                        for pyramid, frame in zip(pyramids, frames)]
+            timePerFrame = (time.perf_counter() - startTime) * 1000 / len(frames)
+            # Workers update the statistics concurrently
+            with QMutexLocker(self.planMutex):
+                averageTime = self.averageTimes.get(stage.name, 0.0)
+                self.averageTimes[stage.name] = timePerFrame if averageTime == 0.0 else \
+                    averageTime + self.timeAlpha * (timePerFrame - averageTime)
+        return pyramids
+
+    def stageTimes(self):
+        # Average time per frame of the stages of the plan in ms, in plan order
+        with QMutexLocker(self.planMutex):
+            return dict(self.averageTimes)
+
+
+def makeSmooth(settings):
+    if settings.smoothType == 0:
+        # BLUR
+        size = (settings.smoothParam1, settings.smoothParam2)
+        return lambda frame: cv2.blur(frame, size)
+    elif settings.smoothType == 1:
+        # GAUSSIAN
+        size = (settings.smoothParam1, settings.smoothParam2)
+        sigmaX, sigmaY = settings.smoothParam3, settings.smoothParam4
+        return lambda frame: cv2.GaussianBlur(frame, size, sigmaX=sigmaX, sigmaY=sigmaY)
+    elif settings.smoothType == 2:
+        # MEDIAN
+        size = settings.smoothParam1
+        return lambda frame: cv2.medianBlur(frame, size)
+    return lambda frame: frame
+
+
+def makeDilate(settings):
+    iterations = settings.dilateNumberOfIterations
+    return lambda frame: cv2.dilate(frame, kernel, iterations=iterations)
+
+
+def makeErode(settings):
+    iterations = settings.erodeUrlOfIterations
+    return lambda frame: cv2.erode(frame, kernel, iterations=iterations)
+
+
+def makeFlip(settings):
+    flipCode = settings.flipCode
+    return lambda frame: cv2.flip(frame, flipCode)
+
+
+def makeCanny(settings):
+    threshold1, threshold2 = settings.cannyThreshold1, settings.cannyThreshold2
+    apertureSize, L2gradient = settings.cannyApertureSize, settings.cannyL2gradient
+    return lambda frame: cv2.Canny(frame, threshold1=threshold1, threshold2=threshold2,
+                                   apertureSize=apertureSize, L2gradient=L2gradient)
+
+
+def createDefaultStageGraph(app=None):
+    # Stages of ImageProcessingFlags in their classic order, detection and tracking (DeepSortApp app) last.
+    # The OpenCV stages can run on cv2.UMat (see PROCESSING_UMAT_STAGES).
+    stageGraph = StageGraph()
+    stageGraph.register(ProcessingStage(
+        'grayscale', lambda settings: lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY),
+        FrameFormat.BGR, FrameFormat.GRAY, lambda flags: flags.grayscaleOn, umat=True))
+    stageGraph.register(ProcessingStage('smooth', makeSmooth, isEnabled=lambda flags: flags.smoothOn, umat=True))
+    stageGraph.register(ProcessingStage('dilate', makeDilate, isEnabled=lambda flags: flags.dilateOn, umat=True))
+    stageGraph.register(ProcessingStage('erode', makeErode, isEnabled=lambda flags: flags.erodeOn, umat=True))
+    stageGraph.register(ProcessingStage('flip', makeFlip, isEnabled=lambda flags: flags.flipOn, umat=True))
+    stageGraph.register(ProcessingStage('canny', makeCanny, FrameFormat.ANY, FrameFormat.GRAY,
+                                        lambda flags: flags.cannyOn, umat=True))
+    if app is not None:
+        stageGraph.register(ProcessingStage('yolo', lambda settings: app.processBatch, FrameFormat.BGR,
+                                            FrameFormat.BGR, lambda flags: flags.yoloOn, batch=True, stateful=True))
+    return stageGraph
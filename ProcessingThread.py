@@ -1,186 +1,237 @@
-from PyQt5.QtCore import QThread, QMutex, QTime, qDebug, QMutexLocker, pyqtSignal
+from PyQt5.QtCore import QMutex, qDebug, QMutexLocker, pyqtSignal
 from PyQt5.QtGui import QImage, QPainter
-from queue import Queue
-import cv2
+from concurrent import futures
+import time
+import numpy as np
 
 from MatToQImage import matToQImage
 from Structures import *
 from Config import *
+from StatsPublisher import StatsPublisher, FPSAverage
 from ObjectDetection import DeepSortApp
+from ProcessingStages import createDefaultStageGraph
+from FramePyramid import FramePyramid
+from PipelineThread import PipelineThread
+from ReorderWindow import ReorderWindow
 
 
-class ProcessingThread(QThread):
+class ProcessingThread(PipelineThread):
     newFrame = pyqtSignal(QImage)
     updateStatisticsInGUI = pyqtSignal(ThreadStatisticsData)
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
+    # Vehicle counted by the tracker: counter, time (datetime), direction, class name
+    vehicleCounted = pyqtSignal(int, object, str, str)
 
-    def __init__(self, sharedImageBuffer, deviceUrl, cameraId, parent=None):
-        super(QThread, self).__init__(parent)
+    def __init__(self, sharedImageBuffer, deviceUrl, cameraId, parent=None, nWorkers=PROCESSING_WORKERS):
+        super(ProcessingThread, self).__init__(parent)
         self.sharedImageBuffer = sharedImageBuffer
         self.cameraId = cameraId
         # Save Device Url
         self.deviceUrl = deviceUrl
         # Initialize members
-        self.doStopMutex = QMutex()
         self.processingMutex = QMutex()
-        self.t = QTime()
         self.processingTime = 0
-        self.doStop = False
         self.enableFrameProcessing = False
-        self.sampleNumber = 0
-        self.fpsSum = 0.0
-        self.fps = Queue()
+        self.fps = FPSAverage(PROCESSING_FPS_STAT_ALPHA)
         self.currentROI = QRect()
         self.imgProcFlags = ImageProcessingFlags()
         self.imgProcSettings = ImageProcessingSettings()
         self.statsData = ThreadStatisticsData()
+        self.statsPublisher = StatsPublisher(self.updateStatisticsInGUI)
         self.frame = None
         self.currentFrame = None
-        self.app = DeepSortApp(parent)
+        self.frameTimestamp = None
+        # Size of the label the frame is displayed in (None: display the full frame)
+        self.displaySize = None
+        self.nFramesLastBatch = 1
+        # Counted vehicles are added to the list of the view by the GUI thread
+        self.app = DeepSortApp(self.vehicleCounted.emit)
+        # Image processing stages (custom stages can be registered, see ProcessingStages), compiled into a plan
+        # whenever flags or settings change
+        self.stageGraph = createDefaultStageGraph(self.app)
+        # Worker pool mode (nWorkers > 1): frames pass the stateless stages on several threads
+        self.nWorkers = nWorkers
+        self.reorderWindow = self.maxFramesInFlight(nWorkers)
         self.parent = parent
-        self.pause = False
-        self.speed = 1
-        self.counter = 0
+
+    @staticmethod
+    def maxFramesInFlight(nWorkers):
+        # Most frames taken from the image buffer and not released yet (counted against the memory budget)
+        if nWorkers > 1:
+            return max(PROCESSING_REORDER_WINDOW, nWorkers)
+        return PROCESSING_MAX_BATCH_SIZE
 
     def run(self):
-        while True:
-            if self.pause:
+        # Own buffer of this consumer of the stream (other views of the same camera have their own)
+        imageBuffer = self.sharedImageBuffer.getConsumer(self.deviceUrl, self.cameraId)
+        if self.nWorkers > 1:
+            self.runWorkerPool(imageBuffer)
+        else:
+            self.runSerial(imageBuffer)
+        # Final statistics of the stream
+        self.statsPublisher.publish(self.statsData, force=True)
+        qDebug("Stopping processing thread...")
+
+    def runSerial(self, imageBuffer):
+        # Block while PAUSED, stop if STOPPING
+        while self.waitWhilePaused():
+            # Get frames from queue (more than one only if processing fell behind). Not under processingMutex:
+            # the GUI thread locks it (ROI, flags, settings) and must not wait for the next frame. Wait at most
+            # PIPELINE_WAIT_TIMEOUT ms, then check pause/stop again.
+            frameDataBatch = imageBuffer.getBatch(PROCESSING_MAX_BATCH_SIZE, PROCESSING_BATCH_TIMEOUT,
+                                                  PIPELINE_WAIT_TIMEOUT)
+            if not frameDataBatch:
+                # Buffer closed (stream ended or thread is being stopped) and drained
+                if imageBuffer.isClosed():
+                    break
                 continue
-            ##############################
-            # Stop thread if doStop=True #
-            ##############################
-            self.doStopMutex.lock()
-            if self.doStop:
-                self.doStop = False
-                self.doStopMutex.unlock()
-                break
-            self.doStopMutex.unlock()
-            ################################
-            ################################
 
             # Save processing time
             self.processingTime = self.t.elapsed()
             # Start timer (used to calculate processing rate)
             self.t.start()
-            with QMutexLocker(self.processingMutex):
-                # Get frame from queue, store in currentFrame, set ROI
-                # self.currentFrame = Mat(self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).get().clone(),
-                #                         self.currentROI)
-                self.currentFrame = self.sharedImageBuffer.getByDeviceUrl(self.deviceUrl).get()[
-                                    self.currentROI.y():(self.currentROI.y() + self.currentROI.height()),
-                                    self.currentROI.x():(self.currentROI.x() + self.currentROI.width())].copy()
-
-                if self.counter%self.speed:
-                    self.counter+=1
+            bytesCopied = -self.app.bytesCopied
+
+            # Run the compiled plan of the enabled stages (detection and tracking on the whole batch)
+            try:
+                pyramids = self.stageGraph.run(self.roiViews(frameDataBatch),
+                                               [frameData.timestamp for frameData in frameDataBatch])
+            except Exception as e:
+                self.discardFrames(imageBuffer, frameDataBatch, e)
+                continue
+            bytesCopied += self.app.bytesCopied
+
+            # Latest frame is displayed
+            bytesCopied += self.emitFrame(pyramids[-1], frameDataBatch[-1])
+
+            # Captured frames are no longer needed (QImage of a 3-channel frame is a copy made by rgbSwapped)
+            for frameData in frameDataBatch:
+                imageBuffer.release(frameData)
+
+            self.updateStatistics(frameDataBatch, bytesCopied, self.processingTime / self.nFramesLastBatch)
+            self.nFramesLastBatch = len(frameDataBatch)
+
+    def runWorkerPool(self, imageBuffer):
+        # The stateless stages (filters) run on nWorkers threads (OpenCV releases the GIL), one frame per worker,
+        # with up to reorderWindow frames in flight. Frames leave the pool in capture order: the stateful stages
+        # (tracker) get them one after another and every frame is emitted.
+        executor = futures.ThreadPoolExecutor(self.nWorkers)
+        # Items are (frameData, plan, serialStart), workers return the FramePyramids after the stateless stages
+        window = ReorderWindow(executor, self.reorderWindow)
+        # Waiting for the oldest frame ends early when a new frame arrives (the window may have room for it)
+        imageBuffer.setFrameAddedCallback(window.wake)
+        try:
+            # Block while PAUSED, stop if STOPPING
+            while self.waitWhilePaused():
+                # Keep the window full, wait for frames only if none is in flight
+                nFree = window.nFree()
+                if nFree > 0:
+                    frameDataBatch = imageBuffer.getBatch(nFree, 0, PIPELINE_WAIT_TIMEOUT if window.isEmpty() else 0)
+                    plan, serialStart = self.stageGraph.currentPlan()
+                    for frameData, frame in zip(frameDataBatch, self.roiViews(frameDataBatch)):
+                        window.submit((frameData, plan, serialStart), plan, self.stageGraph.runStages,
+                                      plan[:serialStart], [FramePyramid(frame)], [frameData.timestamp])
+                if window.isEmpty():
+                    # Buffer closed (stream ended or thread is being stopped) and drained
+                    if imageBuffer.isClosed():
+                        break
+                    continue
+
+                # Wait for the oldest frame (or a new frame). The oldest frame and the following finished frames (of
+                # the same plan) pass the stateful stages together.
+                group = []
+                for (frameData, plan, serialStart), pyramids, error in window.takeReady(PROCESSING_MAX_BATCH_SIZE,
+                                                                                        PIPELINE_WAIT_TIMEOUT):
+                    if error is not None:
+                        self.discardFrames(imageBuffer, [frameData], error)
+                        continue
+                    group.append((frameData, plan, serialStart, pyramids[0]))
+                if not group:
                     continue
+                frameDataBatch = [frameData for frameData, _, _, _ in group]
+                _, plan, serialStart, _ = group[0]
+                bytesCopied = -self.app.bytesCopied
+                try:
+                    pyramids = self.stageGraph.runStages(plan[serialStart:], [pyramid for _, _, _, pyramid in group],
+                                                         [frameData.timestamp for frameData in frameDataBatch])
+                except Exception as e:
+                    self.discardFrames(imageBuffer, frameDataBatch, e)
+                    continue
+                bytesCopied += self.app.bytesCopied
 
-                # Example of how to grab a frame from another stream (where Device Url=1)
-                # Note: This requires stream synchronization to be ENABLED (in the Options menu of MainWindow)
-                #       and frame processing for the stream you are grabbing FROM to be DISABLED.
-                # if sharedImageBuffer.containsImageBufferForDeviceUrl(1):
-                #     # Grab frame from another stream (connected to camera with Device Url=1)
-                #     Mat frameFromAnotherStream = Mat(sharedImageBuffer.getByDeviceUrl(1).getFrame(), currentROI)
-                #     # Linear blend images together using OpenCV and save the result to currentFrame. Note: beta=1-alpha
-                #     addWeighted(frameFromAnotherStream, 0.5, currentFrame, 0.5, 0.0, currentFrame)
-
-                ##################################
-                # PERFORM IMAGE PROCESSING BELOW #
-                ##################################
-
-                # Grayscale conversion (in-place operation)
-                if self.imgProcFlags.grayscaleOn and (
-                        self.currentFrame.shape[2] == 3 or self.currentFrame.shape[2] == 4):
-                    self.currentFrame = cv2.cvtColor(self.currentFrame, cv2.COLOR_BGR2GRAY)
-
-                # Smooth (in-place operations)
-                if self.imgProcFlags.smoothOn:
-                    if self.imgProcSettings.smoothType == 0:
-                        # BLUR
-                        self.currentFrame = cv2.blur(self.currentFrame,
-                                                     (self.imgProcSettings.smoothParam1,
-                                                      self.imgProcSettings.smoothParam2))
-                    elif self.imgProcSettings.smoothType == 1:
-                        # GAUSSIAN
-                        self.currentFrame = cv2.GaussianBlur(self.currentFrame,
-                                                             (self.imgProcSettings.smoothParam1,
-                                                              self.imgProcSettings.smoothParam2),
-                                                             sigmaX=self.imgProcSettings.smoothParam3,
-                                                             sigmaY=self.imgProcSettings.smoothParam4)
-                    elif self.imgProcSettings.smoothType == 2:
-                        # MEDIAN
-                        self.currentFrame = cv2.medianBlur(self.currentFrame, self.imgProcSettings.smoothParam1)
-
-                # Dilate
-                if self.imgProcFlags.dilateOn:
-                    self.currentFrame = cv2.dilate(self.currentFrame, self.kernel,
-                                                   iterations=self.imgProcSettings.dilateNumberOfIterations)
-                # Erode
-                if self.imgProcFlags.erodeOn:
-                    self.currentFrame = cv2.erode(self.currentFrame, self.kernel,
-                                                  iterations=self.imgProcSettings.erodeUrlOfIterations)
-                # Flip
-                if self.imgProcFlags.flipOn:
-                    self.currentFrame = cv2.flip(self.currentFrame, self.imgProcSettings.flipCode)
-                # Canny edge detection
-                if self.imgProcFlags.cannyOn:
-                    self.currentFrame = cv2.Canny(self.currentFrame,
-                                                  threshold1=self.imgProcSettings.cannyThreshold1,
-                                                  threshold2=self.imgProcSettings.cannyThreshold2,
-                                                  apertureSize=self.imgProcSettings.cannyApertureSize,
-                                                  L2gradient=self.imgProcSettings.cannyL2gradient)
-                
-                if self.imgProcFlags.yoloOn:
-                    self.currentFrame = self.app.process(self.currentFrame,self.sharedImageBuffer.video_date_time)
-
-                ##################################
-                # PERFORM IMAGE PROCESSING ABOVE #
-                ##################################
-
-                # Convert Mat to QImage
-                self.frame = matToQImage(self.currentFrame)
-
-                # Inform GUI thread of new frame (QImage)
-                self.newFrame.emit(self.frame)
-                self.counter+=1
-
-            # Update statistics
-            self.updateFPS(self.processingTime)
-            self.statsData.nFramesProcessed += 1
-            # Inform GUI of updated statistics
-            self.updateStatisticsInGUI.emit(self.statsData)
+                # Every frame is emitted, in capture order
+                for pyramid, frameData in zip(pyramids, frameDataBatch):
+                    bytesCopied += self.emitFrame(pyramid, frameData)
+                    imageBuffer.release(frameData)
 
-        qDebug("Stopping processing thread...")
+                # Processing rate: time since the previous frames were emitted
+                self.processingTime = self.t.elapsed()
+                self.t.start()
+                self.updateStatistics(frameDataBatch, bytesCopied, self.processingTime / len(group))
+        finally:
+            imageBuffer.setFrameAddedCallback(None)
+            # Frames still in flight when stopping are discarded (once the running workers finished)
+            remaining = window.takeAll()
+            executor.shutdown()
+            for frameData, _, _ in remaining:
+                imageBuffer.release(frameData)
+
+    def discardFrames(self, imageBuffer, frameDataBatch, error):
+        # A stage raised on these frames: they are skipped (released), the stream goes on
+        qDebug("[%s] WARNING: Processing of frames %d-%d failed: %s" % (
+            self.deviceUrl, frameDataBatch[0].frameIndex, frameDataBatch[-1].frameIndex, error))
+        for frameData in frameDataBatch:
+            imageBuffer.release(frameData)
+
+    def roiViews(self, frameDataBatch):
+        # ROI is a view of the captured frame: filters return new frames, the frame is copied only where it is
+        # written to (drawing of the tracker on a shared, read-only frame). Only the ROI is read under
+        # processingMutex, the stage plan is swapped by compile() under its own lock.
+        with QMutexLocker(self.processingMutex):
+            roi = QRect(self.currentROI)
+        return [frameData.data[roi.y():(roi.y() + roi.height()), roi.x():(roi.x() + roi.width())]
+                for frameData in frameDataBatch]
+
+    def emitFrame(self, pyramid, frameData):
+        # Send the frame to the GUI, returns the number of bytes copied
+        bytesCopied = 0
+        # Scaled here to the label size (resolution shared with the detector)
+        displaySize = self.displaySize
+        if displaySize is None:
+            self.currentFrame = pyramid.frame
+        else:
+            self.currentFrame = pyramid.fitted(*displaySize)
+        self.frameTimestamp = frameData.timestamp
+
+        # QImage needs contiguous rows (ROI smaller than the frame)
+        if not self.currentFrame.flags.c_contiguous:
+            self.currentFrame = np.ascontiguousarray(self.currentFrame)
+            bytesCopied += self.currentFrame.nbytes
+
+        # Convert Mat to QImage
+        self.frame = matToQImage(self.currentFrame)
+
+        # Inform GUI thread of new frame (QImage)
+        self.newFrame.emit(self.frame)
+        return bytesCopied
+
+    def updateStatistics(self, frameDataBatch, bytesCopied, timePerFrame):
+        self.updateFPS(timePerFrame)
+        self.statsData.nFramesProcessed += len(frameDataBatch)
+        self.statsData.bytesCopied = bytesCopied // len(frameDataBatch)
+        self.statsData.stageTimes = self.stageGraph.stageTimes()
+        self.statsData.dropPolicy = self.sharedImageBuffer.getDropPolicy(self.deviceUrl, self.cameraId)
+        # Capture to display latency
+        self.statsData.latency = int((time.time() - frameDataBatch[-1].captureTime) * 1000)
+        # Inform GUI of updated statistics (coalesced to DEFAULT_STATS_PUBLISH_RATE)
+        self.statsPublisher.publish(self.statsData)
 
     def doShowImage(self, val):
         with QMutexLocker(self.processingMutex):
             self.doShow = val
 
     def updateFPS(self, timeElapsed):
-        # Add instantaneous FPS value to queue
-        if timeElapsed > 0:
-            self.fps.put(1000 / timeElapsed)
-            # Increment sample number
-            self.sampleNumber += 1
-
-        # Maximum size of queue is DEFAULT_PROCESSING_FPS_STAT_QUEUE_LENGTH
-        if self.fps.qsize() > PROCESSING_FPS_STAT_QUEUE_LENGTH:
-            self.fps.get()
-
-        # Update FPS value every DEFAULT_PROCESSING_FPS_STAT_QUEUE_LENGTH samples
-        if self.fps.qsize() == PROCESSING_FPS_STAT_QUEUE_LENGTH and self.sampleNumber == PROCESSING_FPS_STAT_QUEUE_LENGTH:
-            # Empty queue and store sum
-            while not self.fps.empty():
-                self.fpsSum += self.fps.get()
-            # Calculate average FPS
-            self.statsData.averageFPS = self.fpsSum / PROCESSING_FPS_STAT_QUEUE_LENGTH
-            # Reset sum
-            self.fpsSum = 0.0
-            # Reset sample number
-            self.sampleNumber = 0
-
-    def stop(self):
-        with QMutexLocker(self.doStopMutex):
-            self.doStop = True
+        # Running average of the instantaneous FPS
+        self.statsData.averageFPS = self.fps.update(timeElapsed)
 
     def updateBoxesBufferMax(self, boxesBufferMax):
         with QMutexLocker(self.processingMutex):
@@ -195,6 +246,7 @@ class ProcessingThread(QThread):
             self.imgProcFlags.flipOn = imgProcFlags.flipOn
             self.imgProcFlags.cannyOn = imgProcFlags.cannyOn
             self.imgProcFlags.yoloOn = imgProcFlags.yoloOn
+            self.stageGraph.compile(self.imgProcFlags, self.imgProcSettings)
 
     def updateImageProcessingSettings(self, imgProcSettings):
         with QMutexLocker(self.processingMutex):
@@ -210,6 +262,12 @@ class ProcessingThread(QThread):
             self.imgProcSettings.cannyThreshold2 = imgProcSettings.cannyThreshold2
             self.imgProcSettings.cannyApertureSize = imgProcSettings.cannyApertureSize
             self.imgProcSettings.cannyL2gradient = imgProcSettings.cannyL2gradient
+            self.stageGraph.compile(self.imgProcFlags, self.imgProcSettings)
+
+    def setDisplaySize(self, width, height):
+        # Called by the GUI thread for every frame: no lock, the size is replaced as one tuple and read once
+        # per batch
+        self.displaySize = (width, height) if width > 0 and height > 0 else None
 
     def setROI(self, roi):
         with QMutexLocker(self.processingMutex):
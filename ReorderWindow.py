@@ -0,0 +1,78 @@
+from PyQt5.QtCore import QMutexLocker, QMutex, QWaitCondition
+from collections import deque
+
+
+class ReorderWindow(object):
+    # Items (frames) submitted to a worker pool are handed out in submission (capture) order, whatever order the
+    # workers finish them in. At most size items are in flight.
+    def __init__(self, executor, size):
+        self.executor = executor
+        self.windowSize = size
+        # (item, key, future), oldest first
+        self.pending = deque()
+        # takeReady() sleeps until the oldest item finished or wake() was called
+        self.wakeMutex = QMutex()
+        self.wakeUp = QWaitCondition()
+        self.woken = False
+
+    def submit(self, item, key, fn, *args):
+        # Run fn(*args) on a worker. Items with the same key (compared by identity, e.g. the stage plan) can be
+        # taken together.
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self.wake())
+        self.pending.append((item, key, future))
+
+    def wake(self):
+        # Something to do for the caller of takeReady() (an item finished, a new frame arrived): it returns
+        with QMutexLocker(self.wakeMutex):
+            self.woken = True
+            self.wakeUp.wakeAll()
+
+    def takeReady(self, maxItems, timeout):
+        # Wait up to timeout ms for the oldest item (or until wake() is called), then take it and the following
+        # finished items with the same key (at most maxItems). Returns a list of (item, result, error) in
+        # submission order, error is the exception raised by the worker (result is None then). Empty if the oldest
+        # item did not finish in time.
+        with QMutexLocker(self.wakeMutex):
+            if not self.woken and not (self.pending and self.pending[0][2].done()):
+                self.wakeUp.wait(self.wakeMutex, int(timeout))
+            self.woken = False
+        if not self.pending or not self.pending[0][2].done():
+            return []
+        group = [self.pending.popleft()]
+        while self.pending and len(group) < maxItems and self.pending[0][1] is group[0][1] \
+                and self.pending[0][2].done():
+            group.append(self.pending.popleft())
+        return [(item,) + self.outcome(future) for item, _, future in group]
+
+    @staticmethod
+    def outcome(future):
+        # (result, None) or (None, exception)
+        error = future.exception()
+        if error is not None:
+            return None, error
+        return future.result(), None
+
+    def takeAll(self):
+        # Remaining items, oldest first (workers that did not start yet are cancelled)
+        items = []
+        while self.pending:
+            item, _, future = self.pending.popleft()
+            future.cancel()
+            items.append(item)
+        return items
+
+    def nFree(self):
+        return self.windowSize - len(self.pending)
+
+    def size(self):
+        return len(self.pending)
+
+    def maxSize(self):
+        return self.windowSize
+
+    def isFull(self):
+        return len(self.pending) >= self.windowSize
+
+    def isEmpty(self):
+        return not self.pending
@@ -0,0 +1,229 @@
+from PyQt5.QtCore import QMutexLocker, QMutex, QWaitCondition, QElapsedTimer
+import numpy as np
+
+from FramePool import FramePool
+from Structures import DropPolicy, FrameData
+from Config import FRAME_POOL_IN_FLIGHT_FRAMES, DEFAULT_DROP_EVERY_NTH
+
+
+class RingBuffer(object):
+    # Fixed-capacity frame buffer guarded by a single mutex (replaces the former Buffer, add() takes a DropPolicy
+    # instead of dropIfFull)
+    def __init__(self, size, everyNth=DEFAULT_DROP_EVERY_NTH, framePool=None):
+        # Save buffer size
+        self.bufferSize = size
+        # Frames that may be queued (lowered by the memory budget of SharedImageBuffer)
+        self.capacity = size
+        # EVERY_NTH policy: keep every Nth frame while full
+        self.everyNth = max(1, everyNth)
+        self.nFramesWhileFull = 0
+        # Dropped frames per reason
+        self.nDropped = dict.fromkeys(DropPolicy.REASONS, 0)
+        # Create mutex and wait conditions
+        self.bufferProtect = QMutex()
+        self.notEmpty = QWaitCondition()
+        self.notFull = QWaitCondition()
+        # Preallocated slots, items are read at head and written at (head + count) % bufferSize
+        self.slots = [None] * self.bufferSize
+        self.head = 0
+        self.count = 0
+        # Closed buffers do not accept frames and do not block
+        self.closed = False
+        # Called (with the buffer locked) when a frame was added or the buffer was closed, e.g. to wake up a consumer
+        # that waits for something else as well
+        self.frameAddedCallback = None
+        # Create pool of recyclable frames (buffered frames + frames in flight), unless the pool is shared
+        # with other buffers (consumers of a FanOutBuffer)
+        self.ownsFramePool = framePool is None
+        self.framePool = FramePool(self.bufferSize + FRAME_POOL_IN_FLIGHT_FRAMES) if framePool is None else framePool
+
+    def add(self, data, dropPolicy=DropPolicy.BLOCK, timeout=-1):
+        # Returns False if the frame was not queued (dropped, timed out after timeout ms or buffer closed).
+        # Dropped frames are recycled: items must be FrameData whose data comes from the frame pool.
+        if not isinstance(data, FrameData):
+            raise TypeError("RingBuffer items must be FrameData, not %s" % type(data).__name__)
+        with QMutexLocker(self.bufferProtect):
+            if self.closed:
+                self.framePool.release(data.data)
+                return False
+            # Live low-latency: only the newest frame is kept (depth 1)
+            if dropPolicy == DropPolicy.KEEP_LATEST:
+                while self.count > 0:
+                    self.dropOldest('superseded')
+            elif self.count >= self.capacity:
+                if dropPolicy == DropPolicy.DROP_OLDEST:
+                    while self.count >= self.capacity:
+                        self.dropOldest('oldest')
+                elif dropPolicy == DropPolicy.DROP_NEWEST:
+                    self.drop(data, 'newest')
+                    return False
+                elif dropPolicy == DropPolicy.EVERY_NTH:
+                    # Decimate incoming frames while the consumer is behind
+                    self.nFramesWhileFull += 1
+                    if self.nFramesWhileFull % self.everyNth != 0:
+                        self.drop(data, 'decimated')
+                        return False
+                    while self.count >= self.capacity:
+                        self.dropOldest('oldest')
+                # If buffer is full, wait for a free slot
+                else:
+                    deadline = QElapsedTimer()
+                    deadline.start()
+                    while self.count >= self.capacity and not self.closed:
+                        if not self.wait(self.notFull, deadline, timeout):
+                            break
+                    if self.count >= self.capacity or self.closed:
+                        self.framePool.release(data.data)
+                        return False
+            else:
+                self.nFramesWhileFull = 0
+            self.slots[(self.head + self.count) % self.bufferSize] = data
+            self.count += 1
+            self.notEmpty.wakeOne()
+            if self.frameAddedCallback is not None:
+                self.frameAddedCallback()
+            return True
+
+    def wait(self, condition, deadline, timeout):
+        # Called with bufferProtect locked. Returns False once timeout ms have passed since deadline.start()
+        # (timeout < 0: wait until woken up)
+        if timeout < 0:
+            condition.wait(self.bufferProtect)
+            return True
+        remaining = timeout - deadline.elapsed()
+        return remaining > 0 and condition.wait(self.bufferProtect, remaining)
+
+    def takeOldest(self):
+        # Called with bufferProtect locked
+        data = self.slots[self.head]
+        self.slots[self.head] = None
+        self.head = (self.head + 1) % self.bufferSize
+        self.count -= 1
+        return data
+
+    def dropOldest(self, reason):
+        # Called with bufferProtect locked
+        self.drop(self.takeOldest(), reason)
+
+    def drop(self, data, reason):
+        # Recycle dropped frame
+        self.framePool.release(data.data)
+        self.nDropped[reason] += 1
+
+    def droppedFrames(self):
+        # Number of dropped frames per reason (see DropPolicy.REASONS)
+        with QMutexLocker(self.bufferProtect):
+            return dict(self.nDropped)
+
+    def acquire(self, shape, dtype=np.uint8):
+        # Recycled frame to write a new frame into (to be added to this buffer)
+        return self.framePool.acquire(shape, dtype)
+
+    def copy(self, data):
+        # Copy data into a recycled frame (to be added to this buffer)
+        return self.framePool.copy(data)
+
+    def release(self, frameData):
+        # Frame taken with get() is no longer needed
+        self.framePool.release(frameData.data)
+
+    def get(self, timeout=-1):
+        # Returns None if no item arrived within timeout ms or if the buffer is closed and empty
+        with QMutexLocker(self.bufferProtect):
+            # Wait for an item
+            deadline = QElapsedTimer()
+            deadline.start()
+            while self.count == 0 and not self.closed:
+                if not self.wait(self.notEmpty, deadline, timeout):
+                    break
+            if self.count == 0:
+                return None
+            data = self.takeOldest()
+            self.notFull.wakeOne()
+            # Return item to caller
+            return data
+
+    def getBatch(self, maxItems, timeout=0, firstTimeout=-1):
+        # Wait up to firstTimeout ms for the first item (< 0: until one arrives), then take up to maxItems
+        # items. If fewer are queued, wait up to timeout ms (counted from the first item) for more. Returns a
+        # list of FrameData in capture order (empty if no item arrived in time or the buffer is closed and empty).
+        batch = []
+        with QMutexLocker(self.bufferProtect):
+            deadline = QElapsedTimer()
+            deadline.start()
+            while self.count == 0:
+                if self.closed or not self.wait(self.notEmpty, deadline, firstTimeout):
+                    return batch
+            deadline.start()
+            while True:
+                while self.count > 0 and len(batch) < maxItems:
+                    batch.append(self.takeOldest())
+                # Producer may be waiting for several slots
+                self.notFull.wakeAll()
+                remaining = timeout - deadline.elapsed()
+                if len(batch) >= maxItems or remaining <= 0 or self.closed:
+                    return batch
+                self.notEmpty.wait(self.bufferProtect, remaining)
+
+    def clear(self):
+        with QMutexLocker(self.bufferProtect):
+            # Check if buffer contains items
+            if self.count == 0:
+                return False
+            # Recycle all buffered frames
+            for _ in range(self.count):
+                self.framePool.release(self.slots[self.head].data)
+                self.slots[self.head] = None
+                self.head = (self.head + 1) % self.bufferSize
+            self.head = 0
+            self.count = 0
+            # Wake up producers blocked on a full buffer
+            self.notFull.wakeAll()
+            return True
+
+    def setCapacity(self, capacity):
+        # Limit the number of queued frames (1 <= capacity <= buffer size), frames above it are not evicted
+        # but the producer waits/drops until the consumer took them
+        with QMutexLocker(self.bufferProtect):
+            self.capacity = max(1, min(capacity, self.bufferSize))
+            if self.ownsFramePool:
+                self.framePool.setMaxSize(self.capacity + FRAME_POOL_IN_FLIGHT_FRAMES)
+            self.notFull.wakeAll()
+
+    def queuedFrames(self):
+        # Frames (arrays) currently in the buffer, oldest first
+        with QMutexLocker(self.bufferProtect):
+            return [self.slots[(self.head + i) % self.bufferSize].data for i in range(self.count)]
+
+    def bytesInUse(self):
+        # Memory of queued frames and of free frames kept for reuse
+        return sum(frame.nbytes for frame in self.queuedFrames()) + self.framePool.nbytes()
+
+    def close(self):
+        # Wake up all waiting threads: add() fails from now on, get() returns the remaining frames, then None
+        with QMutexLocker(self.bufferProtect):
+            self.closed = True
+            self.notEmpty.wakeAll()
+            self.notFull.wakeAll()
+            if self.frameAddedCallback is not None:
+                self.frameAddedCallback()
+
+    def setFrameAddedCallback(self, callback):
+        # callback() must not call back into this buffer (None: no callback)
+        with QMutexLocker(self.bufferProtect):
+            self.frameAddedCallback = callback
+
+    def isClosed(self):
+        return self.closed
+
+    def size(self):
+        return self.count
+
+    def maxSize(self):
+        return self.capacity
+
+    def isFull(self):
+        return self.count >= self.capacity
+
+    def isEmpty(self):
+        return self.count == 0
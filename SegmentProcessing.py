@@ -0,0 +1,236 @@
+import argparse
+import multiprocessing
+from datetime import datetime, timedelta
+
+import av
+import pandas as pd
+
+from Config import *
+
+
+def find_segments(filename, n_segments):
+    """Split a video file into time segments that start on keyframes.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the video file.
+    n_segments : int
+        Number of segments to split the video into.
+
+    Returns
+    -------
+    List[(float, float)]
+        (start, end) of every segment in seconds from the start of the video.
+        Fewer than `n_segments` are returned if the video has too few keyframes.
+
+    Raises
+    ------
+    ValueError
+        If the duration of the video cannot be determined (no timestamps).
+
+    """
+    container = av.open(filename)
+    stream = container.streams.video[0]
+    start_pts = stream.start_time or 0
+    if stream.duration is not None:
+        duration = float(stream.duration * stream.time_base)
+    elif container.duration is not None:
+        duration = container.duration / av.time_base
+    else:
+        # No duration in the headers (e.g. raw H.264 or streamed MKV)
+        duration = demux_duration(container, stream, start_pts)
+        if duration is None:
+            container.close()
+            raise ValueError("Cannot determine the duration of %s (no timestamps), it cannot be split into "
+                             "segments. Process it with the serial path (main.py) instead." % filename)
+
+    boundaries = [0.0]
+    for i in range(1, n_segments):
+        target = duration * i / n_segments
+        # Snap the boundary to the keyframe before the target
+        container.seek(int(target / stream.time_base) + start_pts, backward=True, any_frame=False, stream=stream)
+        for packet in container.demux(stream):
+            if packet.pts is not None:
+                keyframe_time = float((packet.pts - start_pts) * stream.time_base)
+                break
+        else:
+            continue
+        if keyframe_time > boundaries[-1]:
+            boundaries.append(keyframe_time)
+    boundaries.append(duration)
+    container.close()
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def demux_duration(container, stream, start_pts):
+    """Find the duration of a video by demuxing it to the last packet.
+
+    Returns
+    -------
+    Optional[float]
+        End of the last packet in seconds from the start of the video, or
+        None if no packet carries a timestamp.
+
+    """
+    end_pts = None
+    for packet in container.demux(stream):
+        pts = packet.pts if packet.pts is not None else packet.dts
+        if pts is not None:
+            packet_end = pts + (packet.duration or 0)
+            end_pts = packet_end if end_pts is None else max(end_pts, packet_end)
+    if end_pts is None:
+        return None
+    return float((end_pts - start_pts) * stream.time_base)
+
+
+def process_segment(task):
+    """Run detection and tracking on one segment (executed in a worker process).
+
+    The tracker is warmed up on `overlap` seconds before the segment start so
+    vehicles entering across the boundary keep their track. Only vehicles
+    counted inside [start, end) are returned.
+
+    Returns
+    -------
+    List[(float, str, str, int)]
+        Counted vehicles as (seconds from video start, direction, class name, track id).
+    """
+    filename, starting_time, start, end, overlap, roi = task
+    # Imported here: every worker process loads its own detector and ReID models
+    from ObjectDetection import DeepSortApp
+    app = DeepSortApp(recordEvents=True)
+
+    container = av.open(filename)
+    stream = container.streams.video[0]
+    # Parallelism comes from the worker processes, keep decoding single-threaded
+    stream.codec_context.thread_type = 'NONE'
+    start_pts = stream.start_time or 0
+    warmup_start = max(0.0, start - overlap)
+    container.seek(int(warmup_start / stream.time_base) + start_pts, backward=True, any_frame=False, stream=stream)
+
+    done = False
+    for packet in container.demux(stream):
+        for frame in packet.decode():
+            if frame.pts is None:
+                continue
+            t = float((frame.pts - start_pts) * stream.time_base)
+            if t < warmup_start:
+                continue
+            # The next segment owns everything from here on
+            if t >= end:
+                done = True
+                break
+            image = frame.to_ndarray(format='bgr24')
+            if not hasattr(app, 'roi'):
+                if roi is None:
+                    # Same default counting band as CameraView
+                    height, width = image.shape[:2]
+                    roi = [(0, height * 50 / 100), (width, height * 50 / 100),
+                           (width, height * 70 / 100), (0, height * 70 / 100)]
+                app.setRoi(roi)
+            app.process(image, starting_time + timedelta(seconds=t))
+        if done:
+            break
+    container.close()
+
+    events = []
+    for event_time, direction, class_name, track_id in app.events:
+        t = (event_time - starting_time).total_seconds()
+        # Vehicles counted during the warm-up belong to the previous segment
+        if start <= t < end:
+            events.append((t, direction, class_name, track_id))
+    return events
+
+
+def merge_events(segments, segment_events, tolerance):
+    """Merge the events of all segments and remove duplicates at the boundaries.
+
+    A vehicle crossing the counting line close to a segment boundary can be
+    counted by both neighbouring workers (at slightly different times). An event
+    of the later segment is dropped if the earlier segment counted a vehicle of
+    the same class and direction within `tolerance` seconds across the boundary.
+    """
+    merged = list(segment_events[0]) if segment_events else []
+    for i in range(1, len(segment_events)):
+        boundary = segments[i][0]
+        # Events of the previous segment that could be duplicated by this one
+        candidates = [e for e in segment_events[i - 1] if e[0] >= boundary - tolerance]
+        for event in segment_events[i]:
+            if event[0] < boundary + tolerance:
+                duplicate = None
+                for candidate in candidates:
+                    if (candidate[1] == event[1] and candidate[2] == event[2]
+                            and event[0] - candidate[0] <= tolerance):
+                        duplicate = candidate
+                        break
+                if duplicate is not None:
+                    # Every event can only match once
+                    candidates.remove(duplicate)
+                    continue
+            merged.append(event)
+    merged.sort(key=lambda e: e[0])
+    return merged
+
+
+def process_video(filename, starting_time, n_workers, overlap=DEFAULT_SEGMENT_OVERLAP,
+                  tolerance=DEFAULT_SEGMENT_DEDUP_TOLERANCE, roi=None):
+    """Process a long recording in parallel segments.
+
+    Returns
+    -------
+    List[(datetime, str, str)]
+        Counted vehicles as (time on the recording clock, direction, class name).
+    """
+    segments = find_segments(filename, n_workers)
+    tasks = [(filename, starting_time, start, end, overlap, roi) for start, end in segments]
+    # TensorFlow does not survive fork(), start clean worker processes
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes=len(tasks)) as pool:
+        segment_events = pool.map(process_segment, tasks)
+    return [(starting_time + timedelta(seconds=t), direction, class_name)
+            for t, direction, class_name, _ in merge_events(segments, segment_events, tolerance)]
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Parallel offline processing of a long recording")
+    parser.add_argument(
+        "--video", required=True, help="Path to the video file.")
+    parser.add_argument(
+        "--video_date", required=True, help="Date of recording (dd/mm/yyyy).")
+    parser.add_argument(
+        "--video_time", required=True, help="Starting time of recording (HH:MM:SS).")
+    parser.add_argument(
+        "--workers", type=int, default=multiprocessing.cpu_count(),
+        help="Number of segments/worker processes.")
+    parser.add_argument(
+        "--overlap", type=float, default=DEFAULT_SEGMENT_OVERLAP,
+        help="Seconds decoded before every segment to warm up the tracker.")
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_SEGMENT_DEDUP_TOLERANCE,
+        help="Events of the same class/direction closer than this across a "
+        "segment boundary are counted once.")
+    parser.add_argument(
+        "--output", default=None, help="Output .xlsx file. Defaults to <timestamp>.xlsx.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    starting_time = datetime.strptime("{} {}".format(args.video_date, args.video_time), '%d/%m/%Y %H:%M:%S')
+    events = process_video(args.video, starting_time, args.workers, args.overlap, args.tolerance)
+
+    # Same format as the vehicle list in CameraView
+    opt_list = ["{}_{}_{}".format(tm.strftime('%Y-%m-%d_%H:%M:%S'), direction, class_name)
+                for tm, direction, class_name in events]
+    list_df = pd.DataFrame(opt_list)
+    path = args.output or f"{datetime.now().timestamp()}.xlsx"
+    with pd.ExcelWriter(path) as writer:
+        list_df.to_excel(writer, index=False, header=False)
+    print("%d vehicles counted, saved to %s" % (len(events), path))
+
+
+if __name__ == '__main__':
+    main()
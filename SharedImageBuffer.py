@@ -1,67 +1,183 @@
-from PyQt5.QtCore import QMutexLocker, QMutex, QWaitCondition
+from PyQt5.QtCore import QMutexLocker, QMutex, qDebug
+
+from FanOutBuffer import FanOutBuffer
+from StreamSynchronizer import StreamSynchronizer
+from Config import DEFAULT_DROP_EVERY_NTH, DEFAULT_FRAME_MEMORY_BUDGET, \
+    DEFAULT_STREAM_MEMORY_PRIORITY, PROCESSING_MAX_BATCH_SIZE
 
 
 class SharedImageBuffer(object):
-    def __init__(self):
+    def __init__(self, memoryBudget=DEFAULT_FRAME_MEMORY_BUDGET):
         # Initialize variables(s)
-        self.nArrived = 0
-        self.doSync = False
-        self.syncSet = set()
-        self.wc = QWaitCondition()
+        # Frame memory (bytes) shared by all image buffers
+        self.memoryBudget = memoryBudget
+        self.budgetMutex = QMutex()
+        self.streamPriority = dict()
+        self.frameBytes = dict()
+        # Frames each consumer of a stream holds outside the image buffer: consumer id -> number of frames
+        self.framesInFlight = dict()
+        # Streams whose share cannot hold their frames in flight and one queued frame
+        self.overBudget = set()
+        # Aligns the streams added with sync=True by frame timestamp
+        self.synchronizer = StreamSynchronizer()
         self.imageBufferDict = dict()
-        self.mutex = QMutex()
-        self.video_date_time = None
-        self.remain_video = None
+        # Consumers (e.g. processing threads of the CameraViews) of each image buffer
+        self.consumerDict = dict()
 
-    def add(self, deviceUrl, imageBuffer, sync=False):
+    def add(self, deviceUrl, imageBuffer, sync=False, priority=DEFAULT_STREAM_MEMORY_PRIORITY):
         # Device stream is to be synchronized
         if sync:
-            with QMutexLocker(self.mutex):
-                self.syncSet.add(deviceUrl)
+            self.synchronizer.add(deviceUrl)
         # Add image buffer to map
         self.imageBufferDict[deviceUrl] = imageBuffer
+        self.consumerDict[deviceUrl] = set()
+        # Stream takes part in the memory budget once its frame size is known (setFrameBytes)
+        with QMutexLocker(self.budgetMutex):
+            self.streamPriority[deviceUrl] = priority
+            self.frameBytes[deviceUrl] = 0
+            self.framesInFlight[deviceUrl] = dict()
+
+    def setFrameBytes(self, deviceUrl, frameBytes):
+        # Size of one frame of the stream (output resolution)
+        with QMutexLocker(self.budgetMutex):
+            self.frameBytes[deviceUrl] = frameBytes
+            self.divideMemoryBudget()
+
+    def setStreamPriority(self, deviceUrl, priority):
+        with QMutexLocker(self.budgetMutex):
+            self.streamPriority[deviceUrl] = priority
+            self.divideMemoryBudget()
+
+    def setMemoryBudget(self, memoryBudget):
+        with QMutexLocker(self.budgetMutex):
+            self.memoryBudget = memoryBudget
+            self.divideMemoryBudget()
+
+    def divideMemoryBudget(self):
+        # Called with budgetMutex locked. Every stream gets a share proportional to priority * frame size,
+        # i.e. the same number of frames per unit of priority whatever its resolution. Frames in flight (the
+        # frame written by the capture thread, the batches held by the consumers) count against the share.
+        # At least one frame can always be queued: a share too small for that is exceeded and reported.
+        weights = {deviceUrl: self.streamPriority[deviceUrl] * frameBytes
+                   for deviceUrl, frameBytes in self.frameBytes.items() if frameBytes > 0}
+        totalWeight = sum(weights.values())
+        for deviceUrl, weight in weights.items():
+            share = self.memoryBudget * weight / totalWeight
+            nInFlight = 1 + sum(self.framesInFlight[deviceUrl].values())
+            nFrames = int(share // self.frameBytes[deviceUrl]) - nInFlight
+            if nFrames < 1:
+                if deviceUrl not in self.overBudget:
+                    qDebug("[%s] WARNING: Frame memory budget (%.1f MB for this stream) is too small for %d frames "
+                           "in flight and one queued frame." % (deviceUrl, share / 1048576, nInFlight))
+                self.overBudget.add(deviceUrl)
+            else:
+                self.overBudget.discard(deviceUrl)
+            self.imageBufferDict[deviceUrl].setCapacity(max(1, nFrames))
+
+    def bytesInUse(self, deviceUrl):
+        # Frame memory of the stream: held by its image buffer + frames in flight (as counted by the budget)
+        return self.imageBufferDict[deviceUrl].bytesInUse() + self.bytesInFlight(deviceUrl)
+
+    def totalBytesInUse(self):
+        return sum(imageBuffer.bytesInUse() + self.bytesInFlight(deviceUrl)
+                   for deviceUrl, imageBuffer in list(self.imageBufferDict.items()))
+
+    def bytesInFlight(self, deviceUrl):
+        # Frame being written by the capture thread + frames held by the consumers
+        with QMutexLocker(self.budgetMutex):
+            framesInFlight = self.framesInFlight.get(deviceUrl)
+            if not framesInFlight:
+                return 0
+            return (1 + sum(framesInFlight.values())) * self.frameBytes[deviceUrl]
+
+    def isOverBudget(self, deviceUrl):
+        # Share of the stream in the memory budget is exceeded (see divideMemoryBudget)
+        with QMutexLocker(self.budgetMutex):
+            return deviceUrl in self.overBudget
+
+    def getMemoryBudget(self):
+        return self.memoryBudget
+
+    def createImageBuffer(self, size, everyNth=DEFAULT_DROP_EVERY_NTH):
+        # Image buffer of one capture, read by any number of consumers
+        return FanOutBuffer(size, everyNth)
 
     def getByDeviceUrl(self, deviceUrl):
         return self.imageBufferDict[deviceUrl]
 
+    def addConsumer(self, deviceUrl, consumerId, size=None, dropPolicy=None,
+                    framesInFlight=PROCESSING_MAX_BATCH_SIZE):
+        # Consumer gets its own buffer (cursor) of the stream with its own size and drop policy
+        # (None: policy of the capture thread). framesInFlight: most frames the consumer holds at once (taken
+        # from the buffer and not released yet).
+        self.imageBufferDict[deviceUrl].addConsumer(consumerId, size, dropPolicy)
+        self.consumerDict[deviceUrl].add(consumerId)
+        with QMutexLocker(self.budgetMutex):
+            self.framesInFlight[deviceUrl][consumerId] = framesInFlight
+            self.divideMemoryBudget()
+
+    def getConsumer(self, deviceUrl, consumerId):
+        # Buffer the consumer reads from
+        return self.imageBufferDict[deviceUrl].getConsumer(consumerId)
+
+    def getDropPolicy(self, deviceUrl, consumerId):
+        # Effective drop policy of the consumer (its own or the one of the capture thread)
+        return self.imageBufferDict[deviceUrl].dropPolicyOf(consumerId)
+
+    def closeConsumer(self, deviceUrl, consumerId):
+        # Release a consumer that is being stopped, the stream goes on for the other consumers
+        self.getConsumer(deviceUrl, consumerId).close()
+
+    def removeConsumer(self, deviceUrl, consumerId):
+        if consumerId not in self.consumerDict.get(deviceUrl, ()):
+            return
+        self.consumerDict[deviceUrl].discard(consumerId)
+        self.imageBufferDict[deviceUrl].removeConsumer(consumerId)
+        with QMutexLocker(self.budgetMutex):
+            self.framesInFlight[deviceUrl].pop(consumerId, None)
+            self.divideMemoryBudget()
+
+    def nConsumers(self, deviceUrl):
+        return len(self.consumerDict.get(deviceUrl, ()))
+
     def removeByDeviceUrl(self, deviceUrl):
         # Remove buffer for device from imageBufferDict
         self.imageBufferDict.pop(deviceUrl)
+        self.consumerDict.pop(deviceUrl, None)
+        # Give the memory of the stream to the others
+        with QMutexLocker(self.budgetMutex):
+            self.streamPriority.pop(deviceUrl, None)
+            self.frameBytes.pop(deviceUrl, None)
+            self.framesInFlight.pop(deviceUrl, None)
+            self.overBudget.discard(deviceUrl)
+            self.divideMemoryBudget()
 
-        # Also remove from syncSet (if present)
-        with QMutexLocker(self.mutex):
-            if self.syncSet.__contains__(deviceUrl):
-                self.syncSet.remove(deviceUrl)
-                self.wc.wakeAll()
-
-    def sync(self, deviceUrl):
-        # Only perform sync if enabled for specified device/stream
-        self.mutex.lock()
-        if self.syncSet.__contains__(deviceUrl):
-            # Increment arrived count
-            self.nArrived += 1
-            # We are the last to arrive: wake all waiting threads
-            if self.doSync and self.nArrived == len(self.syncSet):
-                self.wc.wakeAll()
-            # Still waiting for other streams to arrive: wait
-            else:
-                self.wc.wait(self.mutex)
-            # Decrement arrived count
-            self.nArrived -= 1
-        self.mutex.unlock()
+        # Also remove from synchronization (if present)
+        self.synchronizer.remove(deviceUrl)
+
+    def sync(self, deviceUrl, timestamp):
+        # Align the stream with the other synchronized streams by frame timestamp (seconds). Returns the number
+        # of times the frame is to be added to the image buffer: 0 -> dropped, 1 -> normal, > 1 -> repeated.
+        # Streams that are not synchronized return 1 without locking.
+        return self.synchronizer.sync(deviceUrl, timestamp)
+
+    def syncStatistics(self, deviceUrl):
+        # Frames (dropped, duplicated) by synchronization
+        return self.synchronizer.droppedFrames(deviceUrl), self.synchronizer.duplicatedFrames(deviceUrl)
 
-    def wakeAll(self):
-        with QMutexLocker(self.mutex):
-            self.wc.wakeAll()
+    def close(self, deviceUrl):
+        # Release the threads of a stream that is being stopped: sync() returns and the image buffer is closed
+        self.synchronizer.remove(deviceUrl)
+        self.imageBufferDict[deviceUrl].close()
 
     def setSyncEnabled(self, enable):
-        self.doSync = enable
+        self.synchronizer.setEnabled(enable)
 
     def isSyncEnabledForDeviceUrl(self, deviceUrl):
-        return self.syncSet.__contains__(deviceUrl)
+        return self.synchronizer.contains(deviceUrl)
 
     def getSyncEnabled(self):
-        return self.doSync
+        return self.synchronizer.isEnabled()
 
     def containsImageBufferForDeviceUrl(self, deviceUrl):
         return self.imageBufferDict.__contains__(deviceUrl)
@@ -0,0 +1,42 @@
+from PyQt5.QtCore import QTime
+import copy
+
+from Config import *
+
+
+class StatsPublisher(object):
+    def __init__(self, signal, rate=DEFAULT_STATS_PUBLISH_RATE):
+        # Signal used to push statistics snapshots to the GUI thread
+        self.signal = signal
+        self.t = QTime()
+        self.t.start()
+        self.setRate(rate)
+
+    def setRate(self, rate):
+        # Minimum time between two snapshots in ms (rate <= 0 -> publish every update)
+        self.interval = int(1000 / rate) if rate > 0 else 0
+
+    def publish(self, statsData, force=False):
+        # Called by the worker thread after every frame, only emits once per interval
+        if not force and self.t.elapsed() < self.interval:
+            return False
+        # Emit a copy: the worker keeps updating statsData while the GUI reads the snapshot
+        self.signal.emit(copy.copy(statsData))
+        self.t.start()
+        return True
+
+
+class FPSAverage(object):
+    def __init__(self, alpha):
+        # Weight of the newest sample in the running average
+        self.alpha = alpha
+        self.averageTime = 0.0
+
+    def update(self, timeElapsed):
+        # Running EWMA of the frame time in ms, returns the corresponding FPS
+        if timeElapsed > 0:
+            if self.averageTime == 0.0:
+                self.averageTime = float(timeElapsed)
+            else:
+                self.averageTime += self.alpha * (timeElapsed - self.averageTime)
+        return 1000 / self.averageTime if self.averageTime > 0 else 0.0
@@ -0,0 +1,127 @@
+from PyQt5.QtCore import QMutexLocker, QMutex, QWaitCondition, QElapsedTimer
+
+from Config import STREAM_SYNC_SKEW_TOLERANCE, STREAM_SYNC_MAX_WAIT, STREAM_SYNC_MAX_DUPLICATES
+
+
+class StreamSynchronizer(object):
+    # Aligns synchronized streams by frame timestamp (recording time in seconds): a stream that is ahead
+    # of the others by more than the skew tolerance waits, a stream that is behind drops frames until it
+    # caught up, and a stream with a lower frame rate repeats frames so that all streams deliver the same
+    # number of frames per second of recording. Streams may run at different frame rates.
+    def __init__(self, skewTolerance=STREAM_SYNC_SKEW_TOLERANCE, maxWait=STREAM_SYNC_MAX_WAIT):
+        self.skewTolerance = skewTolerance
+        # Longest wait (ms) for a lagging stream, afterwards it is treated as stalled until it sends a frame
+        self.maxWait = maxWait
+        self.enabled = False
+        # Synchronized streams (read without lock by the fast path)
+        self.streams = set()
+        # Timestamp of the current frame of each stream (waiting or passed)
+        self.position = dict()
+        # Timestamp difference of the last two frames of each stream
+        self.interval = dict()
+        self.stalled = set()
+        self.nDropped = dict()
+        self.nDuplicated = dict()
+        # Threads waiting in sync()
+        self.nWaiting = 0
+        self.mutex = QMutex()
+        self.moved = QWaitCondition()
+
+    def add(self, deviceUrl):
+        with QMutexLocker(self.mutex):
+            self.streams.add(deviceUrl)
+            self.nDropped[deviceUrl] = 0
+            self.nDuplicated[deviceUrl] = 0
+
+    def remove(self, deviceUrl):
+        # Stream no longer holds back the others, a thread waiting in sync() returns
+        with QMutexLocker(self.mutex):
+            self.streams.discard(deviceUrl)
+            self.stalled.discard(deviceUrl)
+            for streamDict in (self.position, self.interval):
+                streamDict.pop(deviceUrl, None)
+            self.moved.wakeAll()
+
+    def sync(self, deviceUrl, timestamp):
+        # Returns the number of times the frame is to be queued: 0 if it is dropped (stream is behind),
+        # more than 1 if the stream has a lower frame rate than the fastest synchronized stream
+        # Fast path: streams that are not synchronized do not take the lock
+        if deviceUrl not in self.streams:
+            return 1
+        with QMutexLocker(self.mutex):
+            previous = self.position.get(deviceUrl)
+            if previous is not None and timestamp > previous:
+                self.interval[deviceUrl] = timestamp - previous
+            self.position[deviceUrl] = timestamp
+            self.stalled.discard(deviceUrl)
+            # Streams waiting for this one may go on
+            self.moved.wakeAll()
+            # Wait until synchronization is started and no other stream lags more than skewTolerance behind
+            waited = QElapsedTimer()
+            waited.start()
+            while deviceUrl in self.streams:
+                if not self.enabled:
+                    self.wait()
+                    waited.start()
+                    continue
+                lagging = self.lagging(deviceUrl, timestamp)
+                if not lagging:
+                    break
+                remaining = self.maxWait - waited.elapsed()
+                if remaining <= 0:
+                    # Do not let one slow (or paused) stream stall the others
+                    self.stalled.update(lagging)
+                    break
+                self.wait(remaining)
+            if deviceUrl not in self.streams:
+                return 1
+            # Behind the other streams: drop frames until caught up
+            others = [self.position[other] for other in self.streams
+                      if other != deviceUrl and other not in self.stalled and other in self.position]
+            if others and timestamp < max(others) - self.skewTolerance:
+                self.nDropped[deviceUrl] += 1
+                return 0
+            # Fill the gap to the previous frame at the frame rate of the fastest stream
+            nCopies = 1
+            intervals = [self.interval[other] for other in self.streams if other in self.interval]
+            if deviceUrl in self.interval and intervals:
+                nCopies = int(round(self.interval[deviceUrl] / min(intervals)))
+                nCopies = max(1, min(nCopies, STREAM_SYNC_MAX_DUPLICATES + 1))
+            self.nDuplicated[deviceUrl] += nCopies - 1
+            return nCopies
+
+    def wait(self, timeout=-1):
+        # Called with mutex locked
+        self.nWaiting += 1
+        if timeout < 0:
+            self.moved.wait(self.mutex)
+        else:
+            self.moved.wait(self.mutex, timeout)
+        self.nWaiting -= 1
+
+    def nWaitingStreams(self):
+        with QMutexLocker(self.mutex):
+            return self.nWaiting
+
+    def lagging(self, deviceUrl, timestamp):
+        # Called with mutex locked. Streams (not stalled) whose current frame is older than timestamp - skewTolerance
+        return [other for other in self.streams
+                if other != deviceUrl and other not in self.stalled
+                and (other not in self.position or self.position[other] < timestamp - self.skewTolerance)]
+
+    def droppedFrames(self, deviceUrl):
+        return self.nDropped.get(deviceUrl, 0)
+
+    def duplicatedFrames(self, deviceUrl):
+        return self.nDuplicated.get(deviceUrl, 0)
+
+    def setEnabled(self, enable):
+        with QMutexLocker(self.mutex):
+            self.enabled = enable
+            self.moved.wakeAll()
+
+    def isEnabled(self):
+        return self.enabled
+
+    def contains(self, deviceUrl):
+        return deviceUrl in self.streams
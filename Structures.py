@@ -17,6 +17,13 @@ class ImageProcessingSettings(object):
         self.cannyL2gradient = bool()
 
 
+class DecoderSettings(object):
+    def __init__(self):
+        self.threadType = str()
+        self.threadCount = int()
+        self.transportMode = int()
+
+
 class ImageProcessingFlags(object):
     def __init__(self):
         self.grayscaleOn = False
@@ -28,6 +35,33 @@ class ImageProcessingFlags(object):
         self.yoloOn = False
 
 
+class PipelineState(object):
+    RUNNING = 0
+    PAUSED = 1
+    STOPPING = 2
+
+
+class FrameFormat(object):
+    # Pixel formats declared by processing stages
+    ANY = 'any'  # Stage accepts/keeps the format of its input
+    BGR = 'bgr'  # 8-bit, 3 channels (captured frames)
+    GRAY = 'gray'  # 8-bit, 1 channel
+
+
+class DropPolicy(object):
+    # BLOCK/DROP_OLDEST equal dropIfFull=False/True of the former Buffer
+    AUTO = -1  # BLOCK for video files, DROP_OLDEST for live streams
+    BLOCK = 0
+    DROP_OLDEST = 1
+    DROP_NEWEST = 2
+    KEEP_LATEST = 3
+    EVERY_NTH = 4
+    # Reasons counted by the image buffers
+    REASONS = ('oldest', 'newest', 'superseded', 'decimated')
+    NAMES = {AUTO: 'AUTO', BLOCK: 'BLOCK', DROP_OLDEST: 'DROP_OLDEST', DROP_NEWEST: 'DROP_NEWEST',
+             KEEP_LATEST: 'KEEP_LATEST', EVERY_NTH: 'EVERY_NTH'}
+
+
 class MouseData(object):
     def __init__(self):
         self.selectionBox = QRect()
@@ -35,7 +69,35 @@ class MouseData(object):
         self.rightButtonRelease = bool()
 
 
+class FrameData(object):
+    # Frame envelope passed through the image buffers
+    __slots__ = ('data', 'timestamp', 'frameIndex', 'captureTime', 'deviceUrl')
+
+    def __init__(self, data, timestamp, frameIndex, captureTime, deviceUrl):
+        self.data = data  # Pixels (numpy.ndarray)
+        self.timestamp = timestamp  # Recording date/time of the frame (datetime, from pts)
+        self.frameIndex = frameIndex  # Frame number counted from the start of the video
+        self.captureTime = captureTime  # Wall-clock time the frame was captured (time.time())
+        self.deviceUrl = deviceUrl  # Source
+
+
 class ThreadStatisticsData(object):
     def __init__(self):
         self.averageFPS = 0.0
         self.nFramesProcessed = 0
+        self.framePoolHits = 0
+        self.framePoolMisses = 0
+        self.droppedFrames = dict.fromkeys(DropPolicy.REASONS, 0)
+        # Processing: policy the frames of this consumer are added to its image buffer with
+        self.dropPolicy = DropPolicy.AUTO
+        # Stream synchronization: frames dropped to catch up / repeated to match faster streams
+        self.nSyncDropped = 0
+        self.nSyncDuplicated = 0
+        self.latency = 0
+        # Processing: bytes copied per frame (ROI, copy-on-write before drawing, display conversion)
+        self.bytesCopied = 0
+        # Processing: average time per frame of every stage of the plan in ms (name -> ms)
+        self.stageTimes = dict()
+        self.nReconnects = 0
+        self.packetQueueSize = 0
+        self.packetQueueBytes = 0
@@ -0,0 +1,80 @@
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+# Modules live in the application root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from Structures import FrameData
+
+# Tiny frames: the tests check buffer behavior, not pixels
+SHAPE = (2, 2, 3)
+
+
+@pytest.fixture(scope='session')
+def video_file(tmp_path_factory):
+    # 3 s of 64x48 video at 30 fps, keyframe every 12 frames, pixel values 40 + 2 * frame index
+    av = pytest.importorskip('av')
+    path = str(tmp_path_factory.mktemp('video') / 'clip.mp4')
+    container = av.open(path, 'w')
+    stream = container.add_stream('mpeg4', rate=30)
+    stream.width, stream.height, stream.pix_fmt = 64, 48, 'yuv420p'
+    stream.codec_context.gop_size = 12
+    for i in range(90):
+        frame = av.VideoFrame.from_ndarray(np.full((48, 64, 3), 40 + 2 * i, np.uint8), format='bgr24')
+        for packet in stream.encode(frame):
+            container.mux(packet)
+    for packet in stream.encode():
+        container.mux(packet)
+    container.close()
+    return path
+
+
+@pytest.fixture
+def make_frame():
+    # make_frame(i, buffer=None): frame i, its data acquired from the frame pool of buffer (recycled on drop)
+    def make(i, buffer=None):
+        return FrameData(np.zeros(SHAPE, np.uint8) if buffer is None else buffer.acquire(SHAPE), None, i, 0.0, "test")
+    return make
+
+
+@pytest.fixture
+def queued():
+    # queued(buffer): indices of the frames queued in a buffer (taken out of it)
+    def take(buffer):
+        return [frameData.frameIndex for frameData in buffer.getBatch(buffer.size(), 0, 0)]
+    return take
+
+
+@pytest.fixture
+def start_thread():
+    # start_thread(target, *args): runs target on a producer/consumer thread, returns (thread, result) where
+    # result gets the return value. Threads still running are joined at teardown.
+    threads = []
+
+    def start(target, *args):
+        result = []
+        thread = threading.Thread(target=lambda: result.append(target(*args)), daemon=True)
+        thread.start()
+        threads.append(thread)
+        return thread, result
+    yield start
+    for thread in threads:
+        thread.join(5)
+
+
+@pytest.fixture
+def wait_until():
+    # wait_until(predicate, timeout=5): True once predicate() holds, False after timeout seconds
+    def wait(predicate, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+    return wait
@@ -0,0 +1,98 @@
+import pytest
+
+pytest.importorskip('av')
+pytest.importorskip('cv2')
+
+import CaptureThread as captureThreadModule
+from CameraConnectDialog import VideoSetting
+from CaptureThread import CaptureThread
+from SharedImageBuffer import SharedImageBuffer
+from Structures import DecoderSettings, DropPolicy
+
+
+@pytest.fixture
+def capture(video_file):
+    # capture(skipDuration='00:00:00', width=-1, height=-1): connected CaptureThread of video_file (not started)
+    threads = []
+
+    def connect(skipDuration='00:00:00', width=-1, height=-1):
+        sharedImageBuffer = SharedImageBuffer()
+        sharedImageBuffer.add(video_file, sharedImageBuffer.createImageBuffer(10))
+        decoderSettings = DecoderSettings()
+        decoderSettings.threadType, decoderSettings.threadCount = 'AUTO', 0
+        captureThread = CaptureThread(sharedImageBuffer, video_file, DropPolicy.AUTO, 'CAP_ANY', width, height,
+                                      VideoSetting('01/01/2020', '08:00:00', skipDuration), decoderSettings)
+        assert captureThread.connectToCamera()
+        threads.append(captureThread)
+        return captureThread
+    yield connect
+    for captureThread in threads:
+        captureThread.disconnectCamera()
+
+
+def frame_index_of(frame):
+    # Pixels of frame i of video_file are 40 + 2 * i (approximately, after compression)
+    return (frame.to_ndarray(format='bgr24').mean() - 40) / 2
+
+
+def test_skip_duration_starts_at_the_target_between_keyframes(capture):
+    # 1 s = frame 30, keyframes are at 24 and 36
+    captureThread = capture('00:00:01')
+    frames = list(captureThread.frames)
+    frameIndex, ptsTime, frame = frames[0]
+    assert (frameIndex, ptsTime) == (30, pytest.approx(1.0))
+    assert frame_index_of(frame) == pytest.approx(30, abs=2)
+    assert [frameIndex for frameIndex, _, _ in frames] == list(range(30, 90))
+
+
+def test_requested_resolution_keeps_the_aspect_ratio(capture):
+    captureThread = capture(width=32)
+    assert (captureThread.outputWidth, captureThread.outputHeight) == (32, 24)
+    captureThread.width, captureThread.height = -1, 30
+    captureThread.setOutputResolution(64, 48)
+    # Rounded to even for chroma subsampling
+    assert (captureThread.outputWidth, captureThread.outputHeight) == (40, 30)
+
+
+def test_plane_view_drops_the_row_padding(capture):
+    captureThread = capture()
+    _, _, frame = next(captureThread.frames)
+    bgrFrame = frame.reformat(width=30, height=20, format='bgr24')
+    view = captureThread.planeView(bgrFrame)
+    assert view.shape == (20, 30, 3)
+    assert (view == bgrFrame.to_ndarray()).all()
+
+
+def test_speed_hands_out_every_nth_frame_and_skips_non_reference_frames(capture):
+    captureThread = capture()
+    captureThread.setSpeed(captureThreadModule.SKIP_NONREF_FRAMES_MIN_SPEED)
+    frameIndices = [frameIndex for frameIndex, _, _ in captureThread.frames]
+    assert frameIndices == list(range(0, 90, captureThreadModule.SKIP_NONREF_FRAMES_MIN_SPEED))
+    assert captureThread.videoStream.codec_context.skip_frame == 'NONREF'
+
+
+def test_reconnect_backs_off_until_the_stream_opens(capture, monkeypatch):
+    captureThread = capture()
+    monkeypatch.setattr(captureThreadModule, 'LIVE_STREAM_RECONNECT_MIN_BACKOFF', 0.01)
+    monkeypatch.setattr(captureThreadModule, 'LIVE_STREAM_RECONNECT_MAX_BACKOFF', 0.02)
+    attempts = []
+
+    def openStream():
+        attempts.append(True)
+        if len(attempts) < 3:
+            raise OSError("connection refused")
+    monkeypatch.setattr(captureThread, 'openStream', openStream)
+    assert captureThread.reconnect()
+    assert len(attempts) == 3
+    assert captureThread.statsData.nReconnects == 1
+
+
+def test_stop_interrupts_the_reconnect_backoff(capture, monkeypatch, start_thread):
+    captureThread = capture()
+    monkeypatch.setattr(captureThreadModule, 'LIVE_STREAM_RECONNECT_MIN_BACKOFF', 60)
+    reconnecting, result = start_thread(captureThread.reconnect)
+    reconnecting.join(0.1)
+    assert reconnecting.is_alive()
+    captureThread.stop()
+    reconnecting.join(5)
+    assert result == [False]
@@ -0,0 +1,57 @@
+import pytest
+
+av = pytest.importorskip('av')
+
+from DemuxThread import PacketQueue, DemuxThread
+
+
+class Packet(object):
+    def __init__(self, size):
+        self.size = size
+
+
+def test_put_waits_for_room_by_count_and_bytes(start_thread):
+    packetQueue = PacketQueue(maxPackets=2, maxBytes=100)
+    assert packetQueue.put(Packet(60))
+    # Byte limit: 60 + 60 > 100
+    producer, queued = start_thread(packetQueue.put, Packet(60))
+    producer.join(0.1)
+    assert producer.is_alive()
+    assert packetQueue.get().size == 60
+    producer.join(5)
+    assert queued == [True]
+    assert (packetQueue.size(), packetQueue.bytes()) == (1, 60)
+
+
+def test_oversized_packet_is_accepted_into_an_empty_queue():
+    packetQueue = PacketQueue(maxPackets=2, maxBytes=100)
+    assert packetQueue.put(Packet(500))
+    assert packetQueue.bytes() == 500
+
+
+def test_close_wakes_up_waiting_threads(start_thread):
+    packetQueue = PacketQueue(maxPackets=1, maxBytes=100)
+    consumer, packets = start_thread(packetQueue.get)
+    consumer.join(0.1)
+    assert consumer.is_alive()
+    packetQueue.close()
+    consumer.join(5)
+    assert packets == [None]
+    assert not packetQueue.put(Packet(1))
+
+
+def test_demux_thread_queues_every_packet_then_the_end_marker(video_file):
+    container = av.open(video_file)
+    demuxThread = DemuxThread(container, container.streams.video[0], 4, 1024 * 1024)
+    demuxThread.start()
+    packets = []
+    while True:
+        packet = demuxThread.packetQueue.get()
+        if packet is None:
+            break
+        packets.append(packet)
+    demuxThread.wait()
+    container.close()
+    assert demuxThread.error is None
+    # 90 frames + flush packet
+    assert sum(1 for packet in packets if packet.size > 0) == 90
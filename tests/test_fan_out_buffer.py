@@ -0,0 +1,77 @@
+from FanOutBuffer import FanOutBuffer
+from Structures import DropPolicy
+
+
+def test_shared_frame_is_recycled_after_every_consumer_released_it(make_frame):
+    buffer = FanOutBuffer(4)
+    display = buffer.addConsumer('display')
+    recorder = buffer.addConsumer('recorder')
+    frameData = make_frame(0, buffer)
+    data = frameData.data
+    buffer.add(frameData)
+    frames = [display.get(0), recorder.get(0)]
+    # Same array for both consumers, read-only while shared
+    assert frames[0].data is data and frames[1].data is data
+    assert not data.flags.writeable
+    display.release(frames[0])
+    assert buffer.acquire(data.shape) is not data
+    recorder.release(frames[1])
+    assert data.flags.writeable
+    assert buffer.acquire(data.shape) is data
+
+
+def test_single_consumer_frame_stays_writable(make_frame):
+    buffer = FanOutBuffer(4)
+    consumer = buffer.addConsumer('display')
+    buffer.add(make_frame(0, buffer))
+    assert consumer.get(0).data.flags.writeable
+
+
+def test_consumers_have_their_own_cursor_and_drop_policy(make_frame, queued):
+    buffer = FanOutBuffer(2)
+    live = buffer.addConsumer('live', dropPolicy=DropPolicy.KEEP_LATEST)
+    analysis = buffer.addConsumer('analysis', size=10, dropPolicy=DropPolicy.DROP_NEWEST)
+    for i in range(3):
+        buffer.add(make_frame(i, buffer))
+    assert queued(live) == [2]
+    # Capacity 2 is divided across the consumers: 1 frame each
+    assert queued(analysis) == [0]
+    assert buffer.droppedFrames()['superseded'] == 2
+    assert buffer.droppedFrames()['newest'] == 2
+
+
+def test_block_consumer_paces_the_producer_while_the_others_drop(make_frame, start_thread):
+    buffer = FanOutBuffer(2)
+    recorder = buffer.addConsumer('recorder')
+    display = buffer.addConsumer('display', dropPolicy=DropPolicy.KEEP_LATEST)
+    # Capacity 2 is divided across the consumers: the recorder is full after one frame
+    buffer.add(make_frame(0, buffer))
+    producer, queuedByProducer = start_thread(buffer.add, make_frame(1, buffer))
+    producer.join(0.2)
+    # The producer waits for the recorder, the display got the new frame before
+    assert producer.is_alive()
+    assert display.get(1000).frameIndex == 1
+    assert recorder.get(0).frameIndex == 0
+    producer.join(5)
+    assert queuedByProducer == [True]
+    assert recorder.get(0).frameIndex == 1
+    assert buffer.droppedFrames()['oldest'] == 0
+
+
+def test_consumers_without_own_policy_follow_the_producer():
+    buffer = FanOutBuffer(4)
+    buffer.addConsumer('display')
+    buffer.addConsumer('recorder', dropPolicy=DropPolicy.DROP_NEWEST)
+    assert buffer.dropPolicyOf('display') == DropPolicy.BLOCK
+    buffer.setDropPolicy(DropPolicy.DROP_OLDEST)
+    assert buffer.dropPolicyOf('display') == DropPolicy.DROP_OLDEST
+    assert buffer.dropPolicyOf('recorder') == DropPolicy.DROP_NEWEST
+
+
+def test_single_block_consumer_applies_backpressure(make_frame):
+    buffer = FanOutBuffer(1)
+    consumer = buffer.addConsumer('display')
+    buffer.add(make_frame(0, buffer))
+    assert consumer.isFull()
+    assert not buffer.add(make_frame(1, buffer), DropPolicy.BLOCK, 10)
+    assert consumer.get(0).frameIndex == 0
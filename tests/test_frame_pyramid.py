@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from FramePyramid import FramePyramid
+
+
+def frame(width=64, height=48):
+    return np.random.RandomState(0).randint(0, 256, (height, width, 3)).astype(np.uint8)
+
+
+def test_resolution_is_computed_once_and_shared():
+    pyramid = FramePyramid(frame())
+    resized = pyramid.resize(32, 24)
+    assert resized.shape == (24, 32, 3)
+    assert pyramid.resize(32, 24) is resized
+
+
+def test_resolution_is_resampled_from_the_smallest_larger_one(monkeypatch):
+    pyramid = FramePyramid(frame())
+    half = pyramid.resize(32, 24)
+    sources = []
+    resize = cv2.resize
+
+    def spy(source, size, **kwargs):
+        sources.append(source)
+        return resize(source, size, **kwargs)
+    monkeypatch.setattr(cv2, 'resize', spy)
+    pyramid.resize(16, 12)
+    assert sources == [half]
+    # Half the height is too small for 40x40: from the full frame
+    pyramid.resize(40, 40)
+    assert sources[-1] is pyramid.frame
+
+
+def test_levels_are_built_from_each_other():
+    pyramid = FramePyramid(frame())
+    level2 = pyramid.level(2)
+    assert level2.shape == (12, 16, 3)
+    # Level 1 was built on the way and is reused
+    assert pyramid.level(1) is pyramid.resolutions[(32, 24)]
+    assert pyramid.level(0) is pyramid.frame
+    image, scale = pyramid.levelFor(0.3)
+    assert image is pyramid.resolutions[(32, 24)] and scale == 0.5
+
+
+def test_fitted_keeps_the_aspect_ratio_and_never_enlarges():
+    pyramid = FramePyramid(frame())
+    assert pyramid.fitted(100, 100) is pyramid.frame
+    assert pyramid.fitted(32, 100).shape == (24, 32, 3)
+
+
+def test_invalidate_drops_computed_resolutions():
+    pyramid = FramePyramid(frame())
+    resized = pyramid.resize(32, 24)
+    pyramid.invalidate()
+    assert pyramid.resize(32, 24) is not resized
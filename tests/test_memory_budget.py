@@ -0,0 +1,60 @@
+from SharedImageBuffer import SharedImageBuffer
+
+FRAME_BYTES = 1000
+
+
+def add_stream(sharedImageBuffer, deviceUrl, frameBytes=FRAME_BYTES, priority=1, framesInFlight=4, size=100):
+    sharedImageBuffer.add(deviceUrl, sharedImageBuffer.createImageBuffer(size), priority=priority)
+    sharedImageBuffer.addConsumer(deviceUrl, deviceUrl, framesInFlight=framesInFlight)
+    sharedImageBuffer.setFrameBytes(deviceUrl, frameBytes)
+
+
+def capacity(sharedImageBuffer, deviceUrl):
+    return sharedImageBuffer.getConsumer(deviceUrl, deviceUrl).maxSize()
+
+
+def test_frames_in_flight_count_against_the_share():
+    sharedImageBuffer = SharedImageBuffer(memoryBudget=20 * FRAME_BYTES)
+    add_stream(sharedImageBuffer, 'a', framesInFlight=4)
+    # 20 frames - 1 being captured - 4 held by the consumer
+    assert capacity(sharedImageBuffer, 'a') == 15
+    sharedImageBuffer.addConsumer('a', 'second view', framesInFlight=5)
+    # 20 - 1 - 4 - 5 frames, divided across the two consumers
+    assert capacity(sharedImageBuffer, 'a') == 5
+    sharedImageBuffer.removeConsumer('a', 'second view')
+    assert capacity(sharedImageBuffer, 'a') == 15
+
+
+def test_budget_is_divided_by_priority_whatever_the_resolution():
+    sharedImageBuffer = SharedImageBuffer(memoryBudget=60 * FRAME_BYTES)
+    add_stream(sharedImageBuffer, 'a', framesInFlight=0)
+    add_stream(sharedImageBuffer, 'b', frameBytes=4 * FRAME_BYTES, framesInFlight=0)
+    # Same number of frames per unit of priority: 60 / 5 frame units = 12 frames each
+    assert capacity(sharedImageBuffer, 'a') == 12 - 1
+    assert capacity(sharedImageBuffer, 'b') == 12 - 1
+    sharedImageBuffer.setStreamPriority('a', 2)
+    # Weights 2 * 1 and 1 * 4: 'a' gets 20 frames, 'b' 40 KB = 10 frames
+    assert capacity(sharedImageBuffer, 'a') == 20 - 1
+    assert capacity(sharedImageBuffer, 'b') == 10 - 1
+    # Memory of a removed stream goes to the others
+    sharedImageBuffer.removeByDeviceUrl('b')
+    assert capacity(sharedImageBuffer, 'a') == 60 - 1
+
+
+def test_share_too_small_is_clamped_and_reported():
+    sharedImageBuffer = SharedImageBuffer(memoryBudget=5 * FRAME_BYTES)
+    add_stream(sharedImageBuffer, 'a', framesInFlight=4)
+    assert capacity(sharedImageBuffer, 'a') == 1
+    assert sharedImageBuffer.isOverBudget('a')
+    sharedImageBuffer.setMemoryBudget(6 * FRAME_BYTES)
+    assert capacity(sharedImageBuffer, 'a') == 1
+    assert not sharedImageBuffer.isOverBudget('a')
+
+
+def test_bytes_in_use_include_frames_in_flight():
+    sharedImageBuffer = SharedImageBuffer(memoryBudget=20 * FRAME_BYTES)
+    add_stream(sharedImageBuffer, 'a', framesInFlight=4)
+    add_stream(sharedImageBuffer, 'b', framesInFlight=2)
+    # Nothing queued yet: frame being captured + frames held by the consumer
+    assert sharedImageBuffer.bytesInUse('a') == 5 * FRAME_BYTES
+    assert sharedImageBuffer.totalBytesInUse() == (5 + 3) * FRAME_BYTES
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+
+from ProcessingStages import ProcessingStage, StageGraph, createDefaultStageGraph
+from Structures import FrameFormat, ImageProcessingFlags, ImageProcessingSettings
+
+
+def flags(**enabled):
+    imageProcessingFlags = ImageProcessingFlags()
+    for name, value in enabled.items():
+        setattr(imageProcessingFlags, name, value)
+    return imageProcessingFlags
+
+
+def settings():
+    imageProcessingSettings = ImageProcessingSettings()
+    imageProcessingSettings.dilateNumberOfIterations = 1
+    imageProcessingSettings.flipCode = 1
+    return imageProcessingSettings
+
+
+def plan_names(stageGraph):
+    return [stage.name for stage, _ in stageGraph.plan]
+
+
+def test_plan_has_the_enabled_stages_in_order():
+    stageGraph = createDefaultStageGraph(None)
+    stageGraph.compile(flags(flipOn=True, dilateOn=True), settings())
+    assert plan_names(stageGraph) == ['dilate', 'flip']
+    stageGraph.compile(flags(), settings())
+    assert plan_names(stageGraph) == []
+
+
+def test_conversion_is_inserted_where_a_stage_needs_another_format():
+    stageGraph = createDefaultStageGraph(None)
+    stageGraph.register(ProcessingStage('detector', lambda settings: lambda frame: frame, FrameFormat.BGR,
+                                        FrameFormat.BGR))
+    stageGraph.compile(flags(grayscaleOn=True), settings())
+    assert plan_names(stageGraph) == ['grayscale', 'gray2bgr', 'detector']
+    pyramids = stageGraph.run([np.zeros((4, 4, 3), np.uint8)], [0.0])
+    assert pyramids[0].frame.shape == (4, 4, 3)
+
+
+def test_stage_without_a_conversion_is_rejected():
+    stageGraph = StageGraph()
+    stageGraph.register(ProcessingStage('hsv', lambda settings: lambda frame: frame, 'hsv'))
+    with pytest.raises(ValueError):
+        stageGraph.compile(flags(), settings())
+
+
+def test_register_before_after_and_duplicates():
+    stageGraph = createDefaultStageGraph(None)
+    identity = lambda settings: lambda frame: frame
+    stageGraph.register(ProcessingStage('first', identity), before='grayscale')
+    stageGraph.register(ProcessingStage('afterFlip', identity), after='flip')
+    names = [stage.name for stage in stageGraph.stages]
+    assert names[0] == 'first'
+    assert names[names.index('flip') + 1] == 'afterFlip'
+    with pytest.raises(ValueError):
+        stageGraph.register(ProcessingStage('flip', identity))
+
+
+def test_stage_times_follow_the_plan():
+    stageGraph = createDefaultStageGraph(None)
+    stageGraph.compile(flags(flipOn=True, dilateOn=True), settings())
+    stageGraph.run([np.zeros((4, 4, 3), np.uint8)] * 2, [0.0, 0.1])
+    assert list(stageGraph.stageTimes()) == ['dilate', 'flip']
+    stageGraph.compile(flags(flipOn=True), settings())
+    assert list(stageGraph.stageTimes()) == ['flip']
+
+
+def test_frame_is_uploaded_once_for_consecutive_umat_stages(monkeypatch):
+    # Plan only, the stages are not run: no OpenCL device needed
+    monkeypatch.setattr(cv2.ocl, 'haveOpenCL', lambda: True)
+    monkeypatch.setattr(cv2.ocl, 'setUseOpenCL', lambda enable: None)
+    stageGraph = createDefaultStageGraph(None)
+    stageGraph.setUMatStages(['grayscale', 'dilate', 'canny'])
+    stageGraph.compile(flags(grayscaleOn=True, dilateOn=True, flipOn=True, cannyOn=True), settings())
+    assert plan_names(stageGraph) == ['upload', 'grayscale', 'dilate', 'download', 'flip', 'upload', 'canny',
+                                      'download']
+
+
+def test_plan_stays_on_numpy_without_opencl(monkeypatch):
+    monkeypatch.setattr(cv2.ocl, 'haveOpenCL', lambda: False)
+    stageGraph = createDefaultStageGraph(None)
+    stageGraph.setUMatStages(['grayscale', 'dilate'])
+    stageGraph.compile(flags(grayscaleOn=True, dilateOn=True), settings())
+    assert plan_names(stageGraph) == ['grayscale', 'dilate']
+
+
+def test_serial_part_starts_at_the_first_batch_or_stateful_stage():
+    stageGraph = createDefaultStageGraph(None)
+    stageGraph.register(ProcessingStage('tracker', lambda settings: lambda pyramids, timestamps: [
+        pyramid.frame for pyramid in pyramids], batch=True, stateful=True))
+    stageGraph.register(ProcessingStage('overlay', lambda settings: lambda frame: frame))
+    stageGraph.compile(flags(flipOn=True), settings())
+    plan, serialStart = stageGraph.currentPlan()
+    assert [stage.name for stage, _ in plan[:serialStart]] == ['flip']
+    assert [stage.name for stage, _ in plan[serialStart:]] == ['tracker', 'overlay']
+
+
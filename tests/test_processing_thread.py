@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PyQt5.QtCore import QMutex, QRect
+
+# DeepSortApp needs TensorFlow and the YOLO/DeepSORT models
+pytest.importorskip('tensorflow')
+
+from ProcessingThread import ProcessingThread
+from Config import PROCESSING_MAX_BATCH_SIZE, PROCESSING_REORDER_WINDOW
+
+
+def test_roi_views_share_the_captured_frames(make_frame):
+    processingThread = SimpleNamespace(processingMutex=QMutex(), currentROI=QRect(0, 1, 2, 1))
+    frameDataBatch = [make_frame(i) for i in range(2)]
+    views = ProcessingThread.roiViews(processingThread, frameDataBatch)
+    assert [view.shape for view in views] == [(1, 2, 3)] * 2
+    assert all(np.shares_memory(view, frameData.data) for view, frameData in zip(views, frameDataBatch))
+
+
+def test_frames_in_flight_cover_the_reorder_window():
+    assert ProcessingThread.maxFramesInFlight(1) == PROCESSING_MAX_BATCH_SIZE
+    assert ProcessingThread.maxFramesInFlight(2) == max(PROCESSING_REORDER_WINDOW, 2)
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent import futures
+
+import pytest
+
+from ReorderWindow import ReorderWindow
+from RingBuffer import RingBuffer
+from Structures import DropPolicy
+
+
+@pytest.fixture
+def executor():
+    executor = futures.ThreadPoolExecutor(4)
+    yield executor
+    executor.shutdown()
+
+
+def work(i, delay):
+    time.sleep(delay)
+    return i
+
+
+def drain(window, maxItems=4):
+    taken = []
+    while not window.isEmpty():
+        taken.extend(window.takeReady(maxItems, 1000))
+    return taken
+
+
+def test_items_are_handed_out_in_submission_order(executor):
+    window = ReorderWindow(executor, 8)
+    key = object()
+    # Later items finish first
+    for i in range(8):
+        window.submit(i, key, work, i, (8 - i) * 0.01)
+    assert window.isFull()
+    taken = drain(window)
+    assert [item for item, _, _ in taken] == list(range(8))
+    assert [result for _, result, _ in taken] == list(range(8))
+
+
+def test_take_ready_waits_only_for_the_oldest_item(executor):
+    window = ReorderWindow(executor, 4)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocked():
+        started.set()
+        release.wait(5)
+        return 'oldest'
+
+    window.submit(0, None, blocked)
+    window.submit(1, None, work, 1, 0)
+    started.wait(5)
+    # Newer item is done, the oldest is not: nothing is handed out
+    assert window.takeReady(4, 10) == []
+    release.set()
+    assert [item for item, _, _ in drain(window)] == [0, 1]
+
+
+def test_items_of_different_keys_are_not_taken_together(executor):
+    window = ReorderWindow(executor, 4)
+    plans = [object(), object()]
+    for i in range(4):
+        window.submit(i, plans[i // 2], work, i, 0)
+    futures.wait([future for _, _, future in window.pending])
+    assert [item for item, _, _ in window.takeReady(4, 1000)] == [0, 1]
+    assert [item for item, _, _ in window.takeReady(4, 1000)] == [2, 3]
+
+
+def test_failed_item_returns_its_error(executor):
+    window = ReorderWindow(executor, 4)
+
+    def fail(i):
+        if i == 1:
+            raise ValueError("stage failed")
+        return i
+
+    for i in range(3):
+        window.submit(i, None, fail, i)
+    taken = drain(window)
+    assert [item for item, _, _ in taken] == [0, 1, 2]
+    assert [result for _, result, _ in taken] == [0, None, 2]
+    assert isinstance(taken[1][2], ValueError)
+    assert taken[0][2] is None and taken[2][2] is None
+
+
+def test_take_all_returns_remaining_items(executor):
+    window = ReorderWindow(executor, 4)
+    release = threading.Event()
+    for i in range(3):
+        window.submit(i, None, release.wait, 5)
+    assert window.takeAll() == [0, 1, 2]
+    assert window.isEmpty()
+    release.set()
+
+
+def test_frame_added_to_the_buffer_wakes_take_ready(executor, make_frame):
+    window = ReorderWindow(executor, 4)
+    buffer = RingBuffer(4, DropPolicy.DROP_OLDEST)
+    buffer.setFrameAddedCallback(window.wake)
+    release = threading.Event()
+    window.submit(0, None, release.wait, 5)
+    timer = threading.Timer(0.05, buffer.add, (make_frame(0),))
+    start = time.monotonic()
+    timer.start()
+    # The oldest item is still running: takeReady returns early (empty) when the frame arrives
+    assert window.takeReady(4, 5000) == []
+    assert time.monotonic() - start < 2
+    timer.join()
+    release.set()
+    assert [item for item, _, _ in drain(window)] == [0]
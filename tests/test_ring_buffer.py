@@ -0,0 +1,120 @@
+import time
+
+import numpy as np
+import pytest
+
+from RingBuffer import RingBuffer
+from Structures import DropPolicy
+
+
+def test_block_times_out_when_full(make_frame, queued):
+    buffer = RingBuffer(2)
+    assert buffer.add(make_frame(0), DropPolicy.BLOCK, 0)
+    assert buffer.add(make_frame(1), DropPolicy.BLOCK, 0)
+    assert not buffer.add(make_frame(2), DropPolicy.BLOCK, 10)
+    assert queued(buffer) == [0, 1]
+    assert sum(buffer.droppedFrames().values()) == 0
+
+
+def test_drop_oldest(make_frame, queued):
+    buffer = RingBuffer(3)
+    for i in range(5):
+        assert buffer.add(make_frame(i), DropPolicy.DROP_OLDEST)
+    assert queued(buffer) == [2, 3, 4]
+    assert buffer.droppedFrames()['oldest'] == 2
+
+
+def test_drop_newest(make_frame, queued):
+    buffer = RingBuffer(3)
+    results = [buffer.add(make_frame(i), DropPolicy.DROP_NEWEST) for i in range(5)]
+    assert results == [True, True, True, False, False]
+    assert queued(buffer) == [0, 1, 2]
+    assert buffer.droppedFrames()['newest'] == 2
+
+
+def test_keep_latest(make_frame, queued):
+    buffer = RingBuffer(3)
+    for i in range(4):
+        buffer.add(make_frame(i), DropPolicy.KEEP_LATEST)
+    assert queued(buffer) == [3]
+    assert buffer.droppedFrames()['superseded'] == 3
+
+
+def test_every_nth_keeps_every_nth_frame_while_full(make_frame, queued):
+    buffer = RingBuffer(2, everyNth=3)
+    for i in range(8):
+        buffer.add(make_frame(i), DropPolicy.EVERY_NTH)
+    # 2, 3 decimated, 4 replaces 0; 5, 6 decimated, 7 replaces 1
+    assert queued(buffer) == [4, 7]
+    assert buffer.droppedFrames()['decimated'] == 4
+    assert buffer.droppedFrames()['oldest'] == 2
+
+
+def test_capacity_limits_queued_frames(make_frame, queued):
+    buffer = RingBuffer(10)
+    buffer.setCapacity(2)
+    for i in range(4):
+        buffer.add(make_frame(i), DropPolicy.DROP_OLDEST)
+    assert buffer.isFull()
+    assert queued(buffer) == [2, 3]
+
+
+def test_close_drains_then_returns_none(make_frame):
+    buffer = RingBuffer(2)
+    buffer.add(make_frame(0))
+    buffer.close()
+    assert not buffer.add(make_frame(1))
+    assert buffer.get().frameIndex == 0
+    assert buffer.get() is None
+    assert buffer.getBatch(4) == []
+
+
+def test_dropped_frames_are_recycled(make_frame):
+    buffer = RingBuffer(1)
+    frameData = make_frame(0, buffer)
+    buffer.add(frameData, DropPolicy.DROP_OLDEST)
+    buffer.add(make_frame(1), DropPolicy.DROP_OLDEST)
+    assert buffer.acquire(frameData.data.shape) is frameData.data
+
+
+def test_bare_arrays_are_rejected():
+    buffer = RingBuffer(2)
+    with pytest.raises(TypeError):
+        buffer.add(np.zeros((2, 2, 3), np.uint8), DropPolicy.DROP_OLDEST)
+    assert buffer.isEmpty()
+
+
+def test_get_batch_takes_what_is_queued_up_to_max_items(make_frame, queued):
+    buffer = RingBuffer(8)
+    for i in range(5):
+        buffer.add(make_frame(i))
+    assert [frameData.frameIndex for frameData in buffer.getBatch(3, 0, 0)] == [0, 1, 2]
+    assert queued(buffer) == [3, 4]
+
+
+def test_get_batch_returns_empty_after_first_timeout():
+    buffer = RingBuffer(4)
+    start = time.monotonic()
+    assert buffer.getBatch(4, 0, 50) == []
+    assert time.monotonic() - start >= 0.04
+
+
+def test_get_batch_waits_for_more_frames_until_the_deadline(make_frame, start_thread):
+    buffer = RingBuffer(8)
+    consumer, batches = start_thread(buffer.getBatch, 3, 5000, 5000)
+    buffer.add(make_frame(0))
+    consumer.join(0.1)
+    # First frame arrived, the batch is not full yet
+    assert consumer.is_alive()
+    buffer.add(make_frame(1))
+    buffer.add(make_frame(2))
+    consumer.join(5)
+    assert [frameData.frameIndex for frameData in batches[0]] == [0, 1, 2]
+
+
+def test_get_batch_returns_a_partial_batch_at_the_deadline(make_frame):
+    buffer = RingBuffer(8)
+    buffer.add(make_frame(0))
+    start = time.monotonic()
+    assert [frameData.frameIndex for frameData in buffer.getBatch(3, 50, 0)] == [0]
+    assert time.monotonic() - start >= 0.04
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from StatsPublisher import StatsPublisher, FPSAverage
+from Structures import ThreadStatisticsData
+
+
+class Signal(object):
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, statsData):
+        self.emitted.append(statsData)
+
+
+def test_updates_within_the_interval_are_coalesced():
+    signal = Signal()
+    statsPublisher = StatsPublisher(signal, rate=10)
+    statsData = ThreadStatisticsData()
+    published = []
+    for i in range(5):
+        statsData.nFramesProcessed = i
+        published.append(statsPublisher.publish(statsData))
+    # The first update waits for a full interval as well
+    assert published == [False] * 5
+    time.sleep(0.11)
+    assert statsPublisher.publish(statsData)
+    assert [snapshot.nFramesProcessed for snapshot in signal.emitted] == [4]
+
+
+def test_snapshots_are_copies_and_force_always_publishes():
+    signal = Signal()
+    statsPublisher = StatsPublisher(signal, rate=1)
+    statsData = ThreadStatisticsData()
+    statsData.nFramesProcessed = 1
+    assert statsPublisher.publish(statsData, force=True)
+    statsData.nFramesProcessed = 2
+    assert statsPublisher.publish(statsData, force=True)
+    assert [snapshot.nFramesProcessed for snapshot in signal.emitted] == [1, 2]
+    assert signal.emitted[0] is not statsData
+
+
+def test_rate_zero_publishes_every_update():
+    signal = Signal()
+    statsPublisher = StatsPublisher(signal, rate=0)
+    assert all(statsPublisher.publish(ThreadStatisticsData()) for _ in range(3))
+    assert len(signal.emitted) == 3
+
+
+def test_fps_average_is_a_running_average_of_the_frame_time():
+    fps = FPSAverage(0.5)
+    assert fps.update(0) == 0.0
+    assert fps.update(20) == pytest.approx(50)
+    # Average frame time 20 + 0.5 * (40 - 20) = 30 ms
+    assert fps.update(40) == pytest.approx(1000 / 30)
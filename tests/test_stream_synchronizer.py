@@ -0,0 +1,57 @@
+from StreamSynchronizer import StreamSynchronizer
+
+
+def synchronizer(*deviceUrls, maxWait=50):
+    streamSynchronizer = StreamSynchronizer(skewTolerance=0.05, maxWait=maxWait)
+    for deviceUrl in deviceUrls:
+        streamSynchronizer.add(deviceUrl)
+    streamSynchronizer.setEnabled(True)
+    return streamSynchronizer
+
+
+def test_streams_that_are_not_synchronized_pass():
+    streamSynchronizer = synchronizer('a')
+    assert streamSynchronizer.sync('b', 100.0) == 1
+
+
+def test_stream_behind_drops_frames_until_caught_up():
+    streamSynchronizer = synchronizer('a', 'b')
+    # 'a' sent no frame yet: 'b' waits maxWait, then goes on without it
+    assert streamSynchronizer.sync('b', 10.0) == 1
+    assert streamSynchronizer.sync('a', 9.0) == 0
+    assert streamSynchronizer.sync('a', 9.96) == 1
+    assert streamSynchronizer.droppedFrames('a') == 1
+
+
+def test_stream_ahead_waits_for_the_others(start_thread, wait_until):
+    streamSynchronizer = synchronizer('a', 'b', maxWait=5000)
+    # Both streams start together
+    first, _ = start_thread(streamSynchronizer.sync, 'b', 0.0)
+    assert streamSynchronizer.sync('a', 0.0) == 1
+    first.join(5)
+    ahead, result = start_thread(streamSynchronizer.sync, 'a', 1.0)
+    assert wait_until(lambda: streamSynchronizer.nWaitingStreams() == 1)
+    assert ahead.is_alive()
+    streamSynchronizer.sync('b', 1.0)
+    ahead.join(5)
+    assert result == [1]
+
+
+def test_slower_stream_repeats_frames():
+    streamSynchronizer = synchronizer('fast', 'slow')
+    for t in (0.0, 0.04, 0.08, 0.12, 0.16, 0.2):
+        streamSynchronizer.sync('fast', t)
+    streamSynchronizer.sync('slow', 0.0)
+    # One frame of the slow stream per 5 frames of the fast one
+    assert streamSynchronizer.sync('slow', 0.2) == 5
+    assert streamSynchronizer.duplicatedFrames('slow') == 4
+
+
+def test_removed_stream_releases_waiting_stream(start_thread, wait_until):
+    streamSynchronizer = synchronizer('a', 'b', maxWait=5000)
+    waiting, result = start_thread(streamSynchronizer.sync, 'a', 1.0)
+    # Remove the lagging stream only once 'a' waits for it
+    assert wait_until(lambda: streamSynchronizer.nWaitingStreams() == 1)
+    streamSynchronizer.remove('b')
+    waiting.join(5)
+    assert result == [1]
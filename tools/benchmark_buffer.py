@@ -0,0 +1,119 @@
+# vim: expandtab:ts=4:sw=4
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# RingBuffer lives in the application root, the former Buffer is frozen next to this script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from legacy_buffer import Buffer  # noqa: E402
+from RingBuffer import RingBuffer  # noqa: E402
+from Structures import FrameData, DropPolicy  # noqa: E402
+
+
+def buffer_throughput(buffer_class, buffer_size, n_items, drop_policy=DropPolicy.BLOCK):
+    """Pass items from a producer thread to a consumer thread through a buffer.
+
+    Parameters
+    ----------
+    buffer_class : type
+        Buffer implementation (Buffer or RingBuffer).
+    buffer_size : int
+        Capacity of the buffer.
+    n_items : int
+        Number of items the producer adds.
+    drop_policy : int
+        DropPolicy.BLOCK or DropPolicy.DROP_OLDEST, passed to `add` (Buffer
+        gets the equivalent `dropIfFull`). With DROP_OLDEST the producer never
+        blocks. Either way the consumer stops at the end marker, which the
+        producer always adds with BLOCK.
+
+    Returns
+    -------
+    (int, float)
+        Number of items received by the consumer and elapsed wall time in seconds.
+
+    """
+    buffer = buffer_class(buffer_size)
+    # Tiny frames: measures the buffer overhead, not memory bandwidth
+    frame = np.zeros((1, 1, 3), np.uint8)
+    # Producer pushes an end marker after the last item
+    end = FrameData(None, None, -1, 0.0, "benchmark")
+    received = [0]
+    if buffer_class is Buffer:
+        # Former API: dropIfFull instead of a drop policy
+        def add(item, policy):
+            buffer.add(item, policy == DropPolicy.DROP_OLDEST)
+    else:
+        add = buffer.add
+
+    def producer():
+        for i in range(n_items):
+            add(FrameData(frame, None, i, time.time(), "benchmark"), drop_policy)
+        add(end, DropPolicy.BLOCK)
+
+    def consumer():
+        while buffer.get() is not end:
+            received[0] += 1
+
+    threads = [threading.Thread(target=producer), threading.Thread(target=consumer)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+    return received[0], elapsed
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="Buffer producer/consumer throughput benchmark")
+    parser.add_argument(
+        "--items", type=int, default=200000,
+        help="Number of items passed from producer to consumer.")
+    parser.add_argument(
+        "--sizes", default="1,10,100",
+        help="Comma separated list of buffer sizes to compare.")
+    parser.add_argument(
+        "--repeat", type=int, default=3,
+        help="Number of runs per configuration (best run is reported).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+    implementations = [("Buffer", Buffer), ("RingBuffer", RingBuffer)]
+
+    print("%-10s %5s %6s %9s %9s %11s" % ("buffer", "size", "policy", "items", "time [s]", "items/s"))
+    for size in sizes:
+        for drop_policy, policy_name in ((DropPolicy.BLOCK, "block"), (DropPolicy.DROP_OLDEST, "oldest")):
+            baseline_rate = None
+            for name, buffer_class in implementations:
+                if buffer_class is Buffer and drop_policy == DropPolicy.DROP_OLDEST:
+                    # Former Buffer deadlocks here: a full add() takes the item a waiting get() already
+                    # reserved (usedSlots), get() then blocks in queue.get() holding queueProtect
+                    print("%-10s %5d %6s %9s" % (name, size, policy_name, "deadlocks"))
+                    continue
+                best = None
+                for _ in range(args.repeat):
+                    n_received, elapsed = buffer_throughput(
+                        buffer_class, size, args.items, drop_policy)
+                    if best is None or elapsed < best[1]:
+                        best = (n_received, elapsed)
+                n_received, elapsed = best
+                rate = n_received / elapsed if elapsed > 0 else 0.0
+                if baseline_rate is None:
+                    baseline_rate = rate
+                print("%-10s %5d %6s %9d %9.2f %11.0f  (x%.2f)" % (
+                    name, size, policy_name, n_received, elapsed, rate,
+                    rate / baseline_rate if baseline_rate else 0.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# vim: expandtab:ts=4:sw=4
+import argparse
+import time
+
+import av
+
+
+def decode_throughput(filename, thread_type, thread_count, max_frames=None):
+    """Decode a video file and measure the decoding throughput.
+
+    Parameters
+    ----------
+    filename : str
+        Path to the video file.
+    thread_type : str
+        PyAV codec context thread type ('NONE', 'SLICE', 'FRAME' or 'AUTO').
+    thread_count : int
+        Number of decoder threads. 0 lets FFmpeg pick based on the cores.
+    max_frames : Optional[int]
+        Stop after this many frames. If None, the whole file is decoded.
+
+    Returns
+    -------
+    (int, float)
+        Number of decoded frames and elapsed wall time in seconds.
+
+    """
+    container = av.open(filename)
+    stream = container.streams.video[0]
+    stream.codec_context.thread_type = thread_type
+    stream.codec_context.thread_count = thread_count
+
+    n_frames = 0
+    start_time = time.perf_counter()
+    for packet in container.demux(stream):
+        for _ in packet.decode():
+            n_frames += 1
+            if max_frames is not None and n_frames >= max_frames:
+                break
+        if max_frames is not None and n_frames >= max_frames:
+            break
+    elapsed = time.perf_counter() - start_time
+    container.close()
+    return n_frames, elapsed
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="PyAV decode throughput benchmark")
+    parser.add_argument(
+        "--video", default="data/video/test.mp4",
+        help="Path to the video file to decode.")
+    parser.add_argument(
+        "--thread_types", default="NONE,SLICE,FRAME,AUTO",
+        help="Comma separated list of thread types to compare.")
+    parser.add_argument(
+        "--thread_counts", default="1,2,4,8,0",
+        help="Comma separated list of thread counts to compare (0 = auto).")
+    parser.add_argument(
+        "--max_frames", type=int, default=None,
+        help="Stop decoding after this many frames.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    thread_types = [t.strip().upper() for t in args.thread_types.split(",")]
+    thread_counts = [int(c) for c in args.thread_counts.split(",")]
+
+    print("%-6s %7s %8s %9s %8s" % ("type", "threads", "frames", "time [s]", "fps"))
+    baseline_fps = None
+    for thread_type in thread_types:
+        # Thread count has no effect without threading
+        counts = [1] if thread_type == "NONE" else thread_counts
+        for thread_count in counts:
+            n_frames, elapsed = decode_throughput(
+                args.video, thread_type, thread_count, args.max_frames)
+            fps = n_frames / elapsed if elapsed > 0 else 0.0
+            if baseline_fps is None:
+                baseline_fps = fps
+            print("%-6s %7d %8d %9.2f %8.1f  (x%.2f)" % (
+                thread_type, thread_count, n_frames, elapsed, fps,
+                fps / baseline_fps if baseline_fps else 0.0))
+
+
+if __name__ == "__main__":
+    main()
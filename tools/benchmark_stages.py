@@ -0,0 +1,118 @@
+# vim: expandtab:ts=4:sw=4
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Processing stages live in the application root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from Config import *  # noqa: E402,F403
+from ProcessingStages import createDefaultStageGraph  # noqa: E402
+from Structures import FrameFormat, ImageProcessingSettings  # noqa: E402
+
+
+def default_settings():
+    """Image processing settings with the defaults of Config.py.
+    """
+    settings = ImageProcessingSettings()
+    settings.smoothType = DEFAULT_SMOOTH_TYPE
+    settings.smoothParam1 = DEFAULT_SMOOTH_PARAM_1
+    settings.smoothParam2 = DEFAULT_SMOOTH_PARAM_2
+    settings.smoothParam3 = DEFAULT_SMOOTH_PARAM_3
+    settings.smoothParam4 = DEFAULT_SMOOTH_PARAM_4
+    settings.dilateNumberOfIterations = DEFAULT_DILATE_ITERATIONS
+    settings.erodeUrlOfIterations = DEFAULT_ERODE_ITERATIONS
+    settings.flipCode = DEFAULT_FLIP_CODE
+    settings.cannyThreshold1 = DEFAULT_CANNY_THRESHOLD_1
+    settings.cannyThreshold2 = DEFAULT_CANNY_THRESHOLD_2
+    settings.cannyApertureSize = DEFAULT_CANNY_APERTURE_SIZE
+    settings.cannyL2gradient = DEFAULT_CANNY_L2GRADIENT
+    return settings
+
+
+def time_function(function, frame, n_runs, synchronize):
+    """Run a stage function on a frame.
+
+    Parameters
+    ----------
+    function : Callable[ndarray | UMat] -> ndarray | UMat
+        Per-frame function of a processing stage.
+    frame : ndarray | UMat
+        Input frame.
+    n_runs : int
+        Number of timed runs (after one warm-up run, which also compiles
+        OpenCL kernels).
+    synchronize : bool
+        If True wait for queued OpenCL work after every run.
+
+    Returns
+    -------
+    float
+        Mean time per run in milliseconds.
+
+    """
+    function(frame)
+    if synchronize:
+        cv2.ocl.finish()
+    start_time = time.perf_counter()
+    for _ in range(n_runs):
+        function(frame)
+        if synchronize:
+            cv2.ocl.finish()
+    return (time.perf_counter() - start_time) * 1000 / n_runs
+
+
+def parse_args():
+    """Parse command line arguments.
+    """
+    parser = argparse.ArgumentParser(description="NumPy vs cv2.UMat (OpenCL) time per processing stage")
+    parser.add_argument(
+        "--width", type=int, default=1920, help="Frame width.")
+    parser.add_argument(
+        "--height", type=int, default=1080, help="Frame height.")
+    parser.add_argument(
+        "--runs", type=int, default=50, help="Number of timed runs per stage and mode.")
+    parser.add_argument(
+        "--stages", default="grayscale,smooth,dilate,erode,flip,canny",
+        help="Comma separated list of stages to compare.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not cv2.ocl.haveOpenCL():
+        print("OpenCL is not available: UMat stages would run on the CPU path.")
+        return
+    cv2.ocl.setUseOpenCL(True)
+    print("OpenCL device: %s" % cv2.ocl.Device.getDefault().name())
+
+    settings = default_settings()
+    stages = {stage.name: stage for stage in createDefaultStageGraph().stages}
+    frames = {FrameFormat.BGR: np.random.randint(0, 256, (args.height, args.width, 3), np.uint8)}
+    frames[FrameFormat.GRAY] = cv2.cvtColor(frames[FrameFormat.BGR], cv2.COLOR_BGR2GRAY)
+    frames[FrameFormat.ANY] = frames[FrameFormat.BGR]
+
+    # Transfers are paid once per run of consecutive UMat stages
+    upload_time = time_function(cv2.UMat, frames[FrameFormat.BGR], args.runs, True)
+    download_time = time_function(lambda frame: frame.get(), cv2.UMat(frames[FrameFormat.BGR]), args.runs, True)
+    print("upload: %.2f ms, download: %.2f ms (%dx%d BGR)" % (upload_time, download_time, args.width, args.height))
+
+    print("%-10s %10s %10s %8s" % ("stage", "numpy [ms]", "umat [ms]", "speedup"))
+    winners = []
+    for name in args.stages.split(","):
+        stage = stages[name]
+        function = stage.make(settings)
+        frame = frames[stage.inputFormat]
+        numpy_time = time_function(function, frame, args.runs, False)
+        umat_time = time_function(function, cv2.UMat(frame), args.runs, True)
+        print("%-10s %10.2f %10.2f %7.2fx" % (name, numpy_time, umat_time, numpy_time / umat_time))
+        if umat_time < numpy_time:
+            winners.append(name)
+    print("PROCESSING_UMAT_STAGES = %r" % (tuple(winners),))
+
+
+if __name__ == "__main__":
+    main()
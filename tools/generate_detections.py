@@ -106,20 +106,63 @@ def create_box_encoder(model_filename, input_name="images",
     image_shape = image_encoder.image_shape
 
     def encoder(image, boxes):
-        image_patches = []
-        for box in boxes:
-            patch = extract_image_patch(image, box, image_shape[:2])
-            if patch is None:
-                print("WARNING: Failed to extract image patch: %s." % str(box))
-                patch = np.random.uniform(
-                    0., 255., image_shape).astype(np.uint8)
-            image_patches.append(patch)
+        image_patches = _extract_image_patches(image, boxes, image_shape)
         image_patches = np.asarray(image_patches)
         return image_encoder(image_patches, batch_size)
 
     return encoder
 
 
+def create_batch_box_encoder(model_filename, input_name="images",
+                             output_name="features", batch_size=32):
+    """Create an encoder that computes the features of several images at once.
+
+    The patches of all images are fed to the network together, so a batch
+    of frames needs ceil(n_patches / batch_size) session runs instead of at
+    least one run per frame.
+
+    Returns
+    -------
+    Callable[List[ndarray | FramePyramid], List[ndarray]] -> List[ndarray]
+        Takes a list of BGR color images and a list of matching box matrices
+        in format `(x, y, w, h)` and returns one feature matrix per image.
+        For a FramePyramid, patches are cropped from the smallest pyramid
+        level that still has the patch resolution (built once per frame and
+        shared with the other consumers of the frame).
+
+    """
+    image_encoder = ImageEncoder(model_filename, input_name, output_name)
+    image_shape = image_encoder.image_shape
+
+    def encoder(images, boxes_list):
+        image_patches = []
+        for image, boxes in zip(images, boxes_list):
+            image_patches.extend(_extract_image_patches(image, boxes, image_shape))
+        features = image_encoder(np.asarray(image_patches), batch_size)
+        # Split features back per image
+        splits = np.cumsum([len(boxes) for boxes in boxes_list])[:-1]
+        return np.split(features, splits)
+
+    return encoder
+
+
+def _extract_image_patches(image, boxes, image_shape):
+    image_patches = []
+    for box in boxes:
+        if isinstance(image, np.ndarray):
+            patch = extract_image_patch(image, box, image_shape[:2])
+        else:
+            # FramePyramid: boxes are in coordinates of the full frame
+            source, scale = image.levelFor(float(image_shape[0]) / max(box[3], 1))
+            patch = extract_image_patch(source, np.asarray(box) * scale, image_shape[:2])
+        if patch is None:
+            print("WARNING: Failed to extract image patch: %s." % str(box))
+            patch = np.random.uniform(
+                0., 255., image_shape).astype(np.uint8)
+        image_patches.append(patch)
+    return image_patches
+
+
 def generate_detections(encoder, mot_dir, output_dir, detection_dir=None):
     """Generate detections with features.
 
@@ -1,3 +1,6 @@
+# vim: expandtab:ts=4:sw=4
+# Frozen copy of the former application Buffer (semaphores + queue.Queue), baseline for benchmark_buffer.py.
+# Not used by the application, see RingBuffer.
 from PyQt5.QtCore import QSemaphore, QMutex
 from queue import Queue
 
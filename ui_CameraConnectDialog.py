@@ -14,17 +14,17 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_CameraConnectDialog(object):
     def setupUi(self, CameraConnectDialog):
         CameraConnectDialog.setObjectName("CameraConnectDialog")
-        CameraConnectDialog.resize(800, 567)
+        CameraConnectDialog.resize(800, 687)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
         sizePolicy.setHorizontalStretch(0)
         sizePolicy.setVerticalStretch(0)
         sizePolicy.setHeightForWidth(CameraConnectDialog.sizePolicy().hasHeightForWidth())
         CameraConnectDialog.setSizePolicy(sizePolicy)
-        CameraConnectDialog.setMinimumSize(QtCore.QSize(800, 567))
-        CameraConnectDialog.setMaximumSize(QtCore.QSize(800, 567))
+        CameraConnectDialog.setMinimumSize(QtCore.QSize(800, 687))
+        CameraConnectDialog.setMaximumSize(QtCore.QSize(800, 687))
         CameraConnectDialog.setSizeIncrement(QtCore.QSize(0, 0))
         self.layoutWidget = QtWidgets.QWidget(CameraConnectDialog)
-        self.layoutWidget.setGeometry(QtCore.QRect(10, 12, 777, 545))
+        self.layoutWidget.setGeometry(QtCore.QRect(10, 12, 777, 665))
         self.layoutWidget.setObjectName("layoutWidget")
         self.verticalLayout_3 = QtWidgets.QVBoxLayout(self.layoutWidget)
         self.verticalLayout_3.setContentsMargins(0, 0, 0, 0)
@@ -142,6 +142,15 @@ class Ui_CameraConnectDialog(object):
         self.rtspRadioButton.setObjectName("rtspRadioButton")
         self.gridLayout.addWidget(self.rtspRadioButton, 0, 0, 1, 1)
         self.verticalLayout_3.addLayout(self.gridLayout)
+        self.horizontalLayout_20 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_20.setObjectName("horizontalLayout_20")
+        self.label_29 = QtWidgets.QLabel(self.layoutWidget)
+        self.label_29.setObjectName("label_29")
+        self.horizontalLayout_20.addWidget(self.label_29)
+        self.transportModeComboBox = QtWidgets.QComboBox(self.layoutWidget)
+        self.transportModeComboBox.setObjectName("transportModeComboBox")
+        self.horizontalLayout_20.addWidget(self.transportModeComboBox)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_20)
         self.horizontalLayout_8 = QtWidgets.QHBoxLayout()
         self.horizontalLayout_8.setObjectName("horizontalLayout_8")
         self.horizontalLayout_13 = QtWidgets.QHBoxLayout()
@@ -193,6 +202,22 @@ class Ui_CameraConnectDialog(object):
         self.apiPreferenceComboBox.setObjectName("apiPreferenceComboBox")
         self.horizontalLayout_6.addWidget(self.apiPreferenceComboBox)
         self.verticalLayout_3.addLayout(self.horizontalLayout_6)
+        self.horizontalLayout_19 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_19.setObjectName("horizontalLayout_19")
+        self.label_27 = QtWidgets.QLabel(self.layoutWidget)
+        self.label_27.setObjectName("label_27")
+        self.horizontalLayout_19.addWidget(self.label_27)
+        self.decodeThreadTypeComboBox = QtWidgets.QComboBox(self.layoutWidget)
+        self.decodeThreadTypeComboBox.setObjectName("decodeThreadTypeComboBox")
+        self.horizontalLayout_19.addWidget(self.decodeThreadTypeComboBox)
+        self.decodeThreadCountEdit = QtWidgets.QLineEdit(self.layoutWidget)
+        self.decodeThreadCountEdit.setMaximumSize(QtCore.QSize(60, 16777215))
+        self.decodeThreadCountEdit.setObjectName("decodeThreadCountEdit")
+        self.horizontalLayout_19.addWidget(self.decodeThreadCountEdit)
+        self.label_28 = QtWidgets.QLabel(self.layoutWidget)
+        self.label_28.setObjectName("label_28")
+        self.horizontalLayout_19.addWidget(self.label_28)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_19)
         self.label_3 = QtWidgets.QLabel(self.layoutWidget)
         font = QtGui.QFont()
         font.setPointSize(9)
@@ -232,12 +257,21 @@ class Ui_CameraConnectDialog(object):
         self.horizontalLayout.setStretch(0, 1)
         self.horizontalLayout.setStretch(1, 1)
         self.verticalLayout_3.addLayout(self.horizontalLayout)
-        self.dropFrameCheckBox = QtWidgets.QCheckBox(self.layoutWidget)
+        self.horizontalLayout_21 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_21.setObjectName("horizontalLayout_21")
+        self.label_30 = QtWidgets.QLabel(self.layoutWidget)
         font = QtGui.QFont()
         font.setPointSize(9)
-        self.dropFrameCheckBox.setFont(font)
-        self.dropFrameCheckBox.setObjectName("dropFrameCheckBox")
-        self.verticalLayout_3.addWidget(self.dropFrameCheckBox)
+        self.label_30.setFont(font)
+        self.label_30.setObjectName("label_30")
+        self.horizontalLayout_21.addWidget(self.label_30)
+        self.dropPolicyComboBox = QtWidgets.QComboBox(self.layoutWidget)
+        font = QtGui.QFont()
+        font.setPointSize(9)
+        self.dropPolicyComboBox.setFont(font)
+        self.dropPolicyComboBox.setObjectName("dropPolicyComboBox")
+        self.horizontalLayout_21.addWidget(self.dropPolicyComboBox)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_21)
         self.label_5 = QtWidgets.QLabel(self.layoutWidget)
         font = QtGui.QFont()
         font.setPointSize(9)
@@ -283,6 +317,19 @@ class Ui_CameraConnectDialog(object):
         self.verticalLayout_2.addWidget(self.processingPrioComboBox)
         self.horizontalLayout_3.addLayout(self.verticalLayout_2)
         self.verticalLayout_3.addLayout(self.horizontalLayout_3)
+        self.horizontalLayout_22 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_22.setObjectName("horizontalLayout_22")
+        self.label_31 = QtWidgets.QLabel(self.layoutWidget)
+        self.label_31.setObjectName("label_31")
+        self.horizontalLayout_22.addWidget(self.label_31)
+        self.processingWorkersEdit = QtWidgets.QLineEdit(self.layoutWidget)
+        self.processingWorkersEdit.setMaximumSize(QtCore.QSize(60, 16777215))
+        self.processingWorkersEdit.setObjectName("processingWorkersEdit")
+        self.horizontalLayout_22.addWidget(self.processingWorkersEdit)
+        self.label_32 = QtWidgets.QLabel(self.layoutWidget)
+        self.label_32.setObjectName("label_32")
+        self.horizontalLayout_22.addWidget(self.label_32)
+        self.verticalLayout_3.addLayout(self.horizontalLayout_22)
         self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
         self.horizontalLayout_5.setObjectName("horizontalLayout_5")
         self.label_8 = QtWidgets.QLabel(self.layoutWidget)
@@ -351,6 +398,9 @@ class Ui_CameraConnectDialog(object):
         self.skipDuration.setObjectName("skipDuration")
         self.horizontalLayout_18.addWidget(self.skipDuration)
         self.verticalLayout_3.addLayout(self.horizontalLayout_18)
+        self.turboModeCheckBox = QtWidgets.QCheckBox(self.layoutWidget)
+        self.turboModeCheckBox.setObjectName("turboModeCheckBox")
+        self.verticalLayout_3.addWidget(self.turboModeCheckBox)
         self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
         self.horizontalLayout_4.setObjectName("horizontalLayout_4")
         self.resetToDefaultsPushButton = QtWidgets.QPushButton(self.layoutWidget)
@@ -375,16 +425,21 @@ class Ui_CameraConnectDialog(object):
         CameraConnectDialog.setTabOrder(self.passwordEdit, self.ipEdit)
         CameraConnectDialog.setTabOrder(self.ipEdit, self.portEdit)
         CameraConnectDialog.setTabOrder(self.portEdit, self.channelsEdit)
-        CameraConnectDialog.setTabOrder(self.channelsEdit, self.resWEdit)
+        CameraConnectDialog.setTabOrder(self.channelsEdit, self.transportModeComboBox)
+        CameraConnectDialog.setTabOrder(self.transportModeComboBox, self.resWEdit)
         CameraConnectDialog.setTabOrder(self.resWEdit, self.resHEdit)
         CameraConnectDialog.setTabOrder(self.resHEdit, self.apiPreferenceComboBox)
-        CameraConnectDialog.setTabOrder(self.apiPreferenceComboBox, self.imageBufferSizeEdit)
-        CameraConnectDialog.setTabOrder(self.imageBufferSizeEdit, self.dropFrameCheckBox)
-        CameraConnectDialog.setTabOrder(self.dropFrameCheckBox, self.capturePrioComboBox)
+        CameraConnectDialog.setTabOrder(self.apiPreferenceComboBox, self.decodeThreadTypeComboBox)
+        CameraConnectDialog.setTabOrder(self.decodeThreadTypeComboBox, self.decodeThreadCountEdit)
+        CameraConnectDialog.setTabOrder(self.decodeThreadCountEdit, self.imageBufferSizeEdit)
+        CameraConnectDialog.setTabOrder(self.imageBufferSizeEdit, self.dropPolicyComboBox)
+        CameraConnectDialog.setTabOrder(self.dropPolicyComboBox, self.capturePrioComboBox)
         CameraConnectDialog.setTabOrder(self.capturePrioComboBox, self.processingPrioComboBox)
-        CameraConnectDialog.setTabOrder(self.processingPrioComboBox, self.tabLabelEdit)
+        CameraConnectDialog.setTabOrder(self.processingPrioComboBox, self.processingWorkersEdit)
+        CameraConnectDialog.setTabOrder(self.processingWorkersEdit, self.tabLabelEdit)
         CameraConnectDialog.setTabOrder(self.tabLabelEdit, self.enableFrameProcessingCheckBox)
-        CameraConnectDialog.setTabOrder(self.enableFrameProcessingCheckBox, self.resetToDefaultsPushButton)
+        CameraConnectDialog.setTabOrder(self.enableFrameProcessingCheckBox, self.turboModeCheckBox)
+        CameraConnectDialog.setTabOrder(self.turboModeCheckBox, self.resetToDefaultsPushButton)
 
     def retranslateUi(self, CameraConnectDialog):
         _translate = QtCore.QCoreApplication.translate
@@ -405,17 +460,22 @@ class Ui_CameraConnectDialog(object):
         self.label_16.setText(_translate("CameraConnectDialog", "ip address"))
         self.label_24.setText(_translate("CameraConnectDialog", ":"))
         self.rtspRadioButton.setText(_translate("CameraConnectDialog", "RTSP:"))
+        self.label_29.setText(_translate("CameraConnectDialog", "RTSP transport:"))
         self.label_11.setText(_translate("CameraConnectDialog", "Resolution (W x H):"))
         self.label_12.setText(_translate("CameraConnectDialog", "[optional]"))
         self.label_13.setText(_translate("CameraConnectDialog", "x"))
         self.label.setText(_translate("CameraConnectDialog", "apiPreference:"))
+        self.label_27.setText(_translate("CameraConnectDialog", "Decode threads (type / count):"))
+        self.label_28.setText(_translate("CameraConnectDialog", "[0 = auto]"))
         self.label_3.setText(_translate("CameraConnectDialog", "Image Buffer:"))
         self.label_2.setText(_translate("CameraConnectDialog", "Size (number of images/frames):"))
         self.label_4.setText(_translate("CameraConnectDialog", "[1-999]"))
-        self.dropFrameCheckBox.setText(_translate("CameraConnectDialog", "Drop frame if image buffer is full"))
+        self.label_30.setText(_translate("CameraConnectDialog", "If image buffer is full:"))
         self.label_5.setText(_translate("CameraConnectDialog", "Thread Priorities:"))
         self.label_6.setText(_translate("CameraConnectDialog", "Capture Thread:"))
         self.label_7.setText(_translate("CameraConnectDialog", "Processing Thread:"))
+        self.label_31.setText(_translate("CameraConnectDialog", "Processing workers:"))
+        self.label_32.setText(_translate("CameraConnectDialog", "[1 = frames processed one at a time]"))
         self.label_8.setText(_translate("CameraConnectDialog", "Tab Label:"))
         self.enableFrameProcessingCheckBox.setText(_translate("CameraConnectDialog", "Enable frame processing"))
         self.label_9.setText(_translate("CameraConnectDialog", "Video Setting:"))
@@ -424,4 +484,5 @@ class Ui_CameraConnectDialog(object):
         self.label_25.setText(_translate("CameraConnectDialog", "Starting Time of Recording:"))
         self.videoTime.setDisplayFormat(_translate("CameraConnectDialog", "hh:mm:ss"))
         self.label_26.setText(_translate("CameraConnectDialog", "Skip Duration(HH:MM:SS):"))
+        self.turboModeCheckBox.setText(_translate("CameraConnectDialog", "Turbo mode (process video files as fast as possible)"))
         self.resetToDefaultsPushButton.setText(_translate("CameraConnectDialog", "Reset to Defaults"))
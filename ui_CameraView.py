@@ -297,6 +297,32 @@ class Ui_CameraView(object):
         self.imageBufferLabel.setAlignment(QtCore.Qt.AlignCenter)
         self.imageBufferLabel.setObjectName("imageBufferLabel")
         self.gridLayout.addWidget(self.imageBufferLabel, 7, 2, 1, 1)
+        self.label_8 = QtWidgets.QLabel(CameraView)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.MinimumExpanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.label_8.sizePolicy().hasHeightForWidth())
+        self.label_8.setSizePolicy(sizePolicy)
+        font = QtGui.QFont()
+        font.setPointSize(8)
+        font.setBold(True)
+        font.setWeight(75)
+        self.label_8.setFont(font)
+        self.label_8.setAlignment(QtCore.Qt.AlignLeading|QtCore.Qt.AlignLeft|QtCore.Qt.AlignVCenter)
+        self.label_8.setObjectName("label_8")
+        self.gridLayout.addWidget(self.label_8, 8, 0, 1, 1)
+        self.droppedFramesLabel = QtWidgets.QLabel(CameraView)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.MinimumExpanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.droppedFramesLabel.sizePolicy().hasHeightForWidth())
+        self.droppedFramesLabel.setSizePolicy(sizePolicy)
+        font = QtGui.QFont()
+        font.setPointSize(8)
+        self.droppedFramesLabel.setFont(font)
+        self.droppedFramesLabel.setText("")
+        self.droppedFramesLabel.setObjectName("droppedFramesLabel")
+        self.gridLayout.addWidget(self.droppedFramesLabel, 8, 1, 1, 2)
         self.roiLabel = QtWidgets.QLabel(CameraView)
         sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.MinimumExpanding)
         sizePolicy.setHorizontalStretch(0)
@@ -390,6 +416,7 @@ class Ui_CameraView(object):
         self.label_2.setText(_translate("CameraView", "Capture Rate:"))
         self.label_3.setText(_translate("CameraView", "Processing Rate:"))
         self.label_1.setText(_translate("CameraView", "Image Buffer:"))
+        self.label_8.setText(_translate("CameraView", "Dropped Frames:"))
         self.reconnectButton.setText(_translate("CameraView", "Reconnect"))
         self.clearImageBufferButton.setText(_translate("CameraView", "Clear Image Buffer"))
         self.label_4.setText(_translate("CameraView", "Camera Device Url:"))